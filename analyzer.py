@@ -0,0 +1,214 @@
+import ast
+import builtins
+import os
+import threading
+from dataclasses import dataclass, field
+
+from gx_engine import GXExpr, GXParser, scan_directives, walk_nodes
+from gx_modules import MODULE_CACHE
+
+
+@dataclass(frozen=True)
+class Diagnostic:
+    line: int
+    level: str
+    message: str
+
+
+@dataclass
+class BlockFacts:
+    writes: set = field(default_factory=set)
+    reads: list = field(default_factory=list)
+    diagnostics: list = field(default_factory=list)
+    calls: list = field(default_factory=list)
+    functions: dict = field(default_factory=dict)
+    uses_lua: bool = False
+
+
+KNOWN_NAMES = set(dir(builtins)) | {"True", "False", "None"}
+
+WRITE_TARGETS = {
+    "var.set": 0,
+    "var.ask": 0,
+    "var.math": 0,
+    "var.math_": 3,
+    "var.inc": 0,
+    "var.dec": 0,
+    "table.add": 0,
+    "table.get": 2,
+    "call": 2,
+    "foreach": 0,
+    "for": 0,
+    "parallel_foreach": 2,
+}
+
+TABLE_READS = ("table.remove", "table.get")
+
+
+class GXAnalyzer:
+    def __init__(self, module_cache=None):
+        self._cache: dict[str, BlockFacts] = {}
+        self._module_facts_cache: dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.module_cache = module_cache or MODULE_CACHE
+
+    def analyze(self, code: str, path: str | None = None) -> list[Diagnostic]:
+        with self._lock:
+            return self._analyze(code, path)
+
+    def _analyze(self, code, path):
+        lines = code.split("\n")
+        program = GXParser(lines, scan_directives(lines)).parse()
+        out = [Diagnostic(e.line, "error", str(e)) for e in program.errors]
+        module_writes, module_lua, module_funcs = self._module_facts(program.flags, path, out)
+
+        fresh = {}
+        writes = set(module_writes)
+        reads = []
+        calls = []
+        functions = dict(module_funcs)
+        uses_lua = module_lua
+        for node in program.body:
+            key = "\n".join(lines[node.line - 1:max(node.end_line, node.line)])
+            facts = fresh.get(key) or self._cache.get(key)
+            if facts is None:
+                facts = self._block_facts(node)
+            fresh[key] = facts
+
+            base = node.line
+            writes |= facts.writes
+            uses_lua = uses_lua or facts.uses_lua
+            reads.extend((name, base + rel) for name, rel in facts.reads)
+            calls.extend((name, argc, base + rel) for name, argc, rel in facts.calls)
+            functions.update(facts.functions)
+            out.extend(Diagnostic(base + rel, level, msg) for rel, level, msg in facts.diagnostics)
+        self._cache = fresh
+
+        for name, argc, line in calls:
+            if name not in functions:
+                out.append(Diagnostic(line, "error", "Unknown function: " + name))
+            elif functions[name] != argc:
+                out.append(Diagnostic(line, "error", f"{name} expects {functions[name]} argument(s), got {argc}"))
+
+        reported = set()
+        for name, line in reads:
+            if name in writes or name in KNOWN_NAMES or (name, line) in reported:
+                continue
+            if uses_lua and name.startswith("gx_"):
+                continue
+            reported.add((name, line))
+            out.append(Diagnostic(line, "warning", f"Variable '{name}' is read but never set"))
+
+        out.sort(key=lambda d: (d.line, d.level != "error"))
+        return out
+
+    def _module_facts(self, flags, path, out):
+        writes = set()
+        uses_lua = False
+        functions = {}
+        seen = set()
+        pending = [(flags, path, True)]
+        while pending:
+            mod_flags, mod_path, top = pending.pop()
+            base_dir = os.path.dirname(os.path.abspath(mod_path)) if mod_path else None
+            for name, line in mod_flags.get("imports", []):
+                found = self.module_cache.resolve(name, base_dir)
+                if found is None:
+                    if top:
+                        out.append(Diagnostic(line, "error", "Cannot find module: " + name))
+                    continue
+                if found in seen:
+                    continue
+                seen.add(found)
+                try:
+                    module = self.module_cache.load(found)
+                except OSError as e:
+                    if top:
+                        out.append(Diagnostic(line, "error", f"Cannot read module {name}: {e}"))
+                    continue
+                if module.program.errors and top:
+                    err = module.program.errors[0]
+                    out.append(Diagnostic(line, "error", f"Module {name} line {err.line}: {err}"))
+                cached = self._module_facts_cache.get(module.digest)
+                if cached is None:
+                    mod_writes = set()
+                    mod_lua = False
+                    mod_funcs = {}
+                    for node in module.program.body:
+                        facts = self._block_facts(node)
+                        mod_writes |= facts.writes
+                        mod_lua = mod_lua or facts.uses_lua
+                        mod_funcs.update(facts.functions)
+                    cached = self._module_facts_cache[module.digest] = (mod_writes, mod_lua, mod_funcs)
+                writes |= cached[0]
+                uses_lua = uses_lua or cached[1]
+                functions.update(cached[2])
+                pending.append((module.program.flags, found, False))
+        return writes, uses_lua, functions
+
+    def _block_facts(self, root):
+        facts = BlockFacts()
+        if root.kind != "func":
+            self._walk_facts([root], root.line, facts)
+            return facts
+
+        name, params = root.args
+        inner = BlockFacts()
+        self._walk_facts(root.body, root.line, inner)
+        local = set(params) | inner.writes
+        reported = set()
+        for var, rel in inner.reads:
+            if var in local or var in KNOWN_NAMES or (var, rel) in reported:
+                continue
+            if inner.uses_lua and var.startswith("gx_"):
+                continue
+            reported.add((var, rel))
+            inner.diagnostics.append((rel, "warning", f"Variable '{var}' is not defined in func {name}"))
+        facts.diagnostics = inner.diagnostics
+        facts.calls = inner.calls
+        facts.uses_lua = inner.uses_lua
+        facts.functions[name] = len(params)
+        return facts
+
+    def _walk_facts(self, nodes, base, facts):
+        for node in walk_nodes(nodes):
+            rel = node.line - base
+            if node.kind == "lua_snippet":
+                facts.uses_lua = True
+
+            slot = WRITE_TARGETS.get(node.kind)
+            if slot is not None and len(node.args) > slot and node.args[slot]:
+                facts.writes.add(node.args[slot])
+            if node.kind in TABLE_READS and node.args:
+                facts.reads.append((node.args[0], rel))
+
+            args = node.args
+            if node.kind == "call":
+                facts.calls.append((args[0], len(args[1]), rel))
+                args = args[1]
+            for arg in args:
+                if isinstance(arg, GXExpr):
+                    self._check_expr(arg, rel, facts)
+            for cond, line, _ in node.branches:
+                if cond is not None:
+                    self._check_expr(cond, line - base, facts)
+
+    def _check_expr(self, expr: GXExpr, rel: int, facts: BlockFacts):
+        try:
+            tree = ast.parse(expr.source, mode="eval")
+        except SyntaxError:
+            facts.diagnostics.append((rel, "error", "Invalid expression: " + expr.source))
+            return
+        bound = set()
+        loads = []
+        for n in ast.walk(tree):
+            if isinstance(n, ast.Name):
+                if isinstance(n.ctx, ast.Load):
+                    loads.append(n.id)
+                else:
+                    bound.add(n.id)
+            elif isinstance(n, ast.arg):
+                bound.add(n.arg)
+        for name in loads:
+            if name not in bound:
+                facts.reads.append((name, rel))
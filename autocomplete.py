@@ -1,7 +1,8 @@
 from PyQt5.QtWidgets import QListWidget, QListWidgetItem
 from PyQt5.QtCore import Qt, QPoint, QTimer
 import re
-import jedi
+
+from symbol_index import GXSymbolIndex
 
 
 class CompletionPopup(QListWidget):
@@ -69,6 +70,7 @@ class GXAutoComplete:
         self.popup = CompletionPopup(editor)
 
         self.base_mode = "gx"
+        self.enabled = True
         self.include_python = False
         self.include_lua = False
 
@@ -76,10 +78,16 @@ class GXAutoComplete:
         self.timer.setSingleShot(True)
         self.timer.timeout.connect(self._trigger_safe)
 
+        self.symbols = GXSymbolIndex()
+        self.symbols.reset(editor.toPlainText())
+        editor.document().contentsChange.connect(self._on_contents_change)
+
         self.gx_keywords = [
             "#include_python", "#include_lua", "#include_lua&python",
             "lua_snippet:", "py_snippet:", "--s--", "--e--",
             "repeat", "end", "if", "elif", "else",
+            "foreach", "parallel", "for", "in", "break", "continue",
+            "func", "call", "return",
             "say", "debugprint",
             "var.set", "var.ask", "var.inc", "var.dec",
             "var.math", "var.math_add", "var.math_sub", "var.math_mul", "var.math_div",
@@ -98,12 +106,45 @@ class GXAutoComplete:
         self.base_mode = (mode or "gx").lower().strip()
         self.popup.hide()
 
+    def set_enabled(self, enabled: bool):
+        enabled = bool(enabled)
+        if enabled and not self.enabled:
+            self.symbols.reset(self.editor.toPlainText())
+        self.enabled = enabled
+        self.popup.hide()
+
     def set_includes(self, include_python: bool, include_lua: bool):
         self.include_python = bool(include_python)
         self.include_lua = bool(include_lua)
         self.popup.hide()
 
+    def _on_contents_change(self, position: int, removed: int, added: int):
+        if not self.enabled:
+            return
+        try:
+            doc = self.editor.document()
+            first = doc.findBlock(position).blockNumber()
+            last = doc.findBlock(position + added).blockNumber()
+            if first < 0 or last < 0:
+                self.symbols.reset(doc.toPlainText())
+                return
+            new_count = last - first + 1
+            old_count = new_count - (doc.blockCount() - len(self.symbols.lines))
+            if old_count < 0 or first + old_count > len(self.symbols.lines):
+                self.symbols.reset(doc.toPlainText())
+                return
+            new_lines = []
+            block = doc.findBlockByNumber(first)
+            for _ in range(new_count):
+                new_lines.append(block.text())
+                block = block.next()
+            self.symbols.update(first, old_count, new_lines)
+        except Exception:
+            self.symbols.reset(self.editor.toPlainText())
+
     def handle_keypress(self, e) -> bool:
+        if not self.enabled:
+            return False
         try:
             if self.popup.isVisible():
                 if e.key() in (
@@ -145,6 +186,7 @@ class GXAutoComplete:
             return
 
         items = []
+        ranked = []
         replace_len = len(prefix or "")
 
         if self.base_mode == "py":
@@ -160,6 +202,7 @@ class GXAutoComplete:
                 items.extend(py_items)
             items.extend(self._simple(prefix, self.gx_keywords))
         else:
+            ranked = self.symbols.complete(prefix, cur.blockNumber()) if prefix else []
             items.extend(self._simple(prefix, self.gx_keywords))
             if self.include_lua:
                 items.extend(self._simple(prefix, self.lua_keywords))
@@ -168,6 +211,9 @@ class GXAutoComplete:
                 items.extend(py_items)
 
         items = self._dedupe(items)
+        if ranked:
+            taken = {name.lower() for name, _ in ranked}
+            items = ranked + [it for it in items if it[0].lower() not in taken]
 
         if not items:
             self.popup.hide()
@@ -203,6 +249,7 @@ class GXAutoComplete:
         line = cur.blockNumber() + 1
         col = cur.positionInBlock()
         try:
+            import jedi
             script = jedi.Script(code=code, path="<editor>")
             comps = script.complete(line, col)
             items = []
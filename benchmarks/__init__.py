@@ -0,0 +1,3 @@
+from benchmarks.harness import BENCHMARKS, BenchResult, benchmark, run_benchmarks, compare
+
+__all__ = ["BENCHMARKS", "BenchResult", "benchmark", "run_benchmarks", "compare"]
@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import sys
+
+from benchmarks.harness import compare, run_benchmarks, to_json
+from benchmarks import bench_gx, bench_engines, bench_widgets  # noqa: F401  (registers benchmarks)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m benchmarks", description="GXScripter benchmark suite")
+    ap.add_argument("-k", "--filter", help="only run benchmarks whose name contains this text")
+    ap.add_argument("-r", "--repeat", type=int, help="override the number of timed repeats")
+    ap.add_argument("-o", "--output", help="write results JSON to this path")
+    ap.add_argument("-b", "--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    ap.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    ap.add_argument("--threshold", type=float, default=0.10, help="relative change treated as a regression")
+    ap.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 if anything got slower")
+    args = ap.parse_args(argv)
+
+    def report(res):
+        if res.status == "ok":
+            print(f"{res.name:<36} {res.median * 1000:10.3f} ms  (best {res.best * 1000:.3f}, stdev {res.stdev * 1000:.3f})")
+        else:
+            print(f"{res.name:<36} {res.status}: {res.reason}")
+
+    results = run_benchmarks(args.filter, args.repeat, on_result=report)
+    data = to_json(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+    regressions = 0
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print()
+        print(f"compared with {args.baseline}:")
+        for row in compare(data, baseline, args.threshold):
+            if row["ratio"] is None:
+                print(f"  {row['name']:<36} n/a")
+                continue
+            print(f"  {row['name']:<36} x{row['ratio']:.2f}  {row['verdict']}")
+            if row["verdict"] == "slower":
+                regressions += 1
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        print(f"baseline written to {args.baseline}")
+
+    if regressions and args.fail_on_regression:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+from benchmarks.harness import benchmark, sink
+
+from python_engine import PythonEngine
+from lua_engine import LuaEngine
+
+
+@benchmark("python.snippet_call_overhead", group="python", number=200)
+def py_snippet():
+    engine = PythonEngine(console_write=sink, debugger_write=sink)
+    gx_vars = {"x": 1, "name": "gx", "items": list(range(20))}
+    return lambda: engine.execute("y = x + 1", filename="<python>", extra_globals=gx_vars)
+
+
+@benchmark("python.snippet_with_output", group="python", number=50)
+def py_snippet_output():
+    engine = PythonEngine(console_write=sink, debugger_write=sink)
+    code = "for i in range(200):\n    print(i)\n"
+    return lambda: engine.execute(code, filename="<python>")
+
+
+PARALLEL_BODY = "s = 0\nfor i in range(200000):\n    s += i * n\ngx_result = s\n"
+
+
+def _py_map(workers):
+    engine = PythonEngine(console_write=sink, debugger_write=sink)
+    engine.parallel_workers = workers
+    items = tuple(range(16))
+    engine.map(PARALLEL_BODY, "<python>", "n", items)
+    return lambda: engine.map(PARALLEL_BODY, "<python>", "n", items)
+
+
+@benchmark("python.parallel_map_serial", group="python", repeat=5)
+def py_map_serial():
+    return _py_map(1)
+
+
+@benchmark("python.parallel_map_4", group="python", repeat=5)
+def py_map_4():
+    return _py_map(4)
+
+
+def _large_vars():
+    return {
+        "nums": list(range(10000)),
+        "names": [f"item{i}" for i in range(5000)],
+        "nested": [[i, i + 1, {"k": i}] for i in range(2000)],
+        "scalar": 42,
+    }
+
+
+@benchmark("lua.inject_sync_large_tables", group="lua", requires=("lupa",), repeat=5)
+def lua_bridge():
+    engine = LuaEngine(console_write=sink, debugger_write=sink)
+    gx_vars = _large_vars()
+
+    def run():
+        engine.inject_globals(gx_vars)
+        engine.execute("scalar = scalar + #nums", filename="<lua>")
+        engine.sync_back(dict(gx_vars))
+    return run
+
+
+@benchmark("lua.snippet_call_overhead", group="lua", requires=("lupa",), number=500)
+def lua_snippet():
+    engine = LuaEngine(console_write=sink, debugger_write=sink)
+    return lambda: engine.execute("local s = 0 for i = 1, 10 do s = s + i end", filename="<lua>")
+
+
+def _lua_hooked_loop(hook_count, runtime="default"):
+    engine = LuaEngine(console_write=sink, debugger_write=sink, runtime=runtime)
+    engine.hook_count = hook_count
+    engine.idle = lambda: None
+    return lambda: engine.execute("local s = 0 for i = 1, 200000 do s = s + i % 7 end", filename="<lua>")
+
+
+@benchmark("lua.count_hook_off", group="lua", requires=("lupa",), repeat=5)
+def lua_hook_off():
+    return _lua_hooked_loop(0)
+
+
+@benchmark("lua.count_hook_100", group="lua", requires=("lupa",), repeat=5)
+def lua_hook_100():
+    return _lua_hooked_loop(100)
+
+
+@benchmark("lua.count_hook_1000", group="lua", requires=("lupa",), repeat=5)
+def lua_hook_1000():
+    return _lua_hooked_loop(1000)
+
+
+@benchmark("lua.count_hook_10000", group="lua", requires=("lupa",), repeat=5)
+def lua_hook_10000():
+    return _lua_hooked_loop(10000)
+
+
+@benchmark("lua.luajit_count_hook_off", group="lua", requires=("lupa.luajit21",), repeat=5)
+def luajit_hook_off():
+    return _lua_hooked_loop(0, runtime="luajit")
+
+
+@benchmark("lua.luajit_count_hook_10000", group="lua", requires=("lupa.luajit21",), repeat=5)
+def luajit_hook_10000():
+    return _lua_hooked_loop(10000, runtime="luajit")
+
+
+@benchmark("lua.distinct_snippets_uncached", group="lua", requires=("lupa",), number=20)
+def lua_snippets_uncached():
+    engine = LuaEngine(console_write=sink, debugger_write=sink)
+    engine.chunk_cache_size = 0
+    codes = [f"local s = {i} for j = 1, 10 do s = s + j end" for i in range(50)]
+
+    def run():
+        for code in codes:
+            engine.execute(code, filename="<lua>")
+    return run
+
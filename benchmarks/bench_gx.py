@@ -0,0 +1,117 @@
+from benchmarks.harness import benchmark, sink
+
+from gx_engine import GXEngine
+
+
+def make_engine():
+    return GXEngine(console_write=sink, debugger_write=sink, input_request=lambda q: "")
+
+
+def nested_script(depth: int, width: int):
+    lines = []
+    for level in range(depth):
+        pad = "    " * level
+        lines.append(f"{pad}repeat {width}")
+        lines.append(f"{pad}    var.inc c{level}")
+        lines.append(f"{pad}    if c{level} % 2 == 0")
+        lines.append(f"{pad}        var.math = acc, acc + c{level}")
+        lines.append(f"{pad}    elif c{level} % 3 == 0")
+        lines.append(f"{pad}        var.dec acc")
+        lines.append(f"{pad}    else")
+        lines.append(f"{pad}        var.set = last, c{level}")
+        lines.append(f"{pad}    end")
+    for level in reversed(range(depth)):
+        lines.append("    " * level + "end")
+    return "var.set = acc, 0\n" + "\n".join(lines)
+
+
+@benchmark("gx.nested_repeat_if", group="gx", repeat=5)
+def gx_nested():
+    engine = make_engine()
+    code = nested_script(depth=4, width=8)
+    return lambda: engine.execute(code)
+
+
+@benchmark("gx.say_expressions", group="gx", repeat=5)
+def gx_say():
+    engine = make_engine()
+    code = "\n".join([
+        "var.set = a, 3",
+        "var.set = b, 4.5",
+        "var.set = name, \"gx\"",
+        "repeat 2000",
+        "    var.inc i",
+        "    say i, a * b + i, (a + i) ** 2 % 7, name + str(i), [i, i * 2], len(name) > i",
+        "end",
+    ])
+    return lambda: engine.execute(code)
+
+
+@benchmark("gx.large_tables", group="gx", repeat=5)
+def gx_tables():
+    engine = make_engine()
+    code = "\n".join([
+        "var.set = t, []",
+        "repeat 20000",
+        "    var.inc i",
+        "    table.add = t, i * 3",
+        "end",
+        "var.set = j, 0",
+        "repeat len(t)",
+        "    table.get = t, j, v",
+        "    var.math = total, v + j",
+        "    var.inc j",
+        "end",
+    ])
+    return lambda: engine.execute(code)
+
+
+@benchmark("gx.foreach_for", group="gx", repeat=5)
+def gx_foreach():
+    engine = make_engine()
+    code = "\n".join([
+        "var.set = t, list(range(20000))",
+        "var.set = total, 0",
+        "foreach v in t",
+        "    var.math = total, total + v",
+        "end",
+        "for i = 0, 19999, 2",
+        "    if i % 3 == 0",
+        "        continue",
+        "    end",
+        "    var.math = total, total - i",
+        "end",
+    ])
+    return lambda: engine.execute(code)
+
+
+@benchmark("gx.parse_large_script", group="gx", repeat=5)
+def gx_parse():
+    engine = make_engine()
+    code = "\n".join([nested_script(depth=3, width=2)] * 400)
+    return lambda: engine.parse(code)
+
+
+@benchmark("gx.nested_repeat_if_breakpoint", group="gx", repeat=5)
+def gx_nested_breakpoint():
+    engine = make_engine()
+    code = nested_script(depth=4, width=8)
+    engine.on_pause = lambda engine, node, reason: "continue"
+    engine.set_breakpoints({10_000})
+    return lambda: engine.execute(code)
+
+
+@benchmark("gx.nested_repeat_if_traced", group="gx", repeat=5)
+def gx_nested_traced():
+    from tracing import ChromeTracer
+
+    engine = make_engine()
+    code = nested_script(depth=4, width=8)
+
+    def run():
+        tracer = ChromeTracer().attach(engine)
+        try:
+            engine.execute(code)
+        finally:
+            tracer.detach()
+    return run
@@ -0,0 +1,72 @@
+from benchmarks.harness import benchmark, ensure_qapp
+
+
+def _source_lines(n: int):
+    pattern = [
+        'var.set = name, "value with \\"escapes\\" and 123"',
+        "repeat 10",
+        "    var.math = total, (total + 3.5) * 2 - [1, 2, 3][0]",
+        '    say "total", total, name',
+        "    if total >= 100 and name != 'x'",
+        '        debugprint "big" -w',
+        "    end",
+        "end",
+    ]
+    return [pattern[i % len(pattern)] for i in range(n)]
+
+
+@benchmark("highlighter.gx_long_file", group="widgets", requires=("PyQt5",), repeat=5)
+def highlighter_gx():
+    ensure_qapp()
+    from PyQt5.QtGui import QTextDocument
+    from syntax_highlighter import GXHighlighter
+
+    doc = QTextDocument()
+    doc.setPlainText("\n".join(_source_lines(5000)))
+    hl = GXHighlighter(doc)
+    return hl.rehighlight
+
+
+@benchmark("highlighter.block_calls", group="widgets", requires=("PyQt5",), repeat=5)
+def highlighter_blocks():
+    ensure_qapp()
+    from PyQt5.QtGui import QTextDocument
+    from syntax_highlighter import GXHighlighter
+
+    hl = GXHighlighter(QTextDocument())
+    lines = _source_lines(2000)
+
+    def run():
+        for text in lines:
+            hl.highlightBlock(text)
+    return run
+
+
+@benchmark("console.write_throughput", group="widgets", requires=("PyQt5",), repeat=5)
+def console_write():
+    ensure_qapp()
+    from console import GXConsole
+
+    console = GXConsole()
+    lines = [f"line {i}: " + "x" * 40 + "\n" for i in range(2000)]
+
+    def run():
+        console.clear_output()
+        for text in lines:
+            console.write(text)
+    return run
+
+
+@benchmark("debugger.write_throughput", group="widgets", requires=("PyQt5",), repeat=5)
+def debugger_write():
+    ensure_qapp()
+    from debugger import GXDebugger
+
+    debugger = GXDebugger()
+    levels = ("info", "warning", "error")
+
+    def run():
+        debugger.clear()
+        for i in range(2000):
+            debugger.write(f"message {i}", level=levels[i % 3], line=i, source="GX")
+    return run
@@ -0,0 +1,161 @@
+import importlib.util
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field, asdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+FORMAT_VERSION = 1
+
+
+@dataclass
+class Benchmark:
+    name: str
+    group: str
+    factory: object
+    requires: tuple = ()
+    repeat: int = 7
+    number: int = 1
+
+
+@dataclass
+class BenchResult:
+    name: str
+    group: str
+    status: str = "ok"
+    reason: str = ""
+    repeat: int = 0
+    number: int = 0
+    best: float = 0.0
+    median: float = 0.0
+    mean: float = 0.0
+    stdev: float = 0.0
+    samples: list = field(default_factory=list)
+
+
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, group: str, requires=(), repeat: int = 7, number: int = 1):
+    def wrap(factory):
+        BENCHMARKS[name] = Benchmark(name=name, group=group, factory=factory, requires=tuple(requires), repeat=repeat, number=number)
+        return factory
+    return wrap
+
+
+def missing_requirements(requires):
+    return [mod for mod in requires if importlib.util.find_spec(mod) is None]
+
+
+def time_callable(fn, repeat: int, number: int):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - t) / number)
+    return samples
+
+
+def run_one(bench: Benchmark, repeat: int | None = None) -> BenchResult:
+    result = BenchResult(name=bench.name, group=bench.group)
+    missing = missing_requirements(bench.requires)
+    if missing:
+        result.status = "skipped"
+        result.reason = "missing " + ", ".join(missing)
+        return result
+    try:
+        fn = bench.factory()
+        samples = time_callable(fn, repeat or bench.repeat, bench.number)
+    except Exception as e:
+        result.status = "error"
+        result.reason = f"{type(e).__name__}: {e}"
+        return result
+    result.repeat = len(samples)
+    result.number = bench.number
+    result.samples = samples
+    result.best = min(samples)
+    result.median = statistics.median(samples)
+    result.mean = statistics.fmean(samples)
+    result.stdev = statistics.stdev(samples) if len(samples) > 1 else 0.0
+    return result
+
+
+def run_benchmarks(pattern: str | None = None, repeat: int | None = None, on_result=None):
+    results = []
+    for name in sorted(BENCHMARKS):
+        if pattern and pattern not in name:
+            continue
+        res = run_one(BENCHMARKS[name], repeat)
+        if on_result is not None:
+            on_result(res)
+        results.append(res)
+    return results
+
+
+def environment():
+    try:
+        rev = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except Exception:
+        rev = ""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "git_rev": rev,
+    }
+
+
+def to_json(results):
+    return {
+        "format": FORMAT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "results": {r.name: asdict(r) for r in results},
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.10):
+    rows = []
+    base_results = baseline.get("results", {})
+    for name, cur in sorted(current.get("results", {}).items()):
+        base = base_results.get(name)
+        if cur.get("status") != "ok" or not base or base.get("status") != "ok" or not base.get("median"):
+            rows.append({"name": name, "verdict": "n/a", "ratio": None})
+            continue
+        ratio = cur["median"] / base["median"]
+        if ratio > 1.0 + threshold:
+            verdict = "slower"
+        elif ratio < 1.0 - threshold:
+            verdict = "faster"
+        else:
+            verdict = "same"
+        rows.append({"name": name, "verdict": verdict, "ratio": ratio, "baseline": base["median"], "current": cur["median"]})
+    return rows
+
+
+_QAPP = None
+
+
+def ensure_qapp():
+    global _QAPP
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    _QAPP = QApplication.instance() or QApplication([])
+    return _QAPP
+
+
+def sink(*args, **kwargs):
+    pass
@@ -0,0 +1,129 @@
+import copy
+from dataclasses import dataclass
+
+from gx_engine import reads_input, walk_nodes
+
+import settings
+
+OPAQUE_KINDS = ("py_snippet", "lua_snippet", "call")
+
+
+@dataclass
+class Checkpoint:
+    index: int
+    line: int
+    delta: dict
+
+
+def _stops_recording(engine, nodes, seen=None):
+    """True if running nodes asks for input or runs a snippet, also inside called funcs.
+
+    Snippet globals are not part of a checkpoint, so once a snippet has run a
+    resumed run could see different Python or Lua state than a full run.
+    """
+    seen = set() if seen is None else seen
+    for n in walk_nodes(nodes):
+        if reads_input(n) or n.kind.endswith("_snippet"):
+            return True
+        if n.kind == "call":
+            fn = n.target or engine.functions.get(n.args[0])
+            if fn is not None and id(fn) not in seen:
+                seen.add(id(fn))
+                if _stops_recording(engine, fn.body, seen):
+                    return True
+    return False
+
+
+def _func_sources(program, lines):
+    return tuple(
+        "\n".join(lines[n.line - 1:n.end_line])
+        for n in program.body if n.kind == "func"
+    )
+
+
+class CheckpointLog:
+    def __init__(self, limit: int | None = None):
+        self.limit = limit or settings.CHECKPOINT_LIMIT
+        self.entries: list[Checkpoint] = []
+        self.dirty = set()
+        self.recording = False
+        self.resumed_line = None
+        self._lines = None
+        self._key = None
+
+    def clear(self):
+        self.entries = []
+        self._lines = None
+        self._key = None
+
+    def plan(self, engine, lines):
+        if self._lines is None or self._key != self._run_key(engine, lines):
+            return None
+        old = self._lines
+        first = 0
+        limit = min(len(old), len(lines))
+        while first < limit and old[first] == lines[first]:
+            first += 1
+        changed_line = first + 1 if first < max(len(old), len(lines)) else len(lines) + 1
+
+        body = engine.program.body
+        for k in range(len(self.entries) - 1, -1, -1):
+            cp = self.entries[k]
+            if cp.line > changed_line:
+                continue
+            if cp.index >= len(body) or body[cp.index].line != cp.line:
+                continue
+            return k
+        return None
+
+    def restore(self, k):
+        merged = {}
+        for cp in self.entries[:k + 1]:
+            merged.update(cp.delta)
+        return copy.deepcopy(merged)
+
+    def begin(self, engine, lines, keep=0):
+        self.entries = self.entries[:keep]
+        self._lines = list(lines)
+        self._key = self._run_key(engine, lines)
+        self.recording = not any(_stops_recording(engine, m.program.body) for m in engine.modules)
+        self.dirty = set() if keep else set(engine.vars)
+
+    def take(self, engine, index, node):
+        if not self.recording:
+            return
+        scope = engine.vars
+        try:
+            delta = {name: copy.deepcopy(scope[name]) for name in self.dirty if name in scope}
+        except Exception:
+            self.recording = False
+            return
+        self.dirty.clear()
+        self.entries.append(Checkpoint(index, node.line, delta))
+        if len(self.entries) > self.limit:
+            self._thin()
+
+    def after(self, engine, node):
+        if not self.recording:
+            return
+        if _stops_recording(engine, [node]):
+            self.recording = False
+            return
+        if any(n.kind in OPAQUE_KINDS for n in walk_nodes([node])):
+            self.dirty.update(engine.vars)
+
+    def _thin(self):
+        kept = [self.entries[0]]
+        rest = self.entries[1:]
+        for i in range(0, len(rest) - 1, 2):
+            a, b = rest[i], rest[i + 1]
+            merged = dict(a.delta)
+            merged.update(b.delta)
+            kept.append(Checkpoint(b.index, b.line, merged))
+        if len(rest) % 2:
+            kept.append(rest[-1])
+        self.entries = kept
+
+    def _run_key(self, engine, lines):
+        modules = tuple((m.path, m.digest) for m in engine.modules)
+        return (engine.script_path, repr(engine.program.flags), modules, _func_sources(engine.program, lines))
@@ -0,0 +1,176 @@
+import bisect
+import re
+from dataclasses import dataclass, field
+
+TOKEN_RE = re.compile(r"\w+")
+FACET_RE = re.compile(r"^(source|level|line):(\S+)$", re.IGNORECASE)
+
+
+def tokenize(text: str):
+    return TOKEN_RE.findall(text.lower())
+
+
+@dataclass
+class DebugQuery:
+    terms: list = field(default_factory=list)
+    prefix: str = ""
+    sources: set = field(default_factory=set)
+    levels: set = field(default_factory=set)
+    line_range: tuple | None = None
+
+    def empty(self):
+        return not (self.terms or self.prefix or self.sources or self.levels or self.line_range)
+
+
+def parse_query(text: str, sources=(), levels=(), line_range=None) -> DebugQuery:
+    q = DebugQuery(sources=set(sources), levels=set(levels), line_range=line_range)
+    words = []
+    for part in text.split():
+        m = FACET_RE.match(part)
+        if not m:
+            words.extend(tokenize(part))
+            continue
+        facet, value = m.group(1).lower(), m.group(2)
+        if facet == "source":
+            q.sources.add(value.upper())
+        elif facet == "level":
+            q.levels.add(value.lower())
+        else:
+            lo, _, hi = value.partition("-")
+            try:
+                q.line_range = (int(lo), int(hi or lo))
+            except ValueError:
+                words.extend(tokenize(value))
+    if words:
+        if text[-1:].isspace():
+            q.terms = words
+        else:
+            q.terms, q.prefix = words[:-1], words[-1]
+    return q
+
+
+class DebugIndex:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.entries = {}
+        self.postings = {}
+        self.by_source = {}
+        self.by_level = {}
+        self.by_line = {}
+        self._next_id = 0
+        self._vocab = None
+
+    def add(self, entry) -> int:
+        eid = self._next_id
+        self._next_id += 1
+        self.entries[eid] = entry
+        for tok in set(tokenize(entry.message)):
+            ids = self.postings.get(tok)
+            if ids is None:
+                ids = self.postings[tok] = []
+                self._vocab = None
+            ids.append(eid)
+        self.by_source.setdefault(entry.source.upper(), []).append(eid)
+        self.by_level.setdefault(entry.level, []).append(eid)
+        if entry.line is not None:
+            self.by_line.setdefault(entry.line, []).append(eid)
+        return eid
+
+    def remove(self, ids):
+        """Drops entries and their ids from every posting list; emptied lists are deleted."""
+        dead = set()
+        tokens, sources, levels, lines = set(), set(), set(), set()
+        for eid in ids:
+            entry = self.entries.pop(eid, None)
+            if entry is None:
+                continue
+            dead.add(eid)
+            tokens.update(tokenize(entry.message))
+            sources.add(entry.source.upper())
+            levels.add(entry.level)
+            if entry.line is not None:
+                lines.add(entry.line)
+        for table, keys in ((self.postings, tokens), (self.by_source, sources), (self.by_level, levels), (self.by_line, lines)):
+            for key in keys:
+                kept = [i for i in table[key] if i not in dead]
+                if kept:
+                    table[key] = kept
+                else:
+                    del table[key]
+                    if table is self.postings:
+                        self._vocab = None
+
+    def sources(self):
+        return sorted(self.by_source)
+
+    def search(self, query: DebugQuery, limit: int | None = None):
+        if query.empty():
+            ids = list(self.entries)
+            return ids[-limit:] if limit else ids
+
+        candidates = []
+        for term in query.terms:
+            candidates.append(self.postings.get(term, ()))
+        if query.prefix:
+            candidates.append(self._prefix_ids(query.prefix))
+        if query.sources:
+            candidates.append(self._union(self.by_source.get(s, ()) for s in query.sources))
+        if query.levels:
+            candidates.append(self._union(self.by_level.get(lv, ()) for lv in query.levels))
+        if query.line_range:
+            lo, hi = query.line_range
+            if hi - lo < len(self.by_line):
+                lines = (self.by_line.get(n, ()) for n in range(lo, hi + 1))
+            else:
+                lines = (ids for n, ids in self.by_line.items() if lo <= n <= hi)
+            candidates.append(self._union(lines))
+
+        candidates.sort(key=len)
+        result = candidates[0]
+        for other in candidates[1:]:
+            if not result:
+                break
+            other = other if isinstance(other, set) else set(other)
+            result = [i for i in result if i in other]
+        live = self.entries
+        out = sorted(i for i in result if i in live)
+        return out[-limit:] if limit else out
+
+    def matches(self, eid: int, query: DebugQuery) -> bool:
+        entry = self.entries.get(eid)
+        if entry is None:
+            return False
+        if query.sources and entry.source.upper() not in query.sources:
+            return False
+        if query.levels and entry.level not in query.levels:
+            return False
+        if query.line_range:
+            if entry.line is None or not (query.line_range[0] <= entry.line <= query.line_range[1]):
+                return False
+        tokens = set(tokenize(entry.message))
+        if any(t not in tokens for t in query.terms):
+            return False
+        if query.prefix and not any(t.startswith(query.prefix) for t in tokens):
+            return False
+        return True
+
+    def _prefix_ids(self, prefix):
+        if self._vocab is None:
+            self._vocab = sorted(self.postings)
+        vocab = self._vocab
+        i = bisect.bisect_left(vocab, prefix)
+        lists = []
+        while i < len(vocab) and vocab[i].startswith(prefix):
+            lists.append(self.postings[vocab[i]])
+            i += 1
+        if len(lists) == 1:
+            return lists[0]
+        return self._union(lists)
+
+    def _union(self, lists):
+        out = set()
+        for ids in lists:
+            out.update(ids)
+        return out
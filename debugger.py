@@ -1,7 +1,15 @@
+from bisect import bisect_right
 from dataclasses import dataclass
 from datetime import datetime
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QPlainTextEdit, QLabel, QSizePolicy
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QPlainTextEdit, QLabel, QSizePolicy,
+    QLineEdit, QComboBox
+)
+from PyQt5.QtCore import Qt, QEvent, QTimer, pyqtSignal
+
+from debug_index import DebugIndex, parse_query
+
+import settings
 
 
 @dataclass
@@ -14,9 +22,17 @@ class DebugEntry:
 
 
 class GXDebugger(QWidget):
+    line_activated = pyqtSignal(int)
+
     def __init__(self):
         super().__init__()
         self.entries: list[DebugEntry] = []
+        self.index = DebugIndex()
+        self._ids: list[int] = []
+        self._shown: list[int] = []
+        # First text block of each shown entry; multi-line messages span several blocks.
+        self._starts: list[int] = []
+        self._query = parse_query("")
         self.show_info = True
         self.show_warning = True
         self.show_error = True
@@ -45,15 +61,38 @@ class GXDebugger(QWidget):
         top.addWidget(self.btn_error)
         top.addWidget(self.btn_clear)
 
+        self.search = QLineEdit()
+        self.search.setPlaceholderText("Search  (source:PY  level:error  line:10-40)")
+        self.search.setClearButtonEnabled(True)
+
+        self.source_box = QComboBox()
+        self.source_box.addItem("All sources")
+
+        self.count_label = QLabel("")
+
+        search_row = QHBoxLayout()
+        search_row.addWidget(self.search, 1)
+        search_row.addWidget(self.source_box)
+        search_row.addWidget(self.count_label)
+
         self.view = QPlainTextEdit()
         self.view.setReadOnly(True)
         self.view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.view.viewport().installEventFilter(self)
 
         root = QVBoxLayout()
         root.addLayout(top)
+        root.addLayout(search_row)
         root.addWidget(self.view)
         self.setLayout(root)
 
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(120)
+        self.search_timer.timeout.connect(self._apply_filter)
+        self.search.textChanged.connect(lambda _: self.search_timer.start())
+        self.source_box.currentIndexChanged.connect(lambda _: self._apply_filter())
+
         self.btn_info.toggled.connect(self._toggle_info)
         self.btn_warning.toggled.connect(self._toggle_warning)
         self.btn_error.toggled.connect(self._toggle_error)
@@ -63,15 +102,68 @@ class GXDebugger(QWidget):
 
     def clear(self):
         self.entries.clear()
+        self.index.clear()
+        self._ids = []
+        self._shown = []
+        self._starts = []
         self.view.setPlainText("")
+        while self.source_box.count() > 1:
+            self.source_box.removeItem(self.source_box.count() - 1)
+        self._update_count()
 
     def write(self, message: str, level: str = "info", line: int | None = None, source: str = "GX"):
         level = (level or "info").lower().strip()
         if level not in ("info", "warning", "error"):
             level = "info"
         ts = datetime.now().strftime("%H:%M:%S")
-        self.entries.append(DebugEntry(ts=ts, level=level, source=source, line=line, message=str(message)))
-        self._render_append(self.entries[-1])
+        entry = DebugEntry(ts=ts, level=level, source=source, line=line, message=str(message))
+        self.entries.append(entry)
+        self._ids.append(self._add_to_index(entry))
+        self._render_append(entry, self._ids[-1])
+
+    def set_diagnostics(self, diagnostics, source: str = "LINT"):
+        old = [(e.line, e.level, e.message) for e in self.entries if e.source == source]
+        new = [(d.line, d.level, d.message) for d in diagnostics]
+        if old == new:
+            return
+        ts = datetime.now().strftime("%H:%M:%S")
+        keep = [(e, i) for e, i in zip(self.entries, self._ids) if e.source != source]
+        self.index.remove(i for e, i in zip(self.entries, self._ids) if e.source == source)
+        self.entries = [e for e, _ in keep]
+        self._ids = [i for _, i in keep]
+        for line, level, message in new:
+            entry = DebugEntry(ts=ts, level=level, source=source, line=line, message=message)
+            self.entries.append(entry)
+            self._ids.append(self._add_to_index(entry))
+        self._rerender()
+
+    def _add_to_index(self, entry):
+        source = entry.source.upper()
+        if source not in self.index.by_source and self.source_box.findText(source) < 0:
+            self.source_box.addItem(source)
+        return self.index.add(entry)
+
+    def _apply_filter(self):
+        source = self.source_box.currentText() if self.source_box.currentIndex() > 0 else None
+        levels = {lv for lv, on in (("info", self.show_info), ("warning", self.show_warning), ("error", self.show_error)) if on}
+        query = parse_query(self.search.text(), sources=[source] if source else ())
+        if len(levels) < 3:
+            query.levels = (query.levels & levels) if query.levels else levels
+            if not query.levels:
+                query.levels = {"none"}
+        self._query = query
+        self._rerender()
+
+    def eventFilter(self, obj, event):
+        if obj is self.view.viewport() and event.type() == QEvent.MouseButtonDblClick:
+            block = self.view.cursorForPosition(event.pos()).blockNumber()
+            row = bisect_right(self._starts, block) - 1
+            if 0 <= row < len(self._shown):
+                entry = self.index.entries.get(self._shown[row])
+                if entry is not None and entry.line is not None:
+                    self.line_activated.emit(entry.line)
+                    return True
+        return super().eventFilter(obj, event)
 
     def info(self, message: str, line: int | None = None, source: str = "GX"):
         self.write(message, "info", line, source)
@@ -84,24 +176,22 @@ class GXDebugger(QWidget):
 
     def _toggle_info(self, v: bool):
         self.show_info = v
-        self._rerender()
+        self._apply_filter()
 
     def _toggle_warning(self, v: bool):
         self.show_warning = v
-        self._rerender()
+        self._apply_filter()
 
     def _toggle_error(self, v: bool):
         self.show_error = v
-        self._rerender()
+        self._apply_filter()
 
-    def _allowed(self, level: str) -> bool:
-        if level == "info":
-            return self.show_info
-        if level == "warning":
-            return self.show_warning
-        if level == "error":
-            return self.show_error
-        return True
+    def _update_count(self):
+        total = len(self.index.entries)
+        if self._query.empty() or not total:
+            self.count_label.setText("")
+        else:
+            self.count_label.setText(f"{len(self._shown)} of {total}")
 
     def _fmt(self, e: DebugEntry) -> str:
         lvl = e.level.upper()
@@ -110,21 +200,30 @@ class GXDebugger(QWidget):
             where += f":{e.line}"
         return f"[{e.ts}] [{lvl}] [{where}] {e.message}"
 
-    def _render_append(self, entry: DebugEntry):
-        if not self._allowed(entry.level):
+    def _render_append(self, entry: DebugEntry, eid: int):
+        if not self._query.empty() and not self.index.matches(eid, self._query):
             return
-        cur = self.view.toPlainText()
         line = self._fmt(entry)
-        if not cur:
+        if not self._shown:
+            self._starts.append(0)
             self.view.setPlainText(line)
         else:
+            self._starts.append(self.view.blockCount())
             self.view.appendPlainText(line)
+        self._shown.append(eid)
         self.view.moveCursor(self.view.textCursor().End)
+        if not self._query.empty():
+            self._update_count()
 
     def _rerender(self):
-        out = []
-        for e in self.entries:
-            if self._allowed(e.level):
-                out.append(self._fmt(e))
-        self.view.setPlainText("\n".join(out))
-        self.view.moveCursor(self.view.textCursor().End)
\ No newline at end of file
+        self._shown = self.index.search(self._query, limit=settings.DEBUGGER_RENDER_LIMIT)
+        entries = self.index.entries
+        lines = [self._fmt(entries[i]) for i in self._shown]
+        self._starts = []
+        block = 0
+        for line in lines:
+            self._starts.append(block)
+            block += line.count("\n") + 1
+        self.view.setPlainText("\n".join(lines))
+        self.view.moveCursor(self.view.textCursor().End)
+        self._update_count()
\ No newline at end of file
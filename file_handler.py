@@ -1,20 +1,36 @@
+import codecs
+import io
+import mmap
+import os
+import shutil
+import tempfile
 from dataclasses import dataclass
 from PyQt5.QtWidgets import QFileDialog, QMessageBox
 
+import settings
+
+# Yielded by FileHandler._iter_chunks when the text loaded so far must be dropped and loading starts over.
+RELOAD = object()
+
 
 @dataclass
 class FileState:
     path: str | None = None
     dirty: bool = False
     mode: str = "gx"
+    size: int = 0
+    encoding: str = "utf-8"
+    large: bool = False
 
 
 class FileHandler:
-    def __init__(self, parent, set_title, get_text, set_text):
+    def __init__(self, parent, set_title, get_text, set_text, load_chunks=None, on_saved=None):
         self.parent = parent
         self.set_title = set_title
         self.get_text = get_text
         self.set_text = set_text
+        self.load_chunks = load_chunks
+        self.on_saved = on_saved
         self.state = FileState()
 
     def new_file(self):
@@ -38,21 +54,85 @@ class FileHandler:
             return None
         return self.open_path(path)
 
+    def open_file(self, path: str):
+        if not self._confirm_discard_or_save():
+            return None
+        return self.open_path(path)
+
     def open_path(self, path: str):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                text = f.read()
-        except UnicodeDecodeError:
-            with open(path, "r", encoding="latin-1") as f:
-                text = f.read()
+        size = os.path.getsize(path)
+        large = size >= settings.LARGE_FILE_BYTES and self.load_chunks is not None
 
         self.state.path = path
         self.state.dirty = False
-        self.state.mode = self._detect_mode(path, text)
-        self.set_text(text)
+        self.state.size = size
+        self.state.large = large
+
+        if large:
+            encoding, head = self._sniff_encoding(path)
+            self.state.encoding = encoding
+            self.state.mode = self._detect_mode(path, head)
+            self.load_chunks(self._iter_chunks(path, encoding))
+        else:
+            text, encoding = self._read_small(path)
+            self.state.encoding = encoding
+            self.state.mode = self._detect_mode(path, text)
+            self.set_text(text)
         self._update_title()
         return self.state
 
+    def _read_small(self, path: str):
+        with open(path, "rb") as f:
+            data = f.read()
+        for encoding in ("utf-8", "latin-1"):
+            try:
+                text = data.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+        return text.replace("\r\n", "\n").replace("\r", "\n"), encoding
+
+    def _sniff_encoding(self, path: str):
+        with open(path, "rb") as f:
+            sample = f.read(settings.ENCODING_SAMPLE_BYTES)
+        encoding = "utf-8"
+        for bom, name in ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16")):
+            if sample.startswith(bom):
+                encoding = name
+                break
+        try:
+            return encoding, codecs.getincrementaldecoder(encoding)().decode(sample)
+        except UnicodeDecodeError:
+            return "latin-1", sample.decode("latin-1")
+
+    def _iter_chunks(self, path: str, encoding: str):
+        """Decodes strictly; bytes past the sniffed sample that are not valid in
+        encoding make it yield RELOAD and start over as latin-1, which maps every
+        byte, so nothing is replaced with U+FFFD."""
+        try:
+            yield from self._decode_chunks(path, encoding)
+        except UnicodeDecodeError:
+            if encoding == "latin-1":
+                raise
+            self.state.encoding = "latin-1"
+            yield RELOAD
+            yield from self._decode_chunks(path, "latin-1")
+
+    def _decode_chunks(self, path: str, encoding: str):
+        decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(encoding)(), translate=True)
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                step = settings.LOAD_CHUNK_BYTES
+                for pos in range(0, len(mm), step):
+                    text = decoder.decode(mm[pos:pos + step])
+                    if text:
+                        yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
     def save(self):
         if self.state.path is None:
             return self.save_as()
@@ -81,15 +161,53 @@ class FileHandler:
 
     def _write(self, path: str):
         try:
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(self.get_text())
+            self._atomic_write(path, self.get_text())
         except Exception as e:
             QMessageBox.critical(self.parent, "Save Failed", str(e))
             return False
         self.state.dirty = False
+        self.state.encoding = "utf-8"
         self._update_title()
+        if self.on_saved is not None:
+            self.on_saved(path)
         return True
 
+    def _atomic_write(self, path: str, text: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            try:
+                if os.path.exists(path):
+                    shutil.copymode(path, tmp)
+                else:
+                    # mkstemp creates the file as 0600; a new script gets the usual umask-based mode.
+                    umask = os.umask(0)
+                    os.umask(umask)
+                    os.chmod(tmp, 0o666 & ~umask)
+            except OSError:
+                pass
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+        if hasattr(os, "O_DIRECTORY"):
+            try:
+                dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+                try:
+                    os.fsync(dir_fd)
+                finally:
+                    os.close(dir_fd)
+            except OSError:
+                pass
+
     def _confirm_discard_or_save(self):
         if not self.state.dirty:
             return True
@@ -112,7 +230,7 @@ class FileHandler:
     def _detect_mode(self, path: str, text: str):
         low = path.lower()
         first = ""
-        for ln in text.splitlines():
+        for ln in io.StringIO(text):
             if ln.strip():
                 first = ln.strip()
                 break
@@ -0,0 +1,357 @@
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+from gx_engine import GXRuntimeError
+from headless import HeadlessRunner
+from input_providers import load_inputs
+
+import settings
+
+PROTOCOL_VERSION = 1
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+class DaemonError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+def default_socket_path():
+    if settings.DAEMON_SOCKET:
+        return settings.DAEMON_SOCKET
+    user = getattr(os, "getuid", lambda: os.environ.get("USERNAME", "user"))()
+    return os.path.join(tempfile.gettempdir(), f"gxscript-{user}.sock")
+
+
+def _jsonable(value):
+    try:
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        return repr(value)
+
+
+def _debug_json(d):
+    return {"message": d.message, "level": d.level, "line": d.line, "source": d.source}
+
+
+def _message(method, params, msg_id=None):
+    msg = {"jsonrpc": "2.0", "method": method, "params": params}
+    if msg_id is not None:
+        msg["id"] = msg_id
+    return msg
+
+
+class GXDaemon:
+    def __init__(self, cache_dir=None):
+        self.runner = HeadlessRunner(inputs=[], cache_dir=cache_dir)
+        self.runner.gx_engine.program_cache_size = settings.DAEMON_PROGRAM_CACHE
+        self.lock = threading.Lock()
+        self.runs = 0
+        self.started = time.time()
+        self.server = None
+        self._methods = {
+            "run": self.run,
+            "ping": self.ping,
+            "stats": self.stats,
+            "shutdown": self.shutdown,
+        }
+
+    def warm(self):
+        self.runner.py_engine
+        try:
+            self.runner.lua_engine.lua
+        except ImportError:
+            pass
+
+    def handle(self, msg, send):
+        if not isinstance(msg, dict) or msg.get("jsonrpc") != "2.0" or not isinstance(msg.get("method"), str):
+            raise DaemonError(INVALID_REQUEST, "Invalid JSON-RPC request")
+        fn = self._methods.get(msg["method"])
+        if fn is None:
+            raise DaemonError(METHOD_NOT_FOUND, "Unknown method: " + msg["method"])
+        params = msg.get("params") or {}
+        if not isinstance(params, dict):
+            raise DaemonError(INVALID_PARAMS, "params must be an object")
+        return fn(params, send, msg.get("id"))
+
+    def ping(self, params, send, run_id):
+        return {"version": PROTOCOL_VERSION, "pid": os.getpid()}
+
+    def stats(self, params, send, run_id):
+        runner = self.runner
+        out = {"runs": self.runs, "uptime": time.time() - self.started, "programs": len(runner.gx_engine._programs)}
+        if runner.cache is not None:
+            out["cache"] = {"hits": runner.cache.hits, "misses": runner.cache.misses, "skipped": runner.cache.skipped}
+        if runner._lua_engine is not None:
+            out["lua_chunks"] = {"hits": runner._lua_engine.chunk_hits, "compiles": runner._lua_engine.chunk_compiles}
+        return out
+
+    def shutdown(self, params, send, run_id):
+        if self.server is not None:
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        return True
+
+    def run(self, params, send, run_id):
+        code, path = params.get("code"), params.get("path")
+        if code is None and path is None:
+            raise DaemonError(INVALID_PARAMS, "run needs code or path")
+        if code is None:
+            try:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    code = f.read()
+            except OSError as e:
+                raise DaemonError(INVALID_PARAMS, f"Cannot read {path}: {e}")
+            path = os.path.abspath(path)
+        code = code.replace("\r\n", "\n")
+        try:
+            inputs = load_inputs(params.get("inputs") or [])
+        except (OSError, ValueError) as e:
+            raise DaemonError(INVALID_PARAMS, f"Cannot load inputs: {e}")
+        limits = params.get("limits") or {}
+        stream = params.get("stream", True)
+
+        with self.lock:
+            return self._run(code, path, inputs, limits, params.get("reset", True), send if stream else None, run_id)
+
+    def _run(self, code, path, inputs, limits, reset, send, run_id):
+        runner = self.runner
+        lua = runner._lua_engine
+        if reset:
+            if runner._py_engine is not None:
+                runner._py_engine.reset_session()
+            if lua is not None and lua._lua is not None:
+                g = lua._lua.globals()
+                for name in lua.user_globals():
+                    g[name] = None
+
+        if send is not None:
+            runner.console.echo = lambda text: send(_message("console", {"run": run_id, "text": text}))
+            runner.on_debug = lambda d: send(_message("debug", dict(_debug_json(d), run=run_id)))
+        runner.input.use(inputs)
+
+        timeout = limits.get("timeout")
+        deadline = time.perf_counter() + timeout if timeout else None
+        check = None
+        if deadline is not None:
+            def _timeout_check(node):
+                if time.perf_counter() > deadline:
+                    raise GXRuntimeError(f"Run timed out after {timeout:g} s", node.line)
+            check = _timeout_check
+            runner.gx_engine.hooks.add("line", check)
+        saved_lua = None
+        if timeout or limits.get("lua_cpu_seconds") or limits.get("lua_max_instructions"):
+            lua = runner.lua_engine
+            saved_lua = (lua.cpu_budget, lua.max_instructions)
+            lua.cpu_budget = limits.get("lua_cpu_seconds") or timeout or lua.cpu_budget
+            lua.max_instructions = limits.get("lua_max_instructions") or lua.max_instructions
+
+        t0 = time.perf_counter()
+        try:
+            result = runner.run(code, path=path)
+        finally:
+            runner.console.echo = None
+            runner.on_debug = None
+            runner.input.reset()
+            if check is not None:
+                runner.gx_engine.hooks.remove("line", check)
+            if saved_lua is not None:
+                lua.cpu_budget, lua.max_instructions = saved_lua
+        self.runs += 1
+
+        error = str(result.error) if result.error is not None else None
+        if error is None and not result.ok:
+            error = next(d.message for d in result.debug if d.level == "error")
+        return {
+            "ok": result.ok,
+            "output": result.output,
+            "debug": [_debug_json(d) for d in result.debug],
+            "vars": {str(k): _jsonable(v) for k, v in result.vars.items()},
+            "error": error,
+            "answers": result.answers,
+            "cached": result.cached,
+            "elapsed_ms": (time.perf_counter() - t0) * 1000,
+        }
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        daemon = self.server.gx
+        write_lock = threading.Lock()
+
+        def send(msg):
+            data = (json.dumps(msg) + "\n").encode("utf-8")
+            with write_lock:
+                self.wfile.write(data)
+                self.wfile.flush()
+
+        for raw in self.rfile:
+            if not raw.strip():
+                continue
+            msg_id = None
+            try:
+                msg = json.loads(raw)
+                msg_id = msg.get("id") if isinstance(msg, dict) else None
+                result = daemon.handle(msg, send)
+                reply = {"jsonrpc": "2.0", "id": msg_id, "result": result}
+            except json.JSONDecodeError as e:
+                reply = {"jsonrpc": "2.0", "id": None, "error": {"code": PARSE_ERROR, "message": str(e)}}
+            except DaemonError as e:
+                reply = {"jsonrpc": "2.0", "id": msg_id, "error": {"code": e.code, "message": str(e)}}
+            except Exception as e:
+                reply = {"jsonrpc": "2.0", "id": msg_id, "error": {"code": INTERNAL_ERROR, "message": f"{type(e).__name__}: {e}"}}
+            if msg_id is None and "result" in reply:
+                continue
+            try:
+                send(reply)
+            except OSError:
+                return
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(path=None, cache_dir=None):
+    path = path or default_socket_path()
+    if os.path.exists(path):
+        try:
+            DaemonClient(path).call("ping")
+        except (OSError, DaemonError):
+            os.remove(path)
+        else:
+            raise RuntimeError(f"A GX daemon is already listening on {path}")
+
+    daemon = GXDaemon(cache_dir=cache_dir)
+    daemon.warm()
+    old_umask = os.umask(0o077)
+    try:
+        server = _Server(path, _Handler)
+    finally:
+        os.umask(old_umask)
+    server.gx = daemon
+    daemon.server = server
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        if daemon.runner._py_engine is not None:
+            daemon.runner._py_engine.shutdown()
+
+
+class DaemonClient:
+    def __init__(self, path=None, timeout=None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path or default_socket_path())
+        self.file = self.sock.makefile("rwb")
+        self._next_id = 0
+
+    def call(self, method, params=None, on_event=None):
+        self._next_id += 1
+        msg_id = self._next_id
+        self.file.write((json.dumps(_message(method, params or {}, msg_id)) + "\n").encode("utf-8"))
+        self.file.flush()
+        for raw in self.file:
+            msg = json.loads(raw)
+            if "method" in msg:
+                if on_event is not None:
+                    on_event(msg["method"], msg["params"])
+                continue
+            if msg.get("id") != msg_id:
+                continue
+            if "error" in msg:
+                raise DaemonError(msg["error"]["code"], msg["error"]["message"])
+            return msg["result"]
+        raise DaemonError(INTERNAL_ERROR, "GX daemon closed the connection")
+
+    def run(self, code=None, path=None, on_event=None, **params):
+        params.update({k: v for k, v in (("code", code), ("path", path)) if v is not None})
+        return self.call("run", params, on_event)
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python gx_daemon.py", description="Keep GX engines warm and run scripts over a local JSON-RPC socket")
+    ap.add_argument("--socket", default=None, help="Unix socket path (default: GX_DAEMON_SOCKET or a per-user file in the temp dir)")
+    ap.add_argument("--cache", default=settings.RUN_CACHE_DIR, help="run-result cache directory shared by all requests")
+    ap.add_argument("--run", nargs="+", metavar="SCRIPT", help="send scripts to a running daemon instead of serving")
+    ap.add_argument("-i", "--inputs", help="answers for --run: a text file or a recorded .json session")
+    ap.add_argument("--timeout", type=float, help="per-script time limit for --run, in seconds")
+    ap.add_argument("--stop", action="store_true", help="stop a running daemon")
+    args = ap.parse_args(argv)
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("gx_daemon needs Unix domain sockets, which this platform does not provide", file=sys.stderr)
+        return 2
+
+    if args.stop or args.run:
+        try:
+            client = DaemonClient(args.socket)
+        except OSError as e:
+            print(f"No GX daemon is running: {e}", file=sys.stderr)
+            return 2
+        with client:
+            if args.stop:
+                client.call("shutdown")
+                return 0
+            return _run_scripts(client, args)
+
+    try:
+        serve(args.socket, cache_dir=args.cache)
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 2
+    return 0
+
+
+def _run_scripts(client, args):
+    def on_event(method, params):
+        if method == "console":
+            sys.stdout.write(params["text"])
+        elif method == "debug":
+            where = f":{params['line']}" if params.get("line") else ""
+            print(f"[{params['source']} {params['level']}] {script}{where} {params['message']}", file=sys.stderr)
+
+    inputs = None
+    if args.inputs:
+        inputs = load_inputs(args.inputs).values
+    limits = {"timeout": args.timeout} if args.timeout else {}
+    failed = 0
+    for script in args.run:
+        result = client.run(path=os.path.abspath(script), inputs=inputs, limits=limits, on_event=on_event)
+        if not result["ok"]:
+            failed += 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,306 +1,1274 @@
 import re
 import ast
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from hooks import EngineHooks, TrackedVars
+from input_providers import InputExhausted
+from py_pool import SnippetMapError
+
+import settings
+
 
 class GXRuntimeError(Exception):
-    def __init__(self, message, line):
+    def __init__(self, message, line, path=None):
         super().__init__(message)
         self.line = line
+        self.path = path
 
-class GXEngine:
-    def __init__(self, console_write, debugger_write, input_request, run_python_block=None, run_lua_block=None):
-        self.vars = {}
-        self.console_write = console_write
-        self.debugger_write = debugger_write
-        self.input_request = input_request
-        self.run_python_block = run_python_block
-        self.run_lua_block = run_lua_block
-        self.lines = []
-        self.current_line = 0
-        self.flags = {"include_python": False, "include_lua": False}
+    def __reduce__(self):
+        return (self.__class__, (str(self), self.line, self.path))
 
-    def execute(self, code):
-        self.vars = {}
-        self.lines = code.split("\n")
-        self.current_line = 0
-        self.flags = self._scan_directives()
-        self._execute_block(0, len(self.lines))
 
-    def _scan_directives(self):
-        inc_py = False
-        inc_lua = False
-        for raw in self.lines:
-            s = raw.strip()
-            if not s:
-                continue
-            if s.startswith("#include_lua&python"):
-                inc_py = True
-                inc_lua = True
-            elif s.startswith("#include_python"):
-                inc_py = True
-            elif s.startswith("#include_lua"):
-                inc_lua = True
-        return {"include_python": inc_py, "include_lua": inc_lua}
-
-    def _execute_block(self, start, end):
-        i = start
-        while i < end:
-            self.current_line = i + 1
+class GXSyntaxError(GXRuntimeError):
+    pass
+
+
+_UNSET = object()
+
+EXPR_PLAIN = 0
+EXPR_CONST = 1
+EXPR_MEMO = 2
+
+
+class GXExpr:
+    __slots__ = ("source", "code", "mode", "value")
+
+    def __init__(self, source: str):
+        self.source = source.replace("true", "True").replace("false", "False")
+        self.code = None
+        self.mode = EXPR_PLAIN
+        self.value = _UNSET
+
+    def compile(self):
+        if self.code is None:
+            tree = ast.parse(self.source, mode="eval")
+            self.code = compile(tree, filename="", mode="eval")
+        return self.code
+
+    def __getstate__(self):
+        return {"source": self.source}
+
+    def __setstate__(self, state):
+        self.source = state["source"]
+        self.code = None
+        self.mode = EXPR_PLAIN
+        self.value = _UNSET
+
+    def __repr__(self):
+        return f"GXExpr({self.source!r})"
+
+
+@dataclass
+class GXNode:
+    kind: str
+    line: int
+    text: str
+    args: list = field(default_factory=list)
+    body: list = field(default_factory=list)
+    branches: list = field(default_factory=list)
+    code: str = ""
+    code_line: int = 0
+    end_line: int = 0
+    target: object = None
+
+
+@dataclass
+class GXFunction:
+    name: str
+    params: list
+    body: list
+    line: int
+    path: str | None = None
+
+
+@dataclass
+class GXProgram:
+    body: list
+    flags: dict
+    errors: list
+    line_count: int
+    functions: list = field(default_factory=list)
+    optimized: bool = False
+
+
+GX_COMMANDS = (
+    "var.set", "var.ask", "var.math_", "var.math", "var.inc", "var.dec",
+    "table.add", "table.remove", "table.get", "say", "debugprint",
+)
+
+SNIPPET_HEADERS = ("lua_snippet:", "py_snippet:")
+SNIPPET_MODIFIERS = ("impure",)
+
+BLOCK_KINDS = frozenset(("repeat", "foreach", "for", "if", "call", "parallel_foreach"))
+
+SIGNAL_RETURN = "return"
+SIGNAL_BREAK = "break"
+SIGNAL_CONTINUE = "continue"
+STEP_INTO = "into"
+
+RE_FUNC = re.compile(r"func\s+([A-Za-z_]\w*)\s*\((.*)\)\s*$")
+RE_FOREACH = re.compile(r"foreach\s+([A-Za-z_]\w*)\s+in\s+(.+)$")
+RE_PARALLEL = re.compile(r"parallel\s+foreach\s+([A-Za-z_]\w*)\s+in\s+(.+)$")
+RE_FOR = re.compile(r"for\s+([A-Za-z_]\w*)\s*=\s*(.+)$")
+RE_CALL = re.compile(r"call\s+([A-Za-z_]\w*)\s*\((.*)\)\s*(?:,\s*([A-Za-z_]\w*))?\s*$")
+
+
+def scan_directives(lines):
+    inc_py = False
+    inc_lua = False
+    lua_runtime = None
+    imports = []
+    for i, raw in enumerate(lines):
+        s = raw.strip()
+        if not s:
+            continue
+        if s.startswith("#import "):
+            imports.append((s[len("#import "):].strip(), i + 1))
+        elif s.startswith("#include_lua&python"):
+            inc_py = True
+            inc_lua = True
+            lua_runtime = s[len("#include_lua&python"):].strip() or lua_runtime
+        elif s.startswith("#include_python"):
+            inc_py = True
+        elif s.startswith("#include_lua"):
+            inc_lua = True
+            lua_runtime = s[len("#include_lua"):].strip() or lua_runtime
+    return {"include_python": inc_py, "include_lua": inc_lua, "lua_runtime": lua_runtime, "imports": imports}
+
+
+def classify_command(line: str):
+    if line == "console.clear()":
+        return "console.clear"
+    for head in GX_COMMANDS:
+        if line.startswith(head):
+            return head
+    return None
+
+
+def split_args(content: str):
+    parts = []
+    buf = ""
+    depth = 0
+    in_str = False
+    str_ch = ""
+
+    for ch in content:
+        if in_str:
+            buf += ch
+            if ch == str_ch:
+                in_str = False
+            continue
+
+        if ch in ('"', "'"):
+            in_str = True
+            str_ch = ch
+            buf += ch
+            continue
+
+        if ch in "([{":
+            depth += 1
+            buf += ch
+            continue
+
+        if ch in ")]}":
+            depth = max(0, depth - 1)
+            buf += ch
+            continue
+
+        if ch == "," and depth == 0:
+            if buf.strip():
+                parts.append(buf.strip())
+            buf = ""
+            continue
+
+        buf += ch
+
+    if buf.strip():
+        parts.append(buf.strip())
+
+    return parts
+
+
+def _after_equals_or_space(line, head):
+    s = line[len(head):].strip()
+    if s.startswith("="):
+        s = s[1:].strip()
+    return s.strip()
+
+
+def _is_word(line: str, word: str) -> bool:
+    return line == word or line.startswith(word + " ")
+
+
+class GXParser:
+    def __init__(self, lines, flags):
+        self.lines = lines
+        self.flags = flags
+        self.errors = []
+        self.functions = []
+        self.function_index = {}
+        self._depth = 0
+        self._loops = 0
+        self._in_func = False
+
+    def parse(self) -> GXProgram:
+        body = []
+        i = 0
+        while i < len(self.lines):
+            nodes, i, stop = self._parse_block(i)
+            body.extend(nodes)
+            if stop == "end":
+                # A top-level end stops the script; the lines after it are not run.
+                break
+            if stop is not None:
+                self._error(f"Unexpected {stop.split(' ', 1)[0]}", i + 1)
+                i += 1
+        self._resolve_calls(body)
+        return GXProgram(
+            body=body, flags=self.flags, errors=self.errors,
+            line_count=len(self.lines), functions=self.functions
+        )
+
+    def _resolve_calls(self, body):
+        for node in walk_nodes(body):
+            if node.kind == "call":
+                idx = self.function_index.get(node.args[0])
+                node.target = self.functions[idx] if idx is not None else None
+
+    def _error(self, message, line):
+        self.errors.append(GXSyntaxError(message, line))
+
+    def _next_significant(self, i):
+        while i < len(self.lines):
+            s = self.lines[i].strip()
+            if s and not s.startswith("#"):
+                return i, s
+            i += 1
+        return i, None
+
+    def _parse_block(self, i):
+        nodes = []
+        while i < len(self.lines):
             line = self.lines[i].strip()
 
-            if not line:
+            if not line or line.startswith("#"):
                 i += 1
                 continue
 
-            if line.startswith("#"):
+            if line == "end" or _is_word(line, "elif") or line.startswith("else"):
+                return nodes, i, line
+
+            if line.startswith(SNIPPET_HEADERS):
+                node, i = self._parse_snippet(i, line)
+                if node is not None:
+                    nodes.append(node)
+                continue
+
+            if line in ("--s--", "--e--"):
+                other = "--e--" if line == "--s--" else "--s--"
+                self._error(f"{line} without {other}", i + 1)
                 i += 1
                 continue
 
-            if line == "end":
-                return
+            if line.startswith("repeat"):
+                node, i = self._parse_repeat(i, line)
+                nodes.append(node)
+                continue
 
-            if line == "lua_snippet:":
-                if not self.flags["include_lua"] or self.run_lua_block is None:
-                    raise GXRuntimeError("lua_snippet used but Lua is not enabled", self.current_line)
-                snippet_code, next_i, snippet_start_line = self._consume_snippet(i + 1)
-                self.run_lua_block(snippet_code, snippet_start_line)
-                i = next_i
+            if _is_word(line, "parallel"):
+                node, i = self._parse_parallel(i, line)
+                nodes.append(node)
                 continue
 
-            if line == "py_snippet:":
-                if not self.flags["include_python"] or self.run_python_block is None:
-                    raise GXRuntimeError("py_snippet used but Python is not enabled", self.current_line)
-                snippet_code, next_i, snippet_start_line = self._consume_snippet(i + 1)
-                self.run_python_block(snippet_code, snippet_start_line)
-                i = next_i
+            if _is_word(line, "foreach"):
+                node, i = self._parse_foreach(i, line)
+                nodes.append(node)
                 continue
 
-            if line.startswith("repeat"):
-                count = self._eval_expr(line.split(" ", 1)[1])
-                block_start = i + 1
-                block_end = self._find_end_for_gx_blocks(block_start)
-                for _ in range(int(count)):
-                    self._execute_block(block_start, block_end)
-                i = block_end + 1
+            if _is_word(line, "for"):
+                node, i = self._parse_for(i, line)
+                nodes.append(node)
                 continue
 
-            if line.startswith("if"):
-                i = self._handle_if(i)
+            if line in ("break", "continue"):
+                if not self._loops:
+                    self._error(line + " outside of a loop", i + 1)
+                else:
+                    nodes.append(GXNode(kind=line, line=i + 1, text=line, end_line=i + 1))
+                i += 1
                 continue
 
-            self._execute_line(line)
-            i += 1
+            if _is_word(line, "func"):
+                node, i = self._parse_func(i, line)
+                if node is not None:
+                    nodes.append(node)
+                continue
 
-    def _consume_snippet(self, start_index):
-        i = start_index
-        while i < len(self.lines):
-            s = self.lines[i].strip()
-            if not s:
+            if _is_word(line, "call"):
+                node = self._parse_call(i, line)
+                if node is not None:
+                    nodes.append(node)
                 i += 1
                 continue
-            if s == "--s--":
-                snippet_start_line = i + 2
+
+            if _is_word(line, "return"):
+                if not self._in_func:
+                    self._error("return outside of func", i + 1)
+                else:
+                    expr = line[len("return"):].strip()
+                    nodes.append(GXNode(kind="return", line=i + 1, text=line, args=[GXExpr(expr) if expr else None], end_line=i + 1))
                 i += 1
-                break
-            raise GXRuntimeError("Expected --s-- after snippet header", self.current_line)
+                continue
+
+            if line.startswith("if"):
+                node, i = self._parse_if(i)
+                nodes.append(node)
+                continue
 
+            node = self._parse_command(i, line)
+            if node is not None:
+                nodes.append(node)
+            i += 1
+
+        return nodes, i, None
+
+    def _parse_body(self, i):
+        self._depth += 1
+        try:
+            return self._parse_block(i)
+        finally:
+            self._depth -= 1
+
+    def _parse_func(self, i, line):
+        m = RE_FUNC.match(line)
+        if not m:
+            self._error("Invalid func syntax, expected: func name(arg1, arg2)", i + 1)
+        elif self._depth > 0 or self._in_func:
+            self._error("func must be defined at the top level", i + 1)
+
+        saved_loops = self._loops
+        self._in_func = True
+        self._loops = 0
+        try:
+            body, j, stop = self._parse_body(i + 1)
+        finally:
+            self._in_func = False
+            self._loops = saved_loops
+        while stop is not None and stop != "end":
+            self._error(f"Unexpected {stop.split(' ', 1)[0]} in func", j + 1)
+            more, j, stop = self._parse_body(j + 1)
+            body.extend(more)
+        end_line = j + 1 if stop == "end" else len(self.lines)
+        if stop is None:
+            self._error("Missing end", i + 1)
+        if not m or self._depth > 0:
+            return None, j + 1
+
+        name = m.group(1)
+        params = [p.strip() for p in m.group(2).split(",") if p.strip()]
+        for p in params:
+            if not p.isidentifier():
+                self._error(f"Invalid parameter name: {p}", i + 1)
+        if len(set(params)) != len(params):
+            self._error("Duplicate parameter name in " + name, i + 1)
+        if name in self.function_index:
+            self._error("Duplicate func: " + name, i + 1)
+        else:
+            self.function_index[name] = len(self.functions)
+            self.functions.append(GXFunction(name=name, params=params, body=body, line=i + 1))
+        node = GXNode(kind="func", line=i + 1, text=line, args=[name, params], body=body, end_line=end_line)
+        return node, j + 1
+
+    def _parse_call(self, i, line):
+        m = RE_CALL.match(line)
+        if not m:
+            self._error("Invalid call syntax, expected: call name(args), out", i + 1)
+            return None
+        args = [GXExpr(a) for a in split_args(m.group(2).strip())]
+        return GXNode(kind="call", line=i + 1, text=line, args=[m.group(1), args, m.group(3)], end_line=i + 1)
+
+    def _parse_repeat(self, i, line):
+        node = GXNode(kind="repeat", line=i + 1, text=line)
+        parts = line.split(" ", 1)
+        if len(parts) < 2 or not parts[1].strip():
+            self._error("repeat needs a count", i + 1)
+            parts = [parts[0], "0"]
+        node.args = [GXExpr(parts[1])]
+        return self._parse_loop_body(node, i)
+
+    def _parse_foreach(self, i, line):
+        node = GXNode(kind="foreach", line=i + 1, text=line)
+        m = RE_FOREACH.match(line)
+        if not m:
+            self._error("Invalid foreach syntax, expected: foreach item in table", i + 1)
+            node.args = ["_", GXExpr("[]")]
+        else:
+            node.args = [m.group(1), GXExpr(m.group(2).strip())]
+        return self._parse_loop_body(node, i)
+
+    def _parse_parallel(self, i, line):
+        node = GXNode(kind="parallel_foreach", line=i + 1, text=line)
+        m = RE_PARALLEL.match(line)
+        parts = split_args(m.group(2).strip()) if m else []
+        if not m or len(parts) not in (1, 2) or (len(parts) == 2 and not parts[1].isidentifier()):
+            self._error("Invalid parallel syntax, expected: parallel foreach item in table[, results]", i + 1)
+            node.args = ["_", GXExpr("[]"), None]
+        else:
+            node.args = [m.group(1), GXExpr(parts[0]), parts[1] if len(parts) == 2 else None]
+        node, j = self._parse_loop_body(node, i)
+        if len(node.body) != 1 or node.body[0].kind != "py_snippet":
+            self._error("parallel foreach body must be a single py_snippet", i + 1)
+            node.body = []
+        return node, j
+
+    def _parse_for(self, i, line):
+        node = GXNode(kind="for", line=i + 1, text=line)
+        m = RE_FOR.match(line)
+        bounds = split_args(m.group(2).strip()) if m else []
+        if not m or len(bounds) not in (2, 3):
+            self._error("Invalid for syntax, expected: for i = start, stop[, step]", i + 1)
+            node.args = ["_", GXExpr("0"), GXExpr("-1"), None]
+        else:
+            step = GXExpr(bounds[2]) if len(bounds) == 3 else None
+            node.args = [m.group(1), GXExpr(bounds[0]), GXExpr(bounds[1]), step]
+        return self._parse_loop_body(node, i)
+
+    def _parse_loop_body(self, node, i):
+        self._loops += 1
+        try:
+            node.body, j, stop = self._parse_body(i + 1)
+            while stop is not None and stop != "end":
+                self._error(f"Unexpected {stop.split(' ', 1)[0]} in {node.kind}", j + 1)
+                more, j, stop = self._parse_body(j + 1)
+                node.body.extend(more)
+        finally:
+            self._loops -= 1
+        if stop is None:
+            self._error("Missing end", i + 1)
+            node.end_line = len(self.lines)
+            return node, j
+        node.end_line = j + 1
+        return node, j + 1
+
+    def _parse_if(self, i):
+        node = GXNode(kind="if", line=i + 1, text=self.lines[i].strip())
+        j = i
+        header = self.lines[i].strip()
+        seen_else = False
+        while True:
+            if header.startswith("else") and not _is_word(header, "elif"):
+                if seen_else:
+                    self._error("Duplicate else", j + 1)
+                seen_else = True
+                cond = None
+            else:
+                parts = header.split(" ", 1)
+                if len(parts) < 2 or not parts[1].strip():
+                    self._error(f"{parts[0]} needs a condition", j + 1)
+                    parts = [parts[0], "False"]
+                cond = GXExpr(parts[1])
+            body, k, stop = self._parse_body(j + 1)
+            node.branches.append((cond, j + 1, body))
+            if stop is None:
+                self._error("Missing end", i + 1)
+                node.end_line = len(self.lines)
+                return node, k
+            if stop == "end":
+                node.end_line = k + 1
+                return node, k + 1
+            if seen_else:
+                self._error(f"Unexpected {stop.split(' ', 1)[0]} after else", k + 1)
+            j = k
+            header = stop
+
+    def _parse_snippet(self, i, header):
+        header_line = i + 1
+        kind, _, rest = header.partition(":")
+        modifiers = rest.split()
+        for mod in modifiers:
+            if mod not in SNIPPET_MODIFIERS:
+                self._error(f"Unknown snippet modifier: {mod}", header_line)
+        flag = "include_lua" if kind == "lua_snippet" else "include_python"
+        if not self.flags.get(flag):
+            lang = "Lua" if kind == "lua_snippet" else "Python"
+            self._error(f"{kind} used but {lang} is not enabled", header_line)
+
+        j, s = self._next_blank_skip(i + 1)
+        if s != "--s--":
+            self._error("Expected --s-- after snippet header", header_line)
+            return None, i + 1
+
+        code_line = j + 2
         buf = []
+        j += 1
+        while j < len(self.lines):
+            if self.lines[j].strip() == "--e--":
+                break
+            buf.append(self.lines[j])
+            j += 1
+        else:
+            self._error("Missing --e-- for snippet", header_line)
+            return None, len(self.lines)
+
+        node = GXNode(kind=kind, line=header_line, text=header, args=modifiers, code="\n".join(buf), code_line=code_line)
+        node.end_line = j + 1
+        k, s = self._next_significant(j + 1)
+        if s == "end":
+            node.end_line = k + 1
+            return node, k + 1
+        return node, j + 1
+
+    def _next_blank_skip(self, i):
         while i < len(self.lines):
             s = self.lines[i].strip()
-            if s == "--e--":
-                return ("\n".join(buf), i + 1, snippet_start_line)
-            buf.append(self.lines[i])
+            if s:
+                return i, s
             i += 1
+        return i, None
 
-        raise GXRuntimeError("Missing --e-- for snippet", self.current_line)
+    def _parse_command(self, i, line):
+        op = classify_command(line)
+        if op is None:
+            self._error("Unknown command: " + line, i + 1)
+            return None
+        try:
+            args = self._command_args(op, line, i + 1)
+        except (IndexError, ValueError):
+            self._error(f"Invalid {op} syntax", i + 1)
+            return None
+        if args is None:
+            return None
+        return GXNode(kind=op, line=i + 1, text=line, args=args, end_line=i + 1)
 
-    def _find_end_for_gx_blocks(self, start):
-        depth = 0
-        for i in range(start, len(self.lines)):
-            s = self.lines[i].strip()
-            if not s or s.startswith("#"):
-                continue
-            if s.startswith(("if", "repeat")) or s in ("lua_snippet:", "py_snippet:"):
-                depth += 1
-            if s == "end":
-                if depth == 0:
-                    return i
-                depth -= 1
-        raise GXRuntimeError("Missing end", self.current_line)
-
-    def _handle_if(self, index):
-        block_start = index + 1
-        block_end = self._find_end_for_gx_blocks(block_start)
+    def _command_args(self, op, line, line_no):
+        if op == "console.clear":
+            return []
+        if op in ("var.set", "var.ask", "var.math"):
+            parts = line.split("=", 1)[1].split(",", 1)
+            return [parts[0].strip(), GXExpr(parts[1].strip())]
+        if op == "var.math_":
+            match = re.match(r"var\.math_(add|sub|mul|div)\s*=\s*(.*)", line)
+            if not match:
+                self._error("Invalid var.math_* syntax", line_no)
+                return None
+            parts = [p.strip() for p in match.group(2).split(",")]
+            if len(parts) != 3:
+                self._error("Invalid var.math_* args", line_no)
+                return None
+            return [match.group(1), GXExpr(parts[0]), GXExpr(parts[1]), parts[2]]
+        if op in ("var.inc", "var.dec"):
+            return [_after_equals_or_space(line, op)]
+        if op in ("table.add", "table.remove"):
+            parts = line.split("=", 1)[1].split(",")
+            return [parts[0].strip(), GXExpr(parts[1].strip())]
+        if op == "table.get":
+            parts = line.split("=", 1)[1].split(",")
+            return [parts[0].strip(), GXExpr(parts[1].strip()), parts[2].strip()]
+        if op == "say":
+            return [GXExpr(p) for p in split_args(line[4:].strip())]
+        if op == "debugprint":
+            level = "info"
+            if "-e" in line:
+                level = "error"
+            elif "-w" in line:
+                level = "warning"
+            message = re.findall(r'"(.*?)"', line)
+            return [message[0] if message else None, level]
+        return []
 
-        branches = []
-        i = index
-        while i <= block_end:
-            line = self.lines[i].strip()
-            if not line or line.startswith("#"):
-                i += 1
-                continue
 
-            if line.startswith("if") or line.startswith("elif"):
-                cond = line.split(" ", 1)[1]
-                start = i + 1
-                end = self._find_next_branch_or_end(start)
-                branches.append(("cond", cond, start, end))
-                i = end
-                continue
+def parse_program(code: str) -> GXProgram:
+    lines = code.split("\n")
+    return GXParser(lines, scan_directives(lines)).parse()
+
+
+def walk_nodes(nodes):
+    for node in nodes:
+        yield node
+        if node.body:
+            yield from walk_nodes(node.body)
+        for _, _, body in node.branches:
+            yield from walk_nodes(body)
+
+
+def reads_input(node) -> bool:
+    if node.kind == "var.ask":
+        return True
+    if node.kind == "py_snippet":
+        return "input(" in node.code
+    if node.kind == "lua_snippet":
+        return "gx_input" in node.code
+    return False
+
+
+def node_exprs(node):
+    args = node.args[1] if node.kind == "call" else node.args
+    for arg in args:
+        if isinstance(arg, GXExpr):
+            yield arg
+    for cond, _, _ in node.branches:
+        if cond is not None:
+            yield cond
+
+
+LOOP_KINDS = ("repeat", "foreach", "for")
+
+WRITE_SLOTS = {
+    "var.set": 0, "var.ask": 0, "var.math": 0, "var.math_": 3, "var.inc": 0, "var.dec": 0,
+    "table.add": 0, "table.remove": 0, "table.get": 2, "call": 2, "foreach": 0, "for": 0,
+    "parallel_foreach": 2,
+}
 
-            if line.startswith("else"):
-                start = i + 1
-                end = block_end
-                branches.append(("else", None, start, end))
+# A loop body containing one of these may change values behind a name
+# (snippets, in-place table edits, funcs sharing a table), so nothing
+# in it is treated as loop-invariant.
+OPAQUE_KINDS = frozenset(("py_snippet", "lua_snippet", "call", "table.add", "table.remove"))
+
+PURE_BUILTINS = frozenset(("abs", "len", "min", "max", "round", "int", "float", "str", "bool", "sum", "any", "all"))
+IMMUTABLE_TYPES = (int, float, complex, bool, str, bytes, type(None), tuple)
+
+_FOLD_NODES = (
+    ast.Expression, ast.Constant, ast.UnaryOp, ast.BinOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Tuple,
+    ast.Load, ast.operator, ast.unaryop, ast.boolop, ast.cmpop,
+)
+_MEMO_NODES = _FOLD_NODES + (ast.Name, ast.Subscript, ast.Slice, ast.Call)
+
+
+def _small_number(node, limit):
+    return isinstance(node, ast.Constant) and type(node.value) in (int, float) and abs(node.value) <= limit
+
+
+def _has_sequence(node):
+    return any(
+        isinstance(n, ast.Tuple) or (isinstance(n, ast.Constant) and isinstance(n.value, (str, bytes)))
+        for n in ast.walk(node)
+    )
+
+
+def _bounded(tree):
+    for n in ast.walk(tree):
+        if not isinstance(n, ast.BinOp):
+            continue
+        if isinstance(n.op, (ast.Pow, ast.LShift)):
+            if not (_small_number(n.left, 10 ** 6) and _small_number(n.right, 256)):
+                return False
+        elif isinstance(n.op, ast.Mult) and (_has_sequence(n.left) or _has_sequence(n.right)):
+            seq, count = (n.left, n.right) if _has_sequence(n.left) else (n.right, n.left)
+            if not (isinstance(seq, ast.Constant) and _small_number(count, 10000)):
+                return False
+    return True
+
+
+class GXOptimizer:
+    def __init__(self, program: GXProgram, allow_builtins: bool = True):
+        self.program = program
+        self.allow_builtins = allow_builtins
+        self.folded = 0
+        self.pruned = 0
+        self.hoisted = 0
+        self._written = self._writes(program.body)
+
+    def run(self):
+        self._fold_block(self.program.body)
+        for fn in self.program.functions:
+            self._fold_block(fn.body)
+        self._hoist_block(self.program.body)
+        return self.program
+
+    def _fold_block(self, nodes):
+        out = []
+        for node in nodes:
+            for expr in node_exprs(node):
+                self._fold(expr)
+            if node.kind == "if":
+                kept = self._prune_if(node)
+                if kept is not None:
+                    out.extend(kept)
+                    continue
+            if node.body:
+                self._fold_block(node.body)
+            for _, _, body in node.branches:
+                self._fold_block(body)
+            out.append(node)
+        nodes[:] = out
+
+    def _prune_if(self, node):
+        branches = []
+        for cond, line, body in node.branches:
+            if cond is not None and cond.mode == EXPR_CONST:
+                if not cond.value:
+                    self.pruned += 1
+                    continue
+                if not branches:
+                    self.pruned += 1
+                    self._fold_block(body)
+                    return body
+                branches.append((None, line, body))
                 break
+            branches.append((cond, line, body))
+        if not branches:
+            return []
+        node.branches = branches
+        if branches[0][0] is None:
+            self._fold_block(branches[0][2])
+            return branches[0][2]
+        return None
 
-            i += 1
+    def _fold(self, expr):
+        if expr.mode != EXPR_PLAIN:
+            return
+        try:
+            tree = ast.parse(expr.source, mode="eval")
+        except SyntaxError:
+            return
+        if not all(isinstance(n, _FOLD_NODES) for n in ast.walk(tree)) or not _bounded(tree):
+            return
+        try:
+            value = eval(compile(tree, "", "eval"), {"__builtins__": {}}, {})
+        except Exception:
+            return
+        if isinstance(value, IMMUTABLE_TYPES):
+            expr.mode = EXPR_CONST
+            expr.value = value
+            self.folded += 1
 
-        for kind, cond, s, e in branches:
-            if kind == "cond":
-                if self._eval_expr(cond):
-                    self._execute_block(s, e)
-                    break
+    def _hoist_block(self, nodes):
+        for node in nodes:
+            if node.kind in LOOP_KINDS:
+                self._hoist_loop(node)
+            if node.body:
+                self._hoist_block(node.body)
+            for _, _, body in node.branches:
+                self._hoist_block(body)
+
+    def _hoist_loop(self, loop):
+        inner = list(walk_nodes(loop.body))
+        if any(n.kind in OPAQUE_KINDS for n in inner):
+            return
+        written = self._writes(loop.body)
+        if loop.kind in ("foreach", "for"):
+            written.add(loop.args[0])
+        memo = []
+        for node in inner:
+            for expr in node_exprs(node):
+                if expr.mode == EXPR_PLAIN and self._invariant(expr, written):
+                    expr.mode = EXPR_MEMO
+                    memo.append(expr)
+        if memo:
+            loop.target = memo
+            self.hoisted += len(memo)
+
+    def _invariant(self, expr, written):
+        try:
+            tree = ast.parse(expr.source, mode="eval")
+        except SyntaxError:
+            return False
+        names = set()
+        for n in ast.walk(tree):
+            if not isinstance(n, _MEMO_NODES):
+                return False
+            if isinstance(n, ast.Call):
+                if not (self.allow_builtins and isinstance(n.func, ast.Name) and n.func.id in PURE_BUILTINS and not n.keywords):
+                    return False
+                if n.func.id in self._written:
+                    return False
+            elif isinstance(n, ast.Name):
+                names.add(n.id)
+        calls = {n.func.id for n in ast.walk(tree) if isinstance(n, ast.Call)}
+        names -= calls
+        return bool(names) and not (names & written) and _bounded(tree)
+
+    def _writes(self, nodes):
+        out = set()
+        for node in walk_nodes(nodes):
+            slot = WRITE_SLOTS.get(node.kind)
+            if slot is not None and len(node.args) > slot and node.args[slot]:
+                out.add(node.args[slot])
+            if node.kind == "func":
+                out.update(node.args[1])
+        return out
+
+
+def optimize_program(program: GXProgram, allow_builtins: bool = True) -> GXOptimizer:
+    opt = GXOptimizer(program, allow_builtins)
+    opt.run()
+    return opt
+
+
+class GXEngine:
+    def __init__(self, console_write, debugger_write, input_request, run_python_block=None, run_lua_block=None, module_cache=None, run_python_map=None):
+        self.vars = {}
+        # The script's variables; self.vars is the innermost call frame while a func runs
+        self.globals = self.vars
+        self.console_write = console_write
+        self.debugger_write = debugger_write
+        self.input_request = input_request
+        self.run_python_block = run_python_block
+        self.run_lua_block = run_lua_block
+        self.run_python_map = run_python_map
+        self.lines = []
+        self.current_line = 0
+        self.flags = {"include_python": False, "include_lua": False, "lua_runtime": None, "imports": []}
+        self.program = None
+        self.script_path = None
+        self.module_cache = module_cache
+        self.modules = []
+        self.hooks = EngineHooks()
+        self._hooked = False
+        self._execute_block = self._execute_block_plain
+        self.functions = {}
+        self.call_stack = []
+        self._return_value = None
+        self.optimize = settings.GX_OPTIMIZE
+        self.checkpoints = None
+        self.resumed_line = None
+        self._track_writes = False
+        self.program_cache_size = 0
+        self._programs = OrderedDict()
+        self.breakpoints = set()
+        self.on_pause = None
+        self.step_first = False
+        self._break_ids = frozenset()
+        self._script_ids = frozenset()
+        self._step = None
+
+        self._dispatch = {
+            "repeat": self._exec_repeat,
+            "foreach": self._exec_foreach,
+            "parallel_foreach": self._exec_parallel_foreach,
+            "for": self._exec_for,
+            "break": self._exec_break,
+            "continue": self._exec_continue,
+            "if": self._exec_if,
+            "func": self._exec_func_def,
+            "call": self._exec_call,
+            "return": self._exec_return,
+            "lua_snippet": self._exec_lua_snippet,
+            "py_snippet": self._exec_py_snippet,
+            "console.clear": self._console_clear,
+            "var.set": self._var_set,
+            "var.ask": self._var_ask,
+            "var.math_": self._var_math_typed,
+            "var.math": self._var_math_expr,
+            "var.inc": self._var_inc,
+            "var.dec": self._var_dec,
+            "table.add": self._table_add,
+            "table.remove": self._table_remove,
+            "table.get": self._table_get,
+            "say": self._say,
+            "debugprint": self._debug_print,
+        }
+
+    def execute(self, code, path=None, resume=False):
+        self._hooked = bool(self.hooks)
+        self._execute_block = self._execute_block_hooked if self._hooked else self._execute_block_plain
+        self._track_writes = self.hooks.has("var_write")
+        log = self.checkpoints
+        self.vars = TrackedVars(on_write=self._on_var_write) if self._track_writes or log is not None else {}
+        self.globals = self.vars
+        self.resumed_line = None
+        self.current_line = 0
+        self.script_path = os.path.normcase(os.path.abspath(path)) if path else None
+        self.modules = []
+        self.program = self.parse(code)
+        if self.program.errors:
+            raise self.program.errors[0]
+        debugging = self.on_pause is not None and (self.breakpoints or self.step_first)
+        if self.optimize and not self._hooked and not debugging:
+            if not self.program.optimized:
+                optimize_program(self.program, allow_builtins=not self.program.flags.get("imports"))
+                self.program.optimized = True
+        elif self.program.optimized:
+            # Traced and debugged runs must see every branch, so skip the cached optimized program.
+            self.flags = self._scan_directives()
+            self.program = GXParser(self.lines, self.flags).parse()
+        self._collect_imports(self.program.flags, self.script_path, [self.script_path or "<script>"], set())
+        self._link()
+        if debugging:
+            self._prepare_breakpoints()
+            self._step = STEP_INTO if self.step_first else None
+            self._execute_block = self._execute_block_debug
+
+        start = None
+        if log is not None:
+            k = log.plan(self, self.lines) if resume else None
+            if k is not None:
+                self.vars.update(log.restore(k))
+                start = log.entries[k].index
+                self.resumed_line = log.entries[k].line
+            log.begin(self, self.lines, keep=k + 1 if k is not None else 0)
+
+        if self._hooked:
+            self.hooks.emit("run_start", self)
+        try:
+            if start is None:
+                for module in self.modules:
+                    self._run_module(module)
+            if log is None:
+                self._execute_block(self.program.body)
             else:
-                self._execute_block(s, e)
-                break
+                self._run_checkpointed(self.program.body, start, log)
+        finally:
+            if self._hooked:
+                self.hooks.emit("run_stop", self)
 
-        return block_end + 1
+    def _run_checkpointed(self, nodes, start, log):
+        first = start or 0
+        for index in range(first, len(nodes)):
+            node = nodes[index]
+            if index != start:
+                log.take(self, index, node)
+            self._execute_block(nodes[index:index + 1])
+            log.after(self, node)
 
-    def _find_next_branch_or_end(self, start):
-        depth = 0
-        for i in range(start, len(self.lines)):
-            line = self.lines[i].strip()
-            if not line or line.startswith("#"):
+    def _link(self):
+        self.functions = {}
+        self.call_stack = []
+        for module in self.modules:
+            for fn in module.program.functions:
+                fn.path = module.path
+                self.functions[fn.name] = fn
+        for fn in self.program.functions:
+            self.functions[fn.name] = fn
+
+        programs = [(m.program, m.path) for m in self.modules] + [(self.program, self.script_path)]
+        for program, path in programs:
+            for node in walk_nodes(program.body):
+                if node.kind == "call" and node.target is None and node.args[0] not in self.functions:
+                    raise GXRuntimeError("Unknown function: " + node.args[0], node.line, path)
+
+    def _run_module(self, module):
+        saved_flags = self.flags
+        self.flags = module.program.flags
+        try:
+            self._execute_block(module.program.body)
+        except GXRuntimeError as e:
+            if e.path is None:
+                e.path = module.path
+            raise
+        finally:
+            self.flags = saved_flags
+
+    def _collect_imports(self, flags, importer_path, stack, done):
+        if not flags.get("imports"):
+            return
+        cache = self.module_cache
+        if cache is None:
+            from gx_modules import MODULE_CACHE
+            cache = self.module_cache = MODULE_CACHE
+        base_dir = os.path.dirname(importer_path) if importer_path else None
+
+        for name, line in flags["imports"]:
+            path = cache.resolve(name, base_dir)
+            if path is None:
+                raise GXRuntimeError("Cannot find module: " + name, line, importer_path)
+            if path in stack:
+                chain = " -> ".join(os.path.basename(p) for p in stack[stack.index(path):] + [path])
+                raise GXRuntimeError("Cyclic import: " + chain, line, importer_path)
+            if path in done:
                 continue
-            if line.startswith(("if", "repeat")) or line in ("lua_snippet:", "py_snippet:"):
-                depth += 1
-            if line == "end":
-                if depth == 0:
-                    return i
-                depth -= 1
-            if depth == 0 and (line.startswith("elif") or line.startswith("else")):
-                return i
-        return len(self.lines)
-
-    def _execute_line(self, line):
-        if line == "console.clear()":
-            self._console_clear()
-        elif line.startswith("var.set"):
-            self._var_set(line)
-        elif line.startswith("var.ask"):
-            self._var_ask(line)
-        elif line.startswith("var.math_"):
-            self._var_math_typed(line)
-        elif line.startswith("var.math"):
-            self._var_math_expr(line)
-        elif line.startswith("var.inc"):
-            var = self._after_equals_or_space(line, "var.inc")
-            if var not in self.vars:
-                self.vars[var] = 0
-            self.vars[var] = self.vars[var] + 1
-        elif line.startswith("var.dec"):
-            var = self._after_equals_or_space(line, "var.dec")
-            if var not in self.vars:
-                self.vars[var] = 0
-            self.vars[var] = self.vars[var] - 1
-        elif line.startswith("table.add"):
-            self._table_add(line)
-        elif line.startswith("table.remove"):
-            self._table_remove(line)
-        elif line.startswith("table.get"):
-            self._table_get(line)
-        elif line.startswith("say"):
-            content = line[4:].strip()
-            values = self._eval_say_args(content)
-            self.console_write(" ".join(str(v) for v in values) + "\n")
-        elif line.startswith("debugprint"):
-            self._debug_print(line)
+
+            module = cache.load(path)
+            if module.program.errors:
+                err = module.program.errors[0]
+                raise GXRuntimeError(str(err), err.line, path)
+            self._collect_imports(module.program.flags, path, stack + [path], done)
+            done.add(path)
+            self.modules.append(module)
+
+    def parse(self, code) -> GXProgram:
+        self.lines = code.split("\n")
+        if not self.program_cache_size:
+            self.flags = self._scan_directives()
+            return GXParser(self.lines, self.flags).parse()
+        cache = self._programs
+        program = cache.get(code)
+        if program is not None:
+            cache.move_to_end(code)
         else:
-            raise GXRuntimeError("Unknown command: " + line, self.current_line)
+            program = cache[code] = GXParser(self.lines, self._scan_directives()).parse()
+            if len(cache) > self.program_cache_size:
+                cache.popitem(last=False)
+        self.flags = program.flags
+        return program
 
-    def _eval_say_args(self, content: str):
-        if not content:
-            return []
+    def _scan_directives(self):
+        return scan_directives(self.lines)
 
-        parts = []
-        buf = ""
-        depth = 0
-        in_str = False
-        str_ch = ""
-
-        for ch in content:
-            if in_str:
-                buf += ch
-                if ch == str_ch:
-                    in_str = False
-                continue
+    def _execute_block_plain(self, nodes):
+        dispatch = self._dispatch
+        for node in nodes:
+            self.current_line = node.line
+            signal = dispatch[node.kind](node)
+            if signal is not None:
+                return signal
 
-            if ch in ('"', "'"):
-                in_str = True
-                str_ch = ch
-                buf += ch
-                continue
+    def _execute_block_hooked(self, nodes):
+        dispatch = self._dispatch
+        emit = self.hooks.emit
+        for node in nodes:
+            self.current_line = node.line
+            emit("line", node)
+            if node.kind in BLOCK_KINDS:
+                emit("block_enter", node)
+                try:
+                    signal = dispatch[node.kind](node)
+                finally:
+                    emit("block_exit", node)
+            else:
+                signal = dispatch[node.kind](node)
+            if signal is not None:
+                return signal
 
-            if ch in "([{":
-                depth += 1
-                buf += ch
-                continue
+    def _execute_block_debug(self, nodes):
+        run = self._execute_block_hooked if self._hooked else self._execute_block_plain
+        breaks = self._break_ids
+        for node in nodes:
+            key = id(node)
+            if key in breaks or (self._step is not None and key in self._script_ids):
+                self._pause(node, key in breaks)
+            signal = run((node,))
+            if signal is not None:
+                return signal
 
-            if ch in ")]}":
-                depth = max(0, depth - 1)
-                buf += ch
-                continue
+    def _prepare_breakpoints(self):
+        nodes = list(walk_nodes(self.program.body))
+        self._script_ids = frozenset(id(n) for n in nodes if n.kind != "func")
+        self._break_ids = frozenset(id(n) for n in nodes if n.line in self.breakpoints and n.kind != "func")
 
-            if ch == "," and depth == 0:
-                if buf.strip():
-                    parts.append(buf.strip())
-                buf = ""
-                continue
+    def set_breakpoints(self, lines):
+        self.breakpoints = set(lines)
+        if self.program is not None and self._execute_block == self._execute_block_debug:
+            self._prepare_breakpoints()
 
-            buf += ch
+    def _pause(self, node, hit):
+        step = self._step
+        if not hit and step is not STEP_INTO and len(self.call_stack) > step:
+            return
+        self.current_line = node.line
+        command = self.on_pause(self, node, "breakpoint" if hit else "step")
+        if command == "stop":
+            raise GXRuntimeError("Run stopped", node.line)
+        if command == "into":
+            self._step = STEP_INTO
+        elif command == "over":
+            self._step = len(self.call_stack)
+        else:
+            self._step = None
+
+    def _emit_var_write(self, name, value):
+        self.hooks.emit("var_write", name, value)
+
+    def _on_var_write(self, name, value):
+        if self.checkpoints is not None:
+            self.checkpoints.dirty.add(name)
+        if self._track_writes:
+            self.hooks.emit("var_write", name, value)
+
+    def _exec_repeat(self, node):
+        if node.target:
+            self._reset_memo(node.target)
+        count = self._eval(node.args[0])
+        body = node.body
+        for _ in range(int(count)):
+            signal = self._execute_block(body)
+            if signal is not None:
+                if signal == SIGNAL_BREAK:
+                    break
+                if signal != SIGNAL_CONTINUE:
+                    return signal
+
+    def _exec_foreach(self, node):
+        if node.target:
+            self._reset_memo(node.target)
+        name, expr = node.args
+        items = self._eval(expr)
+        try:
+            items = tuple(items)
+        except TypeError:
+            raise GXRuntimeError(f"foreach needs a table, got {type(items).__name__}", self.current_line)
+        scope = self.vars
+        body = node.body
+        for item in items:
+            scope[name] = item
+            signal = self._execute_block(body)
+            if signal is not None:
+                if signal == SIGNAL_BREAK:
+                    break
+                if signal != SIGNAL_CONTINUE:
+                    return signal
 
-        if buf.strip():
-            parts.append(buf.strip())
+    def _exec_parallel_foreach(self, node):
+        if not self.flags["include_python"] or self.run_python_map is None:
+            raise GXRuntimeError("parallel foreach used but Python is not enabled", self.current_line)
+        name, expr, out = node.args
+        items = self._eval(expr)
+        try:
+            items = tuple(items)
+        except TypeError:
+            raise GXRuntimeError(f"parallel foreach needs a table, got {type(items).__name__}", self.current_line)
+        snippet = node.body[0]
+        if self._hooked:
+            self.hooks.emit("snippet_start", "py", snippet)
+        try:
+            results = self.run_python_map(snippet.code, snippet.code_line, name, items)
+        except SnippetMapError as e:
+            line = snippet.code_line + e.line - 1 if e.line else self.current_line
+            raise GXRuntimeError(f"parallel foreach failed on item {e.index} (snippet line {e.line}): {e}", line)
+        finally:
+            if self._hooked:
+                self.hooks.emit("snippet_stop", "py", snippet)
+        if out:
+            self.vars[out] = results
+
+    def _exec_for(self, node):
+        if node.target:
+            self._reset_memo(node.target)
+        name, start, stop, step = node.args
+        start = self._eval(start)
+        stop = self._eval(stop)
+        step = self._eval(step) if step is not None else 1
+        if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (start, stop, step)):
+            raise GXRuntimeError("for bounds must be numbers", self.current_line)
+        if step == 0:
+            raise GXRuntimeError("for step cannot be 0", self.current_line)
+
+        if isinstance(start, int) and isinstance(stop, int) and isinstance(step, int):
+            values = range(start, stop + (1 if step > 0 else -1), step)
+        else:
+            count = int((stop - start) // step) + 1
+            values = (start + k * step for k in range(max(count, 0)))
+
+        scope = self.vars
+        body = node.body
+        for value in values:
+            scope[name] = value
+            signal = self._execute_block(body)
+            if signal is not None:
+                if signal == SIGNAL_BREAK:
+                    break
+                if signal != SIGNAL_CONTINUE:
+                    return signal
+
+    def _exec_break(self, node):
+        return SIGNAL_BREAK
+
+    def _exec_continue(self, node):
+        return SIGNAL_CONTINUE
+
+    def _exec_if(self, node):
+        for cond, line, body in node.branches:
+            if cond is not None:
+                self.current_line = line
+                if not self._eval(cond):
+                    continue
+            return self._execute_block(body)
+
+    def _exec_func_def(self, node):
+        return None
+
+    def _exec_call(self, node):
+        name, arg_exprs, out = node.args
+        fn = node.target or self.functions.get(name)
+        if fn is None:
+            raise GXRuntimeError("Unknown function: " + name, self.current_line)
+        if len(arg_exprs) != len(fn.params):
+            raise GXRuntimeError(f"{name} expects {len(fn.params)} argument(s), got {len(arg_exprs)}", self.current_line)
+        values = [self._eval(e) for e in arg_exprs]
+
+        if len(self.call_stack) >= settings.MAX_CALL_DEPTH:
+            chain = " -> ".join(n for n, _ in self.call_stack[-5:])
+            raise GXRuntimeError(
+                f"Maximum call depth ({settings.MAX_CALL_DEPTH}) exceeded calling {name} (... -> {chain})",
+                self.current_line
+            )
+
+        frame = TrackedVars(zip(fn.params, values), on_write=self._emit_var_write) if self._track_writes else dict(zip(fn.params, values))
+        saved = self.vars
+        self.call_stack.append((name, node.line))
+        self.vars = frame
+        self._return_value = None
+        try:
+            self._execute_block(fn.body)
+        except RecursionError:
+            raise GXRuntimeError(f"Call depth too deep in {name} ({len(self.call_stack)} frames)", self.current_line, fn.path)
+        except GXRuntimeError as e:
+            if e.path is None and fn.path is not None:
+                e.path = fn.path
+            raise
+        finally:
+            self.vars = saved
+            self.call_stack.pop()
+
+        result = self._return_value
+        self._return_value = None
+        if out:
+            self.vars[out] = result
 
-        return [self._eval_expr(p) for p in parts]
+    def _exec_return(self, node):
+        expr = node.args[0]
+        self._return_value = self._eval(expr) if expr is not None else None
+        return SIGNAL_RETURN
 
-    def _console_clear(self):
+    def _exec_lua_snippet(self, node):
+        if not self.flags["include_lua"] or self.run_lua_block is None:
+            raise GXRuntimeError("lua_snippet used but Lua is not enabled", self.current_line)
+        if not self._hooked:
+            self.run_lua_block(node.code, node.code_line)
+            return
+        self.hooks.emit("snippet_start", "lua", node)
+        try:
+            self.run_lua_block(node.code, node.code_line)
+        finally:
+            self.hooks.emit("snippet_stop", "lua", node)
+
+    def _exec_py_snippet(self, node):
+        if not self.flags["include_python"] or self.run_python_block is None:
+            raise GXRuntimeError("py_snippet used but Python is not enabled", self.current_line)
+        if not self._hooked:
+            self.run_python_block(node.code, node.code_line)
+            return
+        self.hooks.emit("snippet_start", "py", node)
+        try:
+            self.run_python_block(node.code, node.code_line)
+        finally:
+            self.hooks.emit("snippet_stop", "py", node)
+
+    def _say(self, node):
+        values = [self._eval(e) for e in node.args]
+        self.console_write(" ".join(str(v) for v in values) + "\n")
+
+    def _console_clear(self, node=None):
         obj = getattr(self.console_write, "__self__", None)
         if obj is not None and hasattr(obj, "clear_output"):
             obj.clear_output()
             return
         self.console_write("\n")
 
-    def _after_equals_or_space(self, line, head):
-        s = line[len(head):].strip()
-        if s.startswith("="):
-            s = s[1:].strip()
-        return s.strip()
+    def _var_set(self, node):
+        var, expr = node.args
+        self.vars[var] = self._eval(expr)
 
-    def _var_set(self, line):
-        parts = line.split("=", 1)[1].split(",", 1)
-        var = parts[0].strip()
-        value = self._eval_expr(parts[1].strip())
-        self.vars[var] = value
-
-    def _var_ask(self, line):
-        parts = line.split("=", 1)[1].split(",", 1)
-        var = parts[0].strip()
-        question = self._eval_expr(parts[1].strip())
-        value = self.input_request(question)
+    def _var_ask(self, node):
+        var, expr = node.args
+        question = self._eval(expr)
+        try:
+            if self._hooked:
+                self.hooks.emit("input_wait_start", question)
+                value = self.input_request(question)
+                self.hooks.emit("input_wait_stop", value)
+            else:
+                value = self.input_request(question)
+        except InputExhausted as e:
+            raise GXRuntimeError(str(e), self.current_line)
         self.vars[var] = value
 
-    def _var_math_typed(self, line):
-        match = re.match(r"var\.math_(add|sub|mul|div)\s*=\s*(.*)", line)
-        if not match:
-            raise GXRuntimeError("Invalid var.math_* syntax", self.current_line)
-        op = match.group(1)
-        parts = [p.strip() for p in match.group(2).split(",")]
-        if len(parts) != 3:
-            raise GXRuntimeError("Invalid var.math_* args", self.current_line)
-        a = self._eval_expr(parts[0])
-        b = self._eval_expr(parts[1])
-        out = parts[2]
+    def _var_math_typed(self, node):
+        op, ea, eb, out = node.args
+        a = self._eval(ea)
+        b = self._eval(eb)
         if op == "add":
             self.vars[out] = a + b
         elif op == "sub":
@@ -310,53 +1278,66 @@ class GXEngine:
         elif op == "div":
             self.vars[out] = a / b
 
-    def _var_math_expr(self, line):
-        parts = line.split("=", 1)[1].split(",", 1)
-        out = parts[0].strip()
-        expr = parts[1].strip()
-        self.vars[out] = self._eval_expr(expr)
+    def _var_math_expr(self, node):
+        out, expr = node.args
+        self.vars[out] = self._eval(expr)
 
-    def _table_add(self, line):
-        parts = line.split("=", 1)[1].split(",")
-        table = parts[0].strip()
-        value = self._eval_expr(parts[1].strip())
-        if table not in self.vars or not isinstance(self.vars[table], list):
-            self.vars[table] = []
-        self.vars[table].append(value)
+    def _var_inc(self, node):
+        var = node.args[0]
+        if var not in self.vars:
+            self.vars[var] = 0
+        self.vars[var] = self.vars[var] + 1
 
-    def _table_remove(self, line):
-        parts = line.split("=", 1)[1].split(",")
-        table = parts[0].strip()
-        value = self._eval_expr(parts[1].strip())
+    def _var_dec(self, node):
+        var = node.args[0]
+        if var not in self.vars:
+            self.vars[var] = 0
+        self.vars[var] = self.vars[var] - 1
+
+    def _table_add(self, node):
+        table, expr = node.args
+        value = self._eval(expr)
+        items = self.vars.get(table)
+        if not isinstance(items, list):
+            items = []
+        items.append(value)
+        self.vars[table] = items
+
+    def _table_remove(self, node):
+        table, expr = node.args
+        value = self._eval(expr)
         if table not in self.vars or not isinstance(self.vars[table], list):
             raise GXRuntimeError("table.remove target is not a table", self.current_line)
         self.vars[table].remove(value)
+        self.vars[table] = self.vars[table]
 
-    def _table_get(self, line):
-        parts = line.split("=", 1)[1].split(",")
-        table = parts[0].strip()
-        index = int(self._eval_expr(parts[1].strip()))
-        out = parts[2].strip()
+    def _table_get(self, node):
+        table, expr, out = node.args
+        index = int(self._eval(expr))
         if table not in self.vars or not isinstance(self.vars[table], list):
             raise GXRuntimeError("table.get target is not a table", self.current_line)
         self.vars[out] = self.vars[table][index]
 
-    def _debug_print(self, line):
-        level = "info"
-        if "-e" in line:
-            level = "error"
-        elif "-w" in line:
-            level = "warning"
-        message = re.findall(r'"(.*?)"', line)
-        if message:
-            self.debugger_write(message[0], level, line=self.current_line, source="GX")
+    def _debug_print(self, node):
+        message, level = node.args
+        if message is not None:
+            self.debugger_write(message, level, line=self.current_line, source="GX")
         else:
             self.debugger_write("debugprint missing string", "warning", line=self.current_line, source="GX")
 
-    def _eval_expr(self, expr):
-        expr = expr.replace("true", "True").replace("false", "False")
+    def _eval(self, expr: GXExpr):
+        if expr.mode:
+            value = expr.value
+            if value is not _UNSET:
+                return value
         try:
-            tree = ast.parse(expr, mode="eval")
-            return eval(compile(tree, filename="", mode="eval"), {}, self.vars)
+            value = eval(expr.compile(), {}, self.vars)
         except Exception:
-            raise GXRuntimeError("Invalid expression: " + expr, self.current_line)
\ No newline at end of file
+            raise GXRuntimeError("Invalid expression: " + expr.source, self.current_line)
+        if expr.mode == EXPR_MEMO and isinstance(value, IMMUTABLE_TYPES):
+            expr.value = value
+        return value
+
+    def _reset_memo(self, exprs):
+        for expr in exprs:
+            expr.value = _UNSET
@@ -0,0 +1,116 @@
+import hashlib
+import os
+import pickle
+import threading
+from dataclasses import dataclass
+
+from gx_engine import GXProgram, GXParser, scan_directives
+
+import settings
+
+PROGRAM_FORMAT = 3
+
+
+@dataclass
+class GXModule:
+    path: str
+    digest: str
+    program: GXProgram
+    mtime_ns: int
+    size: int
+
+
+class GXModuleCache:
+    def __init__(self, cache_dir: str | None = None):
+        self.cache_dir = cache_dir
+        self.resolvers = []
+        self.hits = 0
+        self.parses = 0
+        self._modules: dict[str, GXModule] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, name: str, base_dir: str | None):
+        name = name.strip().strip("\"'")
+        if not name:
+            return None
+        candidates = [name] if name.endswith(".gxscript") else [name, name + ".gxscript"]
+        root = base_dir or os.getcwd()
+        for cand in candidates:
+            full = cand if os.path.isabs(cand) else os.path.join(root, cand)
+            if os.path.isfile(full):
+                return os.path.normcase(os.path.abspath(full))
+        for resolver in self.resolvers:
+            found = resolver(name, base_dir)
+            if found:
+                return os.path.normcase(os.path.abspath(found))
+        return None
+
+    def load(self, path: str) -> GXModule:
+        st = os.stat(path)
+        with self._lock:
+            mod = self._modules.get(path)
+            if mod is not None and mod.mtime_ns == st.st_mtime_ns and mod.size == st.st_size:
+                self.hits += 1
+                return mod
+
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha1(data).hexdigest()
+
+        with self._lock:
+            if mod is not None and mod.digest == digest:
+                mod.mtime_ns = st.st_mtime_ns
+                mod.size = st.st_size
+                self.hits += 1
+                return mod
+
+        program = self._load_compiled(path, digest)
+        if program is None:
+            text = data.decode("utf-8", errors="replace").replace("\r\n", "\n")
+            lines = text.split("\n")
+            program = GXParser(lines, scan_directives(lines)).parse()
+            self.parses += 1
+            self._store_compiled(path, digest, program)
+        else:
+            self.hits += 1
+
+        mod = GXModule(path=path, digest=digest, program=program, mtime_ns=st.st_mtime_ns, size=st.st_size)
+        with self._lock:
+            self._modules[path] = mod
+        return mod
+
+    def clear(self):
+        with self._lock:
+            self._modules.clear()
+
+    def _compiled_path(self, path: str):
+        key = hashlib.sha1(path.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + ".gxc")
+
+    def _load_compiled(self, path: str, digest: str):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._compiled_path(path), "rb") as f:
+                blob = pickle.load(f)
+        except Exception:
+            return None
+        if blob.get("format") != PROGRAM_FORMAT or blob.get("digest") != digest:
+            return None
+        return blob.get("program")
+
+    def _store_compiled(self, path: str, digest: str, program: GXProgram):
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            target = self._compiled_path(path)
+            tmp = target + f".{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump({"format": PROGRAM_FORMAT, "digest": digest, "program": program}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, target)
+        except Exception:
+            pass
+
+
+MODULE_CACHE = GXModuleCache(settings.MODULE_CACHE_DIR)
@@ -0,0 +1,234 @@
+import argparse
+import os
+import sys
+from dataclasses import dataclass, field
+
+from gx_engine import GXEngine, GXRuntimeError, GXSyntaxError
+from python_engine import PythonEngine
+from lua_engine import LuaEngine
+from input_providers import InputExhausted, InputRouter, RecordingInput, StdinInput, load_inputs
+from run_cache import CachedRun, RunCache, engine_options
+from mem_profile import MemoryProfiler
+from workspace_index import WorkspaceIndex
+from gx_modules import MODULE_CACHE
+
+import settings
+
+
+@dataclass
+class DebugRecord:
+    message: str
+    level: str
+    line: int | None
+    source: str
+
+
+@dataclass
+class RunResult:
+    path: str | None
+    output: str
+    debug: list
+    vars: dict
+    error: Exception | None = None
+    answers: list = field(default_factory=list)
+    cached: bool = False
+
+    @property
+    def ok(self):
+        return self.error is None and not any(d.level == "error" for d in self.debug)
+
+
+class HeadlessConsole:
+    def __init__(self, echo=None):
+        self.parts = []
+        self.echo = echo
+
+    def write(self, text):
+        text = str(text)
+        self.parts.append(text)
+        if self.echo is not None:
+            self.echo(text)
+
+    def clear_output(self):
+        self.parts = []
+
+    def text(self):
+        return "".join(self.parts)
+
+
+class HeadlessRunner:
+    def __init__(self, inputs=None, record=False, echo=None, cache_dir=None, on_debug=None):
+        self.console = HeadlessConsole(echo)
+        self.debug = []
+        self.on_debug = on_debug
+        self.recorder = None
+        self.cache = RunCache(cache_dir) if cache_dir else None
+
+        provider = load_inputs(inputs if inputs is not None else settings.INPUT_FILE) or StdinInput()
+        if record:
+            provider = self.recorder = RecordingInput(provider)
+        self.input = InputRouter(provider)
+
+        self.gx_engine = GXEngine(
+            console_write=self.console.write,
+            debugger_write=self._debug_write,
+            input_request=self._ask,
+            run_python_block=self._run_python_block,
+            run_lua_block=self._run_lua_block,
+            run_python_map=self._run_python_map
+        )
+        self._py_engine = None
+        self._lua_engine = None
+
+    @property
+    def py_engine(self):
+        if self._py_engine is None:
+            self._py_engine = PythonEngine(self.console.write, self._debug_write, input_request=self.input)
+        return self._py_engine
+
+    @property
+    def lua_engine(self):
+        if self._lua_engine is None:
+            self._lua_engine = LuaEngine(self.console.write, self._debug_write, input_request=self.input)
+        return self._lua_engine
+
+    def _debug_write(self, message, level="info", line=None, source="GX"):
+        record = DebugRecord(str(message), level, line, source)
+        self.debug.append(record)
+        if self.on_debug is not None:
+            self.on_debug(record)
+
+    def _ask(self, question):
+        self.console.write(str(question) + "\n")
+        value = self.input(question)
+        self.console.write(f"> {value}\n")
+        return value
+
+    def _run_python_block(self, code, start_line):
+        self.py_engine.execute(code, filename=self.gx_engine.script_path or "<python>", extra_globals=self.gx_engine.vars)
+
+    def _run_python_map(self, code, start_line, name, items):
+        return self.py_engine.map(code, self.gx_engine.script_path or "<python>", name, items, extra_globals=self.gx_engine.vars)
+
+    def _run_lua_block(self, code, start_line):
+        self.lua_engine.use_runtime(self.gx_engine.program.flags.get("lua_runtime"))
+        self.lua_engine.inject_globals(self.gx_engine.vars)
+        self.lua_engine.execute(code, filename=self.gx_engine.script_path or "<lua>", first_line=start_line)
+        self.lua_engine.sync_back(self.gx_engine.vars)
+
+    def run(self, code: str, path: str | None = None) -> RunResult:
+        self.console.clear_output()
+        self.debug = []
+        answers_before = len(self.recorder.answers) if self.recorder else 0
+        if self._lua_engine is not None:
+            self._lua_engine.begin_run()
+        if self._py_engine is not None:
+            self._py_engine.begin_run()
+        error = None
+
+        mode = os.path.splitext(path)[1].lower() if path else ".gxscript"
+        key = None
+        if self.cache is not None and mode not in (".py", ".lua"):
+            provider = self.input.provider or self.input.default
+            options = engine_options(self.gx_engine, self._py_engine, self._lua_engine)
+            key = self.cache.key(code, path, provider, options)
+            hit = self.cache.get(key) if key else None
+            if hit is not None:
+                return self._replay(hit, path, provider)
+
+        used_before = self._inputs_used()
+        try:
+            if mode == ".py":
+                self.py_engine.execute(code, filename=path)
+            elif mode == ".lua":
+                self.lua_engine.use_runtime()
+                self.lua_engine.execute(code, filename=path)
+            else:
+                self.gx_engine.execute(code, path=path)
+        except (GXRuntimeError, GXSyntaxError, InputExhausted) as e:
+            error = e
+            self._debug_write(str(e), "error", getattr(e, "line", None), "GX")
+
+        answers = self.recorder.answers[answers_before:] if self.recorder else []
+        result = RunResult(path, self.console.text(), self.debug, dict(self.gx_engine.vars), error, answers)
+        if key and error is None:
+            used = self._inputs_used() - used_before
+            self.cache.put(key, CachedRun(result.output, [(d.message, d.level, d.line, d.source) for d in result.debug], result.vars, answers, used))
+        return result
+
+    def _inputs_used(self):
+        provider = self.input.provider or self.input.default
+        provider = getattr(provider, "inner", provider)
+        return getattr(provider, "used", 0)
+
+    def _replay(self, hit, path, provider):
+        if hit.inputs_used:
+            if isinstance(provider, RecordingInput):
+                provider.skip(hit.inputs_used, hit.answers)
+            else:
+                provider.skip(hit.inputs_used)
+        self.console.write(hit.output)
+        self.debug = [DebugRecord(*d) for d in hit.debug]
+        if self.on_debug is not None:
+            for record in self.debug:
+                self.on_debug(record)
+        self.gx_engine.vars = dict(hit.vars)
+        return RunResult(path, hit.output, self.debug, dict(hit.vars), None, list(hit.answers), cached=True)
+
+    def run_file(self, path: str) -> RunResult:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            code = f.read().replace("\r\n", "\n")
+        return self.run(code, path=os.path.abspath(path))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python headless.py", description="Run GXScript files without the IDE")
+    ap.add_argument("scripts", nargs="+", help="scripts to run in order")
+    ap.add_argument("-i", "--inputs", help="answers for var.ask/input(): a text file (one per line), a recorded .json session or - for stdin")
+    ap.add_argument("--record", help="save the answers given during the run as a replayable .json session")
+    ap.add_argument("-q", "--quiet", action="store_true", help="do not echo console output")
+    ap.add_argument("--cache", default=settings.RUN_CACHE_DIR, help="reuse results of unchanged deterministic scripts from this directory")
+    ap.add_argument("--no-cache", action="store_true", help="always execute, even if --cache or GX_RUN_CACHE_DIR is set")
+    ap.add_argument("--memory", action="store_true", help="profile Python/Lua memory per line and snippet and report the largest variables (implies --no-cache)")
+    ap.add_argument("--workspace", help="also resolve #import names by searching the script files under this folder")
+    args = ap.parse_args(argv)
+
+    if args.workspace:
+        MODULE_CACHE.resolvers.append(WorkspaceIndex(args.workspace).build().resolve)
+    echo = None if args.quiet else sys.stdout.write
+    cache_dir = None if args.no_cache or args.memory else args.cache
+    runner = HeadlessRunner(inputs=args.inputs, record=bool(args.record), echo=echo, cache_dir=cache_dir)
+    profiler = MemoryProfiler() if args.memory else None
+    failed = 0
+    for script in args.scripts:
+        if profiler is not None:
+            profiler.attach(runner.gx_engine, runner.py_engine, runner.lua_engine)
+            try:
+                result = runner.run_file(script)
+            finally:
+                profiler.detach()
+            for message, line in profiler.summary():
+                runner._debug_write(message, "info", line, "MEM")
+        else:
+            result = runner.run_file(script)
+        for d in result.debug:
+            where = f":{d.line}" if d.line else ""
+            print(f"[{d.source} {d.level}] {script}{where} {d.message}", file=sys.stderr)
+        if not result.ok:
+            failed += 1
+        if runner.cache is not None and runner.cache.last_reason:
+            print(f"[cache] {script}: not cached, {runner.cache.last_reason}", file=sys.stderr)
+
+    if runner.cache is not None:
+        c = runner.cache
+        print(f"[cache] {c.hits} hit(s), {c.misses} miss(es), {c.skipped} uncacheable", file=sys.stderr)
+
+    if args.record and runner.recorder is not None:
+        runner.recorder.save(args.record)
+    if runner._py_engine is not None:
+        runner._py_engine.shutdown()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+GX_EVENTS = (
+    "run_start", "run_stop",
+    "line", "block_enter", "block_exit",
+    "snippet_start", "snippet_stop",
+    "var_write",
+    "input_wait_start", "input_wait_stop",
+)
+
+EXEC_EVENTS = ("exec_start", "exec_stop", "input_wait_start", "input_wait_stop")
+
+
+class EngineHooks:
+    def __init__(self, events=GX_EVENTS):
+        self.events = tuple(events)
+        self._listeners: dict[str, list] = {}
+
+    def add(self, event: str, fn):
+        if event not in self.events:
+            raise ValueError(f"Unknown hook event: {event}")
+        self._listeners.setdefault(event, []).append(fn)
+        return fn
+
+    def remove(self, event: str, fn):
+        fns = self._listeners.get(event)
+        if not fns or fn not in fns:
+            return
+        fns.remove(fn)
+        if not fns:
+            del self._listeners[event]
+
+    def clear(self):
+        self._listeners.clear()
+
+    def has(self, event: str) -> bool:
+        return event in self._listeners
+
+    def emit(self, event: str, *args):
+        for fn in self._listeners.get(event, ()):
+            fn(*args)
+
+    def __bool__(self):
+        return bool(self._listeners)
+
+
+class TrackedVars(dict):
+    __slots__ = ("on_write",)
+
+    def __init__(self, data=(), on_write=None):
+        super().__init__(data)
+        self.on_write = on_write
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if self.on_write is not None:
+            self.on_write(key, value)
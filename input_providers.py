@@ -0,0 +1,110 @@
+import json
+import os
+import sys
+
+SESSION_FORMAT = 1
+
+
+class InputExhausted(RuntimeError):
+    pass
+
+
+class IteratorInput:
+    def __init__(self, values):
+        self.values = ["" if v is None else str(v) for v in values]
+        self.used = 0
+
+    def __call__(self, prompt=""):
+        if self.used >= len(self.values):
+            raise InputExhausted(f"No scripted input left for: {prompt}")
+        self.used += 1
+        return self.values[self.used - 1]
+
+    def remaining(self):
+        return self.values[self.used:]
+
+    def skip(self, count: int):
+        self.used = min(len(self.values), self.used + count)
+
+
+class FileInput(IteratorInput):
+    def __init__(self, path: str, encoding: str = "utf-8"):
+        with open(path, "r", encoding=encoding) as f:
+            lines = f.read().splitlines()
+        super().__init__(lines)
+        self.path = path
+
+
+class SessionInput(IteratorInput):
+    def __init__(self, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("format") != SESSION_FORMAT:
+            raise ValueError(f"Unsupported input session format in {path}")
+        self.answers = data.get("answers", [])
+        super().__init__(a.get("value", "") for a in self.answers)
+        self.path = path
+
+
+class StdinInput:
+    def __call__(self, prompt=""):
+        line = sys.stdin.readline()
+        if not line:
+            raise InputExhausted(f"No input left on stdin for: {prompt}")
+        return line.rstrip("\r\n")
+
+
+class RecordingInput:
+    def __init__(self, inner):
+        self.inner = inner
+        self.answers = []
+
+    def __call__(self, prompt=""):
+        value = self.inner(prompt)
+        self.answers.append({"prompt": str(prompt), "value": value})
+        return value
+
+    def remaining(self):
+        inner = getattr(self.inner, "remaining", None)
+        return inner() if inner is not None else None
+
+    def skip(self, count: int, answers=()):
+        self.answers.extend(answers)
+        self.inner.skip(count)
+
+    def to_json(self):
+        return {"format": SESSION_FORMAT, "answers": self.answers}
+
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, indent=1)
+        os.replace(tmp, path)
+
+
+class InputRouter:
+    def __init__(self, default):
+        self.default = default
+        self.provider = None
+
+    def __call__(self, prompt=""):
+        return (self.provider or self.default)(prompt)
+
+    def use(self, provider):
+        self.provider = provider
+
+    def reset(self):
+        self.provider = None
+
+
+def load_inputs(source):
+    if source is None or callable(source):
+        return source
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        if path == "-":
+            return StdinInput()
+        if path.lower().endswith(".json"):
+            return SessionInput(path)
+        return FileInput(path)
+    return IteratorInput(source)
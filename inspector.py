@@ -0,0 +1,213 @@
+import time
+
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QSizePolicy, QTreeWidget, QTreeWidgetItem
+)
+
+from var_inspect import ScopeDiff, children, expandable, preview, python_scope, size_text, type_name
+
+import settings
+
+
+class VarItem(QTreeWidgetItem):
+    def __init__(self, parent, texts, value=None, more=False):
+        super().__init__(parent, texts)
+        self.value = value
+        self.loaded = 0
+        self.more = more
+
+
+class GXInspector(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.gx_engine = None
+        self.py_engine = None
+        self.lua_engine = None
+        self.rows = {"GX": {}, "Call": {}, "Python": {}, "Lua": {}}
+        self.gx_dirty = set()
+        self.frame_dirty = set()
+        self._gx_reset = True
+        self._frame_reset = True
+        self._shown_frame = None
+        self._py_diff = ScopeDiff()
+        self._lua_diff = ScopeDiff()
+        self._attached = []
+        self._running = False
+        self._last_frame = 0.0
+
+        self.title = QLabel("Variables")
+        self.title.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.btn_refresh = QPushButton("Refresh")
+
+        top = QHBoxLayout()
+        top.addWidget(self.title)
+        top.addWidget(self.btn_refresh)
+
+        self.tree = QTreeWidget()
+        self.tree.setColumnCount(4)
+        self.tree.setHeaderLabels(["Name", "Type", "Size", "Value"])
+        self.tree.setUniformRowHeights(True)
+        self.scopes = {}
+        for name in self.rows:
+            item = QTreeWidgetItem([name])
+            self.tree.addTopLevelItem(item)
+            item.setExpanded(True)
+            self.scopes[name] = item
+        self.scopes["Call"].setHidden(True)
+
+        root = QVBoxLayout()
+        root.addLayout(top)
+        root.addWidget(self.tree)
+        self.setLayout(root)
+
+        self.tree.itemExpanded.connect(self._on_expanded)
+        self.tree.itemDoubleClicked.connect(self._on_double_clicked)
+        self.btn_refresh.clicked.connect(self.refresh)
+
+    def attach(self, gx_engine, py_engine=None, lua_engine=None):
+        self.detach()
+        self.gx_engine, self.py_engine, self.lua_engine = gx_engine, py_engine, lua_engine
+        self._add(gx_engine.hooks, "run_start", self._on_run_start)
+        self._add(gx_engine.hooks, "run_stop", self._on_run_stop)
+        self._add(gx_engine.hooks, "var_write", self._on_var_write)
+        for engine in (py_engine, lua_engine):
+            if engine is not None:
+                self._add(engine.hooks, "exec_stop", self._on_exec_stop)
+        self.refresh()
+        return self
+
+    def detach(self):
+        for hooks, event, fn in self._attached:
+            hooks.remove(event, fn)
+        self._attached = []
+
+    def refresh(self):
+        self._gx_reset = True
+        self._frame_reset = True
+        self._py_diff.reset()
+        self._lua_diff.reset()
+        self.flush()
+
+    def flush(self):
+        self._last_frame = time.perf_counter()
+        engine = self.gx_engine
+        in_call = engine is not None and bool(engine.call_stack)
+        gx = (engine.globals if in_call else getattr(engine, "vars", None)) or {}
+        if self._gx_reset:
+            self._gx_reset = False
+            self.gx_dirty.clear()
+            self._set_scope("GX", gx, set(gx) | set(self.rows["GX"]))
+        elif self.gx_dirty:
+            names, self.gx_dirty = self.gx_dirty, set()
+            self._set_scope("GX", gx, names)
+        self._flush_frame(engine.vars if in_call else None)
+        if self.py_engine is not None:
+            scope = python_scope(self.py_engine.session_globals)
+            self._set_scope("Python", scope, self._py_diff.changed(scope))
+        if self.lua_engine is not None:
+            scope = self.lua_engine.user_globals()
+            self._set_scope("Lua", scope, self._lua_diff.changed(scope))
+
+    def _flush_frame(self, frame):
+        item = self.scopes["Call"]
+        if self._frame_reset or frame is not self._shown_frame:
+            self._frame_reset = False
+            self._shown_frame = frame
+            self.frame_dirty.clear()
+            values = frame or {}
+            self._set_scope("Call", values, set(values) | set(self.rows["Call"]))
+            if frame is not None:
+                name, line = self.gx_engine.call_stack[-1]
+                item.setText(0, f"Call {name} (line {line})")
+            item.setHidden(frame is None)
+        elif self.frame_dirty:
+            names, self.frame_dirty = self.frame_dirty, set()
+            self._set_scope("Call", frame, names)
+
+    def _add(self, hooks, event, fn):
+        hooks.add(event, fn)
+        self._attached.append((hooks, event, fn))
+
+    def _on_run_start(self, engine):
+        self._running = True
+        self._gx_reset = True
+        self._frame_reset = True
+        self.flush()
+
+    def _on_run_stop(self, engine):
+        self._running = False
+        self.flush()
+
+    def _on_var_write(self, name, value):
+        # Inside a func every GX write goes to the call frame
+        if self.gx_engine.call_stack:
+            self.frame_dirty.add(name)
+        else:
+            self.gx_dirty.add(name)
+        self._frame()
+
+    def _on_exec_stop(self, kind, filename):
+        if self._running:
+            self._frame()
+        else:
+            self.flush()
+
+    def _frame(self):
+        if (time.perf_counter() - self._last_frame) * 1000 < settings.INSPECTOR_FRAME_MS:
+            return
+        self.flush()
+        if self._running:
+            self.tree.viewport().repaint()
+
+    def _set_scope(self, scope, values, names):
+        rows = self.rows[scope]
+        parent = self.scopes[scope]
+        for name in names:
+            item = rows.get(name)
+            if name not in values:
+                if item is not None:
+                    parent.removeChild(rows.pop(name))
+                continue
+            if item is None:
+                item = rows[name] = VarItem(parent, [str(name)])
+            self._fill(item, values[name])
+        parent.setText(2, f"{len(rows)} vars")
+
+    def _fill(self, item, value):
+        item.setText(1, type_name(value))
+        item.setText(2, size_text(value))
+        item.setText(3, preview(value))
+        item.value = value
+        item.loaded = 0
+        was_open = item.isExpanded()
+        item.takeChildren()
+        if expandable(value):
+            item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+            if was_open:
+                self._load_page(item)
+        else:
+            item.setChildIndicatorPolicy(QTreeWidgetItem.DontShowIndicatorWhenChildless)
+
+    def _load_page(self, item):
+        start = item.loaded
+        try:
+            page, more = children(item.value, start, settings.INSPECTOR_PAGE_SIZE)
+        except Exception as e:
+            VarItem(item, ["", "", "", f"<cannot expand: {e}>"])
+            return
+        for label, value in page:
+            self._fill(VarItem(item, [label]), value)
+        item.loaded = start + len(page)
+        if more:
+            VarItem(item, [f"... more (showing {item.loaded})"], more=True)
+
+    def _on_expanded(self, item):
+        if isinstance(item, VarItem) and not item.more and not item.loaded and item.childCount() == 0:
+            self._load_page(item)
+
+    def _on_double_clicked(self, item, column):
+        if not isinstance(item, VarItem) or not item.more:
+            return
+        parent = item.parent()
+        parent.removeChild(item)
+        self._load_page(parent)
@@ -0,0 +1,265 @@
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from dataclasses import dataclass
+
+import settings
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+WIDE_CHAR = re.compile("[\U00010000-\U0010FFFF]")
+
+
+@dataclass
+class RecoveredDocument:
+    key: str
+    path: str | None
+    text: str
+    updated: float
+
+
+def _lock(f) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif msvcrt is not None:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(f):
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        elif msvcrt is not None:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    except OSError:
+        pass
+
+
+def _wide_offsets(text, start=0):
+    """UTF-16 offsets of the characters outside the BMP, which Qt counts as two positions."""
+    return [start + m.start() + i for i, m in enumerate(WIDE_CHAR.finditer(text))]
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+    except OSError:
+        return None, None
+
+
+class EditJournal:
+    def __init__(self, directory: str, get_text=None):
+        self.directory = directory
+        self.get_text = get_text
+        os.makedirs(directory, exist_ok=True)
+
+        self.key = None
+        self.path = None
+        self.paused = False
+        self._lock_file = None
+        self._since_compact = 0
+        self._compact_limit = settings.JOURNAL_COMPACT_BYTES
+        self._wide = []
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def start(self, path: str | None, doc_size: int = 0, encoding: str = "utf-8"):
+        self.discard()
+        if path:
+            key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+        else:
+            key = "untitled-" + uuid.uuid4().hex[:12]
+
+        lock_file = open(self._file(key, ".lock"), "a+b")
+        if not _lock(lock_file):
+            lock_file.close()
+            self.key = None
+            return False
+
+        self.key = key
+        self.path = path
+        self._lock_file = lock_file
+        self._since_compact = 0
+        self._compact_limit = max(settings.JOURNAL_COMPACT_BYTES, doc_size)
+        self._wide = _wide_offsets(self.get_text()) if self.get_text is not None else []
+        size, mtime = _file_stamp(path) if path else (None, None)
+        self._queue.put(("reset", key, {"t": "base", "path": path, "encoding": encoding, "size": size, "mtime": mtime, "ts": time.time()}))
+        return True
+
+    def record(self, position: int, removed: int, inserted: str):
+        """position and removed are Qt document positions (UTF-16 code units); the journal stores code points."""
+        if self.key is None or self.paused:
+            return
+        added = _wide_offsets(inserted, position)
+        if self._wide or added:
+            wide = self._wide
+            lo = bisect_left(wide, position)
+            hi = bisect_left(wide, position + removed)
+            shift = len(inserted) + len(added) - removed
+            self._wide = wide[:lo] + added + [w + shift for w in wide[hi:]]
+            position, removed = position - lo, removed - (hi - lo)
+        self._queue.put(("append", self.key, {"t": "edit", "pos": position, "del": removed, "ins": inserted}))
+        self._since_compact += len(inserted) + 32
+        if self._since_compact >= self._compact_limit and self.get_text is not None:
+            self.compact(self.get_text())
+
+    def compact(self, text: str):
+        if self.key is None:
+            return
+        self._since_compact = 0
+        self._compact_limit = max(settings.JOURNAL_COMPACT_BYTES, len(text))
+        self._wide = _wide_offsets(text)
+        self._queue.put(("reset", self.key, {"t": "snap", "path": self.path, "text": text, "ts": time.time()}))
+
+    def discard(self):
+        if self.key is not None:
+            self._queue.put(("delete", self.key, None))
+        self._release()
+
+    def flush(self, timeout: float = 5.0):
+        done = threading.Event()
+        self._queue.put(("sync", None, done))
+        done.wait(timeout)
+
+    def _release(self):
+        if self._lock_file is not None:
+            _unlock(self._lock_file)
+            self._lock_file.close()
+            self._lock_file = None
+        self.key = None
+
+    def _file(self, key, ext=".jsonl"):
+        return os.path.join(self.directory, key + ext)
+
+    def _writer(self):
+        handles = {}
+        last_sync = time.monotonic()
+        while True:
+            op, key, payload = self._queue.get()
+            try:
+                if op == "sync":
+                    for f in handles.values():
+                        f.flush()
+                        os.fsync(f.fileno())
+                    payload.set()
+                    continue
+
+                if op in ("reset", "delete") and key in handles:
+                    handles.pop(key).close()
+
+                if op == "delete":
+                    for ext in (".jsonl", ".lock"):
+                        try:
+                            os.remove(self._file(key, ext))
+                        except OSError:
+                            pass
+                    continue
+
+                if op == "reset":
+                    tmp = self._file(key, ".tmp")
+                    with open(tmp, "w", encoding="utf-8") as f:
+                        f.write(json.dumps(payload) + "\n")
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp, self._file(key))
+                    continue
+
+                f = handles.get(key)
+                if f is None:
+                    f = handles[key] = open(self._file(key), "a", encoding="utf-8")
+                f.write(json.dumps(payload) + "\n")
+
+                if self._queue.empty():
+                    f.flush()
+                    now = time.monotonic()
+                    if now - last_sync >= settings.JOURNAL_FSYNC_SECONDS:
+                        os.fsync(f.fileno())
+                        last_sync = now
+            except Exception:
+                pass
+
+    @staticmethod
+    def find_orphans(directory: str):
+        out = []
+        if not os.path.isdir(directory):
+            return out
+        for name in os.listdir(directory):
+            if not name.endswith(".jsonl"):
+                continue
+            key = name[:-len(".jsonl")]
+            with open(os.path.join(directory, key + ".lock"), "a+b") as lock_file:
+                if not _lock(lock_file):
+                    continue
+                try:
+                    doc = EditJournal.replay(os.path.join(directory, name), key)
+                finally:
+                    _unlock(lock_file)
+            if doc is not None:
+                out.append(doc)
+            else:
+                EditJournal.remove(directory, key)
+        out.sort(key=lambda d: d.updated, reverse=True)
+        return out
+
+    @staticmethod
+    def replay(journal_path: str, key: str = ""):
+        text = None
+        path = None
+        edits = 0
+        with open(journal_path, "r", encoding="utf-8") as f:
+            for raw in f:
+                try:
+                    rec = json.loads(raw)
+                except ValueError:
+                    break
+                t = rec.get("t")
+                if t == "base":
+                    path = rec.get("path")
+                    text = ""
+                    if path:
+                        if _file_stamp(path) != (rec.get("size"), rec.get("mtime")):
+                            return None
+                        with open(path, "r", encoding=rec.get("encoding") or "utf-8", errors="replace") as src:
+                            text = src.read()
+                elif t == "snap":
+                    path = rec.get("path")
+                    text = rec.get("text", "")
+                    edits += 1
+                elif t == "edit" and text is not None:
+                    pos = rec["pos"]
+                    text = text[:pos] + rec["ins"] + text[pos + rec["del"]:]
+                    edits += 1
+        if text is None or edits == 0:
+            return None
+        return RecoveredDocument(key=key, path=path, text=text, updated=os.path.getmtime(journal_path))
+
+    @staticmethod
+    def remove(directory: str, key: str):
+        for ext in (".jsonl", ".lock"):
+            try:
+                os.remove(os.path.join(directory, key + ext))
+            except OSError:
+                pass
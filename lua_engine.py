@@ -1,15 +1,88 @@
+import importlib
 import re
+import time
 import traceback
-from lupa import LuaRuntime
+from collections import OrderedDict
+
+from hooks import EngineHooks, EXEC_EVENTS
+
+import settings
+
+# lupa builds one module per bundled Lua; the first importable entry wins.
+LUA_RUNTIMES = {
+    "luajit": ("lupa.luajit21", "lupa.luajit20"),
+    "lua55": ("lupa.lua55",),
+    "lua54": ("lupa.lua54",),
+    "lua53": ("lupa.lua53",),
+    "lua52": ("lupa.lua52",),
+    "lua51": ("lupa.lua51",),
+}
+
+
+def runtime_class(name):
+    for module_name in LUA_RUNTIMES.get(name, ()):
+        try:
+            return importlib.import_module(module_name).LuaRuntime, module_name
+        except ImportError:
+            continue
+    from lupa import LuaRuntime
+    return LuaRuntime, LuaRuntime.__module__
+
+
+class LuaInterrupted(RuntimeError):
+    def __init__(self, message, line=None):
+        super().__init__(message)
+        self.line = line
 
 
 class LuaEngine:
-    def __init__(self, console_write, debugger_write, input_request=None):
+    def __init__(self, console_write, debugger_write, input_request=None, runtime=None):
         self.console_write = console_write
         self.debugger_write = debugger_write
         self.input_request = input_request
-        self.lua = LuaRuntime(unpack_returned_tuples=True)
-        self._install_hooks()
+        self.runtime = runtime or settings.LUA_RUNTIME
+        self.runtime_module = None
+        self._lua = None
+        self._load = None
+        self._builtin_names = set()
+        self.hooks = EngineHooks(EXEC_EVENTS)
+
+        self.chunk_cache_size = settings.LUA_CHUNK_CACHE_SIZE
+        self.chunk_hits = 0
+        self.chunk_compiles = 0
+        self._chunks = OrderedDict()
+        self._reported = set()
+
+        # Debug count hook: called every hook_count VM instructions while a
+        # chunk runs, armed only when idle or a budget needs it (cancel() is
+        # checked from the same hook); 0 disables it altogether.
+        self.hook_count = settings.LUA_HOOK_COUNT
+        self.max_instructions = settings.LUA_MAX_INSTRUCTIONS
+        self.cpu_budget = settings.LUA_CPU_BUDGET
+        self.idle = None
+        self.idle_interval = settings.LUA_IDLE_INTERVAL
+        # False keeps LuaJIT compiling when only idle/Stop wants the hook
+        self.jit_stoppable = settings.LUA_JIT_STOPPABLE
+        self.cancelled = False
+        self.hook_calls = 0
+        self._sethook = None
+        self._getinfo = None
+        self._jit = None
+        self._executed = 0
+        self._cpu_start = 0.0
+        self._last_idle = 0.0
+        self._tripped = None
+
+    @property
+    def lua(self):
+        if self._lua is None:
+            runtime, self.runtime_module = runtime_class(self.runtime)
+            if self.runtime != "default" and self.runtime_module not in LUA_RUNTIMES.get(self.runtime, ()):
+                self.debugger_write(f"Lua runtime '{self.runtime}' is not available, using {self.runtime_module}", "warning", line=None, source="LUA")
+            self._lua = runtime(unpack_returned_tuples=True)
+            self._install_hooks()
+            self._builtin_names = set(self._lua.globals().keys())
+        return self._lua
 
     def _install_hooks(self):
         def _print(*args):
@@ -21,18 +94,153 @@ class LuaEngine:
                 self.console_write(str(prompt))
             if self.input_request is None:
                 raise RuntimeError("Input requested but no input handler is set")
-            return self.input_request(prompt if prompt else "Input:")
+            if not self.hooks:
+                return self.input_request(prompt if prompt else "Input:")
+            self.hooks.emit("input_wait_start", prompt)
+            value = self.input_request(prompt if prompt else "Input:")
+            self.hooks.emit("input_wait_stop", value)
+            return value
 
         self.lua.globals()["print"] = _print
         self.lua.globals()["gx_input"] = _input
 
-    def execute(self, code: str, filename: str = "<lua>"):
+    def execute(self, code: str, filename: str = "<lua>", first_line: int = 1):
+        hooked = bool(self.hooks)
+        if hooked:
+            self.hooks.emit("exec_start", "lua", filename)
+        armed = False
+        self._tripped = None
         try:
-            self.lua.execute(code)
+            fn = self._compile(code, filename, first_line)
+            if fn is not None:
+                armed = self._arm(fn)
+                fn()
+                if self._tripped is not None:
+                    raise self._tripped
+        except LuaInterrupted as e:
+            self.debugger_write(str(e), "error", line=self._map_line(e.line, first_line), source="LUA")
         except Exception:
             tb = traceback.format_exc()
             line = self._extract_line(tb)
-            self.debugger_write(tb.strip(), "error", line=line, source="LUA")
+            self.debugger_write(tb.strip(), "error", line=self._map_line(line, first_line), source="LUA")
+        finally:
+            if armed:
+                self._sethook()
+                if self._jit:
+                    self._jit.on()
+            if hooked:
+                self.hooks.emit("exec_stop", "lua", filename)
+
+    def use_runtime(self, name=None):
+        name = name or settings.LUA_RUNTIME
+        if name == self.runtime:
+            return
+        self.runtime = name
+        self.runtime_module = None
+        self._lua = None
+        self._load = None
+        self._sethook = None
+        self._getinfo = None
+        self._jit = None
+        self._builtin_names = set()
+        self._chunks.clear()
+        self._reported.clear()
+
+    def begin_run(self):
+        self._reported.clear()
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def _arm(self, fn):
+        budget = self.max_instructions or self.cpu_budget
+        if not self.hook_count or not (self.idle is not None or budget):
+            return False
+        if self._sethook is None:
+            self._sethook = self.lua.eval(
+                "function(cb, n) if cb then debug.sethook(function() cb() end, '', n) else debug.sethook() end end"
+            )
+            self._getinfo = self.lua.eval("debug.getinfo")
+            self._jit = self.lua.eval("jit")
+        # LuaJIT never calls count hooks from compiled traces, so the compiler
+        # is off (and existing traces flushed) for as long as the hook is armed.
+        if self._jit:
+            if not budget and not self.jit_stoppable:
+                return False
+            self._jit.off()
+            if "jit_off" not in self._reported:
+                self._reported.add("jit_off")
+                if budget:
+                    why = "while an instruction or CPU budget is set"
+                else:
+                    why = "so Stop can interrupt it; set GX_LUA_JIT_STOPPABLE=0 to compile it (Stop then waits for the snippet)"
+                self.debugger_write(f"LuaJIT runs interpreter-only {why}", "info", line=None, source="LUA")
+        self._executed = 0
+        self._cpu_start = time.process_time()
+        self._last_idle = time.perf_counter()
+        self._sethook(self._on_count, self.hook_count)
+        return True
+
+    def _on_count(self):
+        self.hook_calls += 1
+        self._executed += self.hook_count
+        if self._tripped is not None:
+            raise self._tripped
+        if self.cancelled:
+            self._interrupt("Lua snippet cancelled")
+        if self.max_instructions and self._executed > self.max_instructions:
+            self._interrupt(f"Lua snippet stopped after {self.max_instructions} instructions")
+        if self.cpu_budget and time.process_time() - self._cpu_start > self.cpu_budget:
+            self._interrupt(f"Lua snippet stopped after {self.cpu_budget:g} s of CPU time")
+        if self.idle is not None:
+            now = time.perf_counter()
+            if now - self._last_idle >= self.idle_interval:
+                self._last_idle = now
+                self.idle()
+
+    def _interrupt(self, message):
+        try:
+            line = self._getinfo(3, "l").currentline
+        except Exception:
+            line = None
+        self._tripped = LuaInterrupted(message, line if line and line > 0 else None)
+        raise self._tripped
+
+    def clear_chunks(self):
+        self._chunks.clear()
+        self._reported.clear()
+
+    def _compile(self, code, filename, first_line):
+        key = (filename, first_line, code)
+        entry = self._chunks.get(key)
+        if entry is not None:
+            self._chunks.move_to_end(key)
+            self.chunk_hits += 1
+        else:
+            if self._load is None:
+                self._load = self.lua.eval("loadstring or load")
+            result = self._load(code, "=" + filename)
+            if isinstance(result, tuple):
+                entry = (result[0], result[1] if len(result) > 1 else "unknown error")
+            else:
+                entry = (result, None)
+            self.chunk_compiles += 1
+            self._chunks[key] = entry
+            if len(self._chunks) > self.chunk_cache_size:
+                self._chunks.popitem(last=False)
+
+        fn, err = entry
+        if fn is None and key not in self._reported:
+            self._reported.add(key)
+            line = self._map_line(self._extract_line(str(err)), first_line)
+            self.debugger_write(f"Lua compile error: {err}", "error", line=line, source="LUA")
+        return fn
+
+    def _map_line(self, line, first_line):
+        if line is None:
+            return None
+        return line + first_line - 1
 
     def inject_globals(self, gx_vars: dict):
         g = self.lua.globals()
@@ -67,6 +275,17 @@ class LuaEngine:
             except Exception:
                 pass
 
+    def memory_kb(self):
+        if self._lua is None:
+            return None
+        return self._lua.eval('collectgarbage("count")')
+
+    def user_globals(self) -> dict:
+        if self._lua is None:
+            return {}
+        g = self._lua.globals()
+        return {k: g[k] for k in g.keys() if isinstance(k, str) and k not in self._builtin_names}
+
     def _py_to_lua(self, v):
         if isinstance(v, (int, float, str, bool)) or v is None:
             return v
@@ -1,14 +1,21 @@
 import sys
 import os
+import time
 import traceback
 import faulthandler
 import shutil
+import threading
+import importlib
+
+_STARTUP_T0 = time.perf_counter()
 
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QAction, QPlainTextEdit, QPushButton, QSplitter, QMessageBox
+    QAction, QPlainTextEdit, QPushButton, QSplitter, QMessageBox, QTextEdit,
+    QFileDialog
 )
-from PyQt5.QtCore import Qt, QEventLoop, qInstallMessageHandler, QTimer
+from PyQt5.QtGui import QColor, QTextCharFormat, QTextCursor, QTextFormat, QPainter, QPalette
+from PyQt5.QtCore import Qt, QEventLoop, qInstallMessageHandler, QTimer, QPoint, QRect, QSize, pyqtSignal
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 if BASE_DIR not in sys.path:
@@ -19,6 +26,8 @@ APP_DIR = os.path.join(ROAMING, "GXScripter")
 os.makedirs(APP_DIR, exist_ok=True)
 
 LOG_PATH = os.path.join(APP_DIR, "crash.log")
+JOURNAL_DIR = os.path.join(APP_DIR, "journal")
+WORKSPACE_DIR = os.path.join(APP_DIR, "workspace")
 
 def log(msg: str):
     try:
@@ -45,22 +54,49 @@ sys.excepthook = excepthook
 qInstallMessageHandler(qt_message_handler)
 log("\n=== APP START ===")
 
+
+class StartupProfile:
+    def __init__(self, t0):
+        self.t0 = t0
+        self.last = t0
+        self.phases = []
+        self.done = False
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def dump(self):
+        if self.done:
+            return
+        self.done = True
+        lines = ["=== STARTUP PROFILE ==="]
+        for phase, dt in self.phases:
+            lines.append(f"  {phase:<24} {dt * 1000:8.1f} ms")
+        lines.append(f"  {'time to first window':<24} {(self.last - self.t0) * 1000:8.1f} ms")
+        log("\n".join(lines))
+
+
+PROFILE = StartupProfile(_STARTUP_T0)
+
 def resource_path(rel_path: str) -> str:
     if hasattr(sys, "_MEIPASS"):
         return os.path.join(sys._MEIPASS, rel_path)
     return os.path.join(os.path.dirname(os.path.abspath(__file__)), rel_path)
 
-def ensure_roaming_assets():
+def roaming_asset_paths():
     folder = os.path.join(ROAMING, "GXScript_Icon")
-    os.makedirs(folder, exist_ok=True)
+    return folder, os.path.join(folder, "FIC.ico"), os.path.join(folder, "AIC.ico")
+
+def ensure_roaming_assets():
+    folder, dst_fic, dst_aic = roaming_asset_paths()
 
     src_fic = resource_path(os.path.join("assets", "FIC.ico"))
     src_aic = resource_path(os.path.join("assets", "AIC.ico"))
 
-    dst_fic = os.path.join(folder, "FIC.ico")
-    dst_aic = os.path.join(folder, "AIC.ico")
-
     try:
+        os.makedirs(folder, exist_ok=True)
         if os.path.exists(src_fic) and not os.path.exists(dst_fic):
             shutil.copyfile(src_fic, dst_fic)
         if os.path.exists(src_aic) and not os.path.exists(dst_aic):
@@ -72,21 +108,170 @@ def ensure_roaming_assets():
 
 from console import GXConsole
 from debugger import GXDebugger
+from inspector import GXInspector
 from gx_engine import GXEngine, GXRuntimeError
+from checkpoints import CheckpointLog
 from python_engine import PythonEngine
 from lua_engine import LuaEngine
-from file_handler import FileHandler
+from file_handler import RELOAD, FileHandler
 from themes import DARK, LIGHT, apply_theme
 from syntax_highlighter import GXHighlighter
 from autocomplete import GXAutoComplete
+from analyzer import GXAnalyzer
+from journal import EditJournal
+from tracing import ChromeTracer
+from mem_profile import MemoryProfiler
+from workspace_index import WorkspaceIndex
+from quick_open import QuickOpenDialog, WorkspaceWatcher
+from gx_modules import MODULE_CACHE
+from input_providers import InputRouter, RecordingInput, load_inputs
+import settings
+
+PROFILE.mark("imports")
+
+WARM_MODULES = ("lupa", "jedi")
+
+
+class LineGutter(QWidget):
+    def __init__(self, editor):
+        super().__init__(editor)
+        self.editor = editor
+
+    def sizeHint(self):
+        return QSize(self.editor.gutter_width(), 0)
+
+    def paintEvent(self, e):
+        self.editor.paint_gutter(e)
+
+    def mousePressEvent(self, e):
+        self.editor.gutter_clicked(e.pos().y())
 
 
 class CodeEditor(QPlainTextEdit):
+    breakpoints_changed = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.setLineWrapMode(QPlainTextEdit.NoWrap)
         self.setTabStopDistance(4 * self.fontMetrics().horizontalAdvance(" "))
         self.autocomplete = None
+        self._diagnostic_selections = []
+        self._breakpoints: list[QTextCursor] = []
+        self.paused_line = None
+
+        self.gutter = LineGutter(self)
+        self.blockCountChanged.connect(self._update_gutter_width)
+        self.updateRequest.connect(self._update_gutter)
+        self._update_gutter_width()
+
+    def gutter_width(self):
+        digits = len(str(max(1, self.blockCount())))
+        return 22 + self.fontMetrics().horizontalAdvance("9") * digits
+
+    def _update_gutter_width(self, *_):
+        self.setViewportMargins(self.gutter_width(), 0, 0, 0)
+
+    def _update_gutter(self, rect, dy):
+        if dy:
+            self.gutter.scroll(0, dy)
+        else:
+            self.gutter.update(0, rect.y(), self.gutter.width(), rect.height())
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        cr = self.contentsRect()
+        self.gutter.setGeometry(QRect(cr.left(), cr.top(), self.gutter_width(), cr.height()))
+
+    def paint_gutter(self, e):
+        painter = QPainter(self.gutter)
+        pal = self.palette()
+        painter.fillRect(e.rect(), pal.color(QPalette.Window))
+        marks = set(self.breakpoint_lines())
+        fm = self.fontMetrics()
+        block = self.firstVisibleBlock()
+        top = round(self.blockBoundingGeometry(block).translated(self.contentOffset()).top())
+        while block.isValid() and top <= e.rect().bottom():
+            height = round(self.blockBoundingRect(block).height())
+            line = block.blockNumber() + 1
+            if block.isVisible() and top + height >= e.rect().top():
+                if line in marks:
+                    painter.setBrush(QColor("#e05252"))
+                    painter.setPen(Qt.NoPen)
+                    d = min(10, height - 4)
+                    painter.drawEllipse(4, top + (height - d) // 2, d, d)
+                painter.setPen(QColor("#e0b000") if line == self.paused_line else pal.color(QPalette.Mid))
+                painter.drawText(0, top, self.gutter.width() - 4, fm.height(), Qt.AlignRight, str(line))
+            block = block.next()
+            top += height
+
+    def gutter_clicked(self, y):
+        block = self.cursorForPosition(QPoint(0, y)).block()
+        if self.blockBoundingGeometry(block).translated(self.contentOffset()).bottom() >= y:
+            self.toggle_breakpoint(block.blockNumber() + 1)
+
+    def breakpoint_lines(self):
+        return sorted({c.blockNumber() + 1 for c in self._breakpoints})
+
+    def toggle_breakpoint(self, line=None):
+        if line is None:
+            line = self.textCursor().blockNumber() + 1
+        kept = [c for c in self._breakpoints if c.blockNumber() + 1 != line]
+        if len(kept) == len(self._breakpoints):
+            block = self.document().findBlockByNumber(line - 1)
+            if not block.isValid():
+                return
+            kept.append(QTextCursor(block))
+        self._breakpoints = kept
+        self.gutter.update()
+        self.breakpoints_changed.emit()
+
+    def clear_breakpoints(self):
+        self._breakpoints = []
+        self.gutter.update()
+        self.breakpoints_changed.emit()
+
+    def set_paused_line(self, line):
+        self.paused_line = line
+        if line is not None:
+            self.go_to_line(line)
+        self._refresh_extra_selections()
+        self.gutter.update()
+
+    def set_diagnostics(self, diagnostics):
+        selections = []
+        doc = self.document()
+        for d in diagnostics:
+            block = doc.findBlockByNumber(d.line - 1)
+            if not block.isValid():
+                continue
+            sel = QTextEdit.ExtraSelection()
+            sel.cursor = QTextCursor(block)
+            sel.cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+            sel.format.setUnderlineStyle(QTextCharFormat.WaveUnderline)
+            sel.format.setUnderlineColor(QColor("#ff5555" if d.level == "error" else "#e0b000"))
+            sel.format.setToolTip(d.message)
+            selections.append(sel)
+        self._diagnostic_selections = selections
+        self._refresh_extra_selections()
+
+    def _refresh_extra_selections(self):
+        selections = list(self._diagnostic_selections)
+        block = self.document().findBlockByNumber((self.paused_line or 0) - 1)
+        if self.paused_line is not None and block.isValid():
+            sel = QTextEdit.ExtraSelection()
+            sel.cursor = QTextCursor(block)
+            sel.format.setBackground(QColor(224, 176, 0, 60))
+            sel.format.setProperty(QTextFormat.FullWidthSelection, True)
+            selections.append(sel)
+        self.setExtraSelections(selections)
+
+    def go_to_line(self, line: int):
+        block = self.document().findBlockByNumber(max(0, line - 1))
+        if not block.isValid():
+            return
+        self.setTextCursor(QTextCursor(block))
+        self.centerCursor()
+        self.setFocus()
 
     def keyPressEvent(self, e):
         try:
@@ -127,7 +312,7 @@ class CodeEditor(QPlainTextEdit):
         if not line:
             return False
         lw = line.lower()
-        if lw.startswith(("if ", "elif ", "else", "repeat", "lua_snippet:", "py_snippet:")):
+        if lw.startswith(("if ", "elif ", "else", "repeat", "foreach ", "parallel ", "func ", "lua_snippet:", "py_snippet:")):
             return True
         if line.endswith(":"):
             return True
@@ -139,55 +324,79 @@ class CodeEditor(QPlainTextEdit):
 
 
 class MainWindow(QMainWindow):
+    diagnostics_ready = pyqtSignal(int, object)
+
     def __init__(self):
         super().__init__()
         self.input_loop = QEventLoop()
         self.theme = DARK
 
-        self.roaming_dir, self.fic_path, self.aic_path = ensure_roaming_assets()
+        self.roaming_dir, self.fic_path, self.aic_path = roaming_asset_paths()
 
         self.editor = CodeEditor()
         self.console = GXConsole()
         self.debugger = GXDebugger()
+        self.debugger.line_activated.connect(self.editor.go_to_line)
+        self.inspector = GXInspector()
+        self.inspector.hide()
 
         self.highlighter = GXHighlighter(self.editor.document())
         self.autocomplete = GXAutoComplete(self.editor)
         self.editor.autocomplete = self.autocomplete
 
+        self._doc_size = 0
+        self._chunk_iter = None
+        self._load_token = 0
+        self.analyzer = GXAnalyzer()
+        self._analysis_gen = 0
+        self.analysis_timer = QTimer(self)
+        self.analysis_timer.setSingleShot(True)
+        self.analysis_timer.timeout.connect(self._start_analysis)
+        self.diagnostics_ready.connect(self._apply_diagnostics)
+
         self.editor.textChanged.connect(self._on_text_changed)
 
         self.file_handler = FileHandler(
             parent=self,
             set_title=self.setWindowTitle,
             get_text=self.editor.toPlainText,
-            set_text=self._set_editor_text
+            set_text=self._set_editor_text,
+            load_chunks=self._load_editor_chunks,
+            on_saved=self._on_file_saved
         )
 
-        self.py_engine = PythonEngine(
-            console_write=self.console.write,
-            debugger_write=self._debug_write_adapter,
-            input_request=self.console.request_input
-        )
+        self.journal = EditJournal(JOURNAL_DIR, get_text=self.editor.toPlainText)
+        self.editor.document().contentsChange.connect(self._on_contents_change)
 
-        self.lua_engine = LuaEngine(
-            console_write=self.console.write,
-            debugger_write=self._debug_write_adapter,
-            input_request=self.console.request_input
-        )
+        self._py_engine = None
+        self._lua_engine = None
+        self.input = InputRouter(self.console.request_input)
+        self.input_recorder = None
 
         self.gx_engine = GXEngine(
             console_write=self.console.write,
             debugger_write=self._debug_write_adapter,
-            input_request=self.console.request_input,
+            input_request=self.input,
             run_python_block=self._run_python_block_from_gx,
-            run_lua_block=self._run_lua_block_from_gx
+            run_lua_block=self._run_lua_block_from_gx,
+            run_python_map=self._run_python_map_from_gx
         )
+        if settings.GX_CHECKPOINTS:
+            self.gx_engine.checkpoints = CheckpointLog()
+        self.gx_engine.on_pause = self._on_gx_pause
+        self.pause_loop = None
+        self._pause_command = None
+        self._running = False
+        self._breakpoint_lines = set()
+        self.editor.breakpoints_changed.connect(self._sync_breakpoints)
+        self.workspace = None
 
         self._build_ui()
         self._build_menu()
         self._apply_theme(self.theme)
         self.file_handler._update_title()
         self._sync_mode()
+        self._restart_journal()
 
         QTimer.singleShot(0, self._apply_default_split_sizes)
 
@@ -195,6 +404,48 @@ class MainWindow(QMainWindow):
             self.file_handler.open_path(sys.argv[1])
             self._sync_mode()
 
+        QTimer.singleShot(0, self._offer_recovery)
+        QTimer.singleShot(0, self._reopen_workspace)
+
+    @property
+    def py_engine(self):
+        if self._py_engine is None:
+            self._py_engine = PythonEngine(
+                console_write=self.console.write,
+                debugger_write=self._debug_write_adapter,
+                input_request=self.input
+            )
+            self._py_engine.idle = QApplication.processEvents
+        return self._py_engine
+
+    @property
+    def lua_engine(self):
+        if self._lua_engine is None:
+            self._lua_engine = LuaEngine(
+                console_write=self.console.write,
+                debugger_write=self._debug_write_adapter,
+                input_request=self.input
+            )
+            self._lua_engine.idle = QApplication.processEvents
+        return self._lua_engine
+
+    def after_first_paint(self):
+        PROFILE.mark("first paint")
+        PROFILE.dump()
+        ensure_roaming_assets()
+        threading.Thread(target=self._warm_subsystems, daemon=True).start()
+        if settings.PY_ISOLATED:
+            self.py_engine.pool
+
+    def _warm_subsystems(self):
+        for name in WARM_MODULES:
+            t = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except Exception:
+                continue
+            log(f"[startup] warmed {name} in {(time.perf_counter() - t) * 1000:.1f} ms")
+
     def _apply_default_split_sizes(self):
         if hasattr(self, "main_split"):
             self.main_split.setSizes([860, 340])
@@ -208,20 +459,33 @@ class MainWindow(QMainWindow):
             extra_globals=self.gx_engine.vars
         )
 
+    def _run_python_map_from_gx(self, code, start_line, name, items):
+        return self.py_engine.map(
+            code,
+            self.file_handler.state.path or "<python>",
+            name,
+            items,
+            extra_globals=self.gx_engine.vars
+        )
+
     def _run_lua_block_from_gx(self, code, start_line):
+        self.lua_engine.use_runtime(self.gx_engine.program.flags.get("lua_runtime"))
         self.lua_engine.inject_globals(self.gx_engine.vars)
-        self.lua_engine.execute(code, filename=self.file_handler.state.path or "<lua>")
+        self.lua_engine.execute(code, filename=self.file_handler.state.path or "<lua>", first_line=start_line)
         self.lua_engine.sync_back(self.gx_engine.vars)
 
     def _build_ui(self):
         run_btn = QPushButton("Run (F5)")
         run_btn.clicked.connect(self.run_current)
+        self._continue_controls = [run_btn]
+        self._run_controls = [run_btn]
 
         open_btn = QPushButton("Open")
         open_btn.clicked.connect(self.file_handler.open_file_dialog)
 
         save_btn = QPushButton("Save")
         save_btn.clicked.connect(self.file_handler.save)
+        self._save_controls = [save_btn]
 
         topbar = QHBoxLayout()
         topbar.setContentsMargins(10, 10, 10, 6)
@@ -245,7 +509,12 @@ class MainWindow(QMainWindow):
         self.main_split.setChildrenCollapsible(False)
         self.main_split.setHandleWidth(6)
         self.main_split.addWidget(self.left_split)
-        self.main_split.addWidget(self.debugger)
+        self.right_split = QSplitter(Qt.Vertical)
+        self.right_split.setChildrenCollapsible(False)
+        self.right_split.setHandleWidth(6)
+        self.right_split.addWidget(self.debugger)
+        self.right_split.addWidget(self.inspector)
+        self.main_split.addWidget(self.right_split)
 
         self.left_split.setStretchFactor(0, 4)
         self.left_split.setStretchFactor(1, 1)
@@ -271,16 +540,23 @@ class MainWindow(QMainWindow):
         act_open = QAction("Open...", self)
         act_save = QAction("Save", self)
         act_save_as = QAction("Save As...", self)
+        act_folder = QAction("Open Folder...", self)
+        act_quick = QAction("Quick Open... (Ctrl+P)", self)
         act_exit = QAction("Exit", self)
 
         act_new.triggered.connect(self.file_handler.new_file)
         act_open.triggered.connect(self.file_handler.open_file_dialog)
         act_save.triggered.connect(self.file_handler.save)
         act_save_as.triggered.connect(self.file_handler.save_as)
+        self._save_controls += [act_save, act_save_as]
+        act_folder.triggered.connect(self.open_workspace_dialog)
+        act_quick.triggered.connect(self.quick_open)
         act_exit.triggered.connect(self.close)
 
         file_menu.addAction(act_new)
         file_menu.addAction(act_open)
+        file_menu.addAction(act_folder)
+        file_menu.addAction(act_quick)
         file_menu.addSeparator()
         file_menu.addAction(act_save)
         file_menu.addAction(act_save_as)
@@ -291,6 +567,50 @@ class MainWindow(QMainWindow):
         act_run = QAction("Run (F5)", self)
         act_run.triggered.connect(self.run_current)
         run_menu.addAction(act_run)
+        self.act_resume = QAction("Run from Last Change (Ctrl+F5)", self)
+        self.act_resume.setEnabled(settings.GX_CHECKPOINTS)
+        self.act_resume.triggered.connect(lambda: self.run_current(resume=True))
+        run_menu.addAction(self.act_resume)
+        run_menu.addSeparator()
+        act_break = QAction("Toggle Breakpoint (F9)", self)
+        act_break.triggered.connect(lambda: self.editor.toggle_breakpoint())
+        run_menu.addAction(act_break)
+        act_clear_breaks = QAction("Clear Breakpoints", self)
+        act_clear_breaks.triggered.connect(self.editor.clear_breakpoints)
+        run_menu.addAction(act_clear_breaks)
+        act_over = QAction("Step Over (F10)", self)
+        act_over.triggered.connect(lambda: self.debug_command("over"))
+        run_menu.addAction(act_over)
+        act_into = QAction("Step Into (F11)", self)
+        act_into.triggered.connect(lambda: self.debug_command("into"))
+        run_menu.addAction(act_into)
+        act_stop = QAction("Stop (Shift+F5)", self)
+        act_stop.triggered.connect(lambda: self.debug_command("stop"))
+        run_menu.addAction(act_stop)
+        run_menu.addSeparator()
+        act_trace = QAction("Run with Trace...", self)
+        act_trace.triggered.connect(self.run_traced)
+        run_menu.addAction(act_trace)
+        act_memory = QAction("Run with Memory Profile", self)
+        act_memory.triggered.connect(self.run_memory_profiled)
+        run_menu.addAction(act_memory)
+        run_menu.addSeparator()
+        act_replay = QAction("Run with Inputs...", self)
+        act_replay.triggered.connect(self.run_with_inputs)
+        run_menu.addAction(act_replay)
+        self._continue_controls.append(act_run)
+        self._run_controls += [act_run, act_trace, act_memory, act_replay]
+        self.act_record = QAction("Record Inputs", self, checkable=True)
+        self.act_record.toggled.connect(self._set_recording)
+        run_menu.addAction(self.act_record)
+        act_save_inputs = QAction("Save Recorded Inputs...", self)
+        act_save_inputs.triggered.connect(self.save_recorded_inputs)
+        run_menu.addAction(act_save_inputs)
+        run_menu.addSeparator()
+        self.act_isolated = QAction("Isolated Python Workers", self, checkable=True)
+        self.act_isolated.setChecked(settings.PY_ISOLATED)
+        self.act_isolated.toggled.connect(self._set_isolated)
+        run_menu.addAction(self.act_isolated)
 
         view_menu = menubar.addMenu("View")
         self.act_dark = QAction("Dark Mode", self, checkable=True)
@@ -301,6 +621,10 @@ class MainWindow(QMainWindow):
         self.act_light.triggered.connect(self._set_light)
         view_menu.addAction(self.act_dark)
         view_menu.addAction(self.act_light)
+        view_menu.addSeparator()
+        self.act_inspector = QAction("Variable Inspector", self, checkable=True)
+        self.act_inspector.toggled.connect(self._set_inspector)
+        view_menu.addAction(self.act_inspector)
 
         tools_menu = menubar.addMenu("Tools")
         act_reg = QAction("Register .gxscript association", self)
@@ -323,16 +647,183 @@ class MainWindow(QMainWindow):
         self._apply_theme(self.theme)
 
     def _set_editor_text(self, text):
+        self._cancel_load()
+        self._apply_size_policy(len(text))
+        self.journal.paused = True
         self.editor.blockSignals(True)
         self.editor.setPlainText(text)
         self.editor.blockSignals(False)
+        self.journal.paused = False
         self.file_handler.mark_dirty(False)
         self._sync_mode()
+        self._restart_journal()
+        self.analysis_timer.start(0)
+
+    def open_workspace_dialog(self):
+        root = QFileDialog.getExistingDirectory(self, "Open Folder", self.workspace.index.root if self.workspace else "")
+        if root:
+            self.open_workspace(root)
+
+    def open_workspace(self, root):
+        self.close_workspace()
+        index = WorkspaceIndex(root, WORKSPACE_DIR)
+        self.workspace = WorkspaceWatcher(index, self).start()
+        MODULE_CACHE.resolvers.append(index.resolve)
+        try:
+            os.makedirs(WORKSPACE_DIR, exist_ok=True)
+            with open(os.path.join(WORKSPACE_DIR, "last_root"), "w", encoding="utf-8") as f:
+                f.write(index.root)
+        except OSError:
+            pass
+
+    def close_workspace(self):
+        if self.workspace is None:
+            return
+        resolve = self.workspace.index.resolve
+        if resolve in MODULE_CACHE.resolvers:
+            MODULE_CACHE.resolvers.remove(resolve)
+        self.workspace.stop()
+        self.workspace = None
+
+    def _reopen_workspace(self):
+        try:
+            with open(os.path.join(WORKSPACE_DIR, "last_root"), "r", encoding="utf-8") as f:
+                root = f.read().strip()
+        except OSError:
+            return
+        if root and os.path.isdir(root):
+            self.open_workspace(root)
+
+    def quick_open(self):
+        if self.workspace is None:
+            self.open_workspace_dialog()
+            if self.workspace is None:
+                return
+        dialog = QuickOpenDialog(self.workspace.index, self)
+        if dialog.exec_() and dialog.path:
+            self.file_handler.open_file(dialog.path)
+
+    def _restart_journal(self):
+        state = self.file_handler.state
+        self.journal.start(state.path, doc_size=self._doc_size, encoding=state.encoding)
+
+    def _on_file_saved(self, path):
+        self._restart_journal()
+
+    def _on_contents_change(self, position, removed, added):
+        if self.journal.paused or self._chunk_iter is not None:
+            return
+        inserted = ""
+        if added:
+            cur = QTextCursor(self.editor.document())
+            cur.setPosition(position)
+            cur.setPosition(position + added, QTextCursor.KeepAnchor)
+            inserted = cur.selectedText().replace("\u2029", "\n")
+        self.journal.record(position, removed, inserted)
+
+    def _offer_recovery(self):
+        try:
+            orphans = EditJournal.find_orphans(JOURNAL_DIR)
+        except Exception:
+            log("\n=== EXCEPTION IN journal recovery ===")
+            log(traceback.format_exc())
+            return
+        for doc in orphans:
+            name = doc.path or "an untitled document"
+            answer = QMessageBox.question(
+                self,
+                "Recover unsaved changes",
+                f"GXScripter found unsaved changes to {name} from a previous session.\nRecover them?",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if answer != QMessageBox.Yes:
+                EditJournal.remove(JOURNAL_DIR, doc.key)
+                continue
+            if not self.file_handler.confirm_close():
+                return
+            EditJournal.remove(JOURNAL_DIR, doc.key)
+            self.file_handler.state.path = doc.path
+            self.file_handler.state.mode = self.file_handler._detect_mode(doc.path or "", doc.text)
+            self._set_editor_text(doc.text)
+            self.journal.compact(doc.text)
+            self.file_handler.mark_dirty(True)
+            return
+
+    def _apply_size_policy(self, size):
+        self._doc_size = size
+        highlight = size < settings.HIGHLIGHT_MAX_BYTES
+        if highlight and self.highlighter.document() is None:
+            self.highlighter.setDocument(self.editor.document())
+        elif not highlight and self.highlighter.document() is not None:
+            self.highlighter.setDocument(None)
+        self.autocomplete.set_enabled(size < settings.AUTOCOMPLETE_MAX_BYTES)
+
+    def _load_editor_chunks(self, chunks):
+        self._cancel_load()
+        self._apply_size_policy(self.file_handler.state.size)
+        self._load_token += 1
+        token = self._load_token
+        self._chunk_iter = iter(chunks)
+        self._update_controls()
+        self.editor.blockSignals(True)
+        self.editor.setReadOnly(True)
+        self.editor.document().setUndoRedoEnabled(False)
+        self.editor.setPlainText("")
+        QTimer.singleShot(0, lambda: self._load_next_chunk(token))
+
+    def _cancel_load(self):
+        if self._chunk_iter is None:
+            return
+        self._load_token += 1
+        chunks, self._chunk_iter = self._chunk_iter, None
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+        self._end_load()
+
+    def _end_load(self):
+        self.editor.document().setUndoRedoEnabled(True)
+        self.editor.setReadOnly(False)
+        self.editor.blockSignals(False)
+        self._update_controls()
+
+    def _load_next_chunk(self, token):
+        # A newer load, or a document set directly, makes this timer chain stale.
+        if token != self._load_token:
+            return
+        try:
+            chunk = next(self._chunk_iter)
+        except StopIteration:
+            self._chunk_iter = None
+            self._end_load()
+            self.editor.moveCursor(QTextCursor.Start)
+            self.file_handler.mark_dirty(False)
+            self._sync_mode()
+            self._restart_journal()
+            self.analysis_timer.start(0)
+            return
+        except Exception:
+            log("\n=== EXCEPTION IN _load_next_chunk ===")
+            log(traceback.format_exc())
+            self._chunk_iter = iter(())
+            QTimer.singleShot(0, lambda: self._load_next_chunk(token))
+            return
+        if chunk is RELOAD:
+            self.editor.setPlainText("")
+            self.debugger.write("File is not valid in its detected encoding; reloading as latin-1", level="warning", source="FILE")
+            QTimer.singleShot(0, lambda: self._load_next_chunk(token))
+            return
+        cur = QTextCursor(self.editor.document())
+        cur.movePosition(QTextCursor.End)
+        cur.insertText(chunk)
+        QTimer.singleShot(0, lambda: self._load_next_chunk(token))
 
     def _on_text_changed(self):
         try:
+            self._doc_size = self.editor.document().characterCount()
             self.file_handler.mark_dirty(True)
             self._sync_mode()
+            self.analysis_timer.start(400)
         except Exception:
             log("\n=== EXCEPTION IN _on_text_changed ===")
             log(traceback.format_exc())
@@ -347,10 +838,14 @@ class MainWindow(QMainWindow):
 
     def _sync_mode(self):
         base_mode = self.file_handler.state.mode
-        text = self.editor.toPlainText()
 
-        include_py = self._has_directive_anywhere(text, "#include_python") or self._has_directive_anywhere(text, "#include_lua&python")
-        include_lua = self._has_directive_anywhere(text, "#include_lua") or self._has_directive_anywhere(text, "#include_lua&python")
+        if self._doc_size >= settings.LARGE_FILE_BYTES:
+            include_py = self.autocomplete.include_python
+            include_lua = self.autocomplete.include_lua
+        else:
+            text = self.editor.toPlainText()
+            include_py = self._has_directive_anywhere(text, "#include_python") or self._has_directive_anywhere(text, "#include_lua&python")
+            include_lua = self._has_directive_anywhere(text, "#include_lua") or self._has_directive_anywhere(text, "#include_lua&python")
 
         if base_mode != self.highlighter.mode:
             self.highlighter.set_mode(base_mode)
@@ -358,18 +853,75 @@ class MainWindow(QMainWindow):
         self.autocomplete.set_mode(base_mode)
         self.autocomplete.set_includes(include_py, include_lua)
 
+    def _start_analysis(self):
+        self._analysis_gen += 1
+        if self.file_handler.state.mode != "gx" or self._doc_size >= settings.ANALYSIS_MAX_BYTES:
+            self._apply_diagnostics(self._analysis_gen, [])
+            return
+        worker = threading.Thread(
+            target=self._analysis_worker,
+            args=(self._analysis_gen, self.editor.toPlainText(), self.file_handler.state.path),
+            daemon=True
+        )
+        worker.start()
+
+    def _analysis_worker(self, gen, text, path):
+        try:
+            diagnostics = self.analyzer.analyze(text, path)
+        except Exception:
+            log("\n=== EXCEPTION IN analyzer ===")
+            log(traceback.format_exc())
+            return
+        self.diagnostics_ready.emit(gen, diagnostics)
+
+    def _apply_diagnostics(self, gen, diagnostics):
+        if gen != self._analysis_gen:
+            return
+        self.editor.set_diagnostics(diagnostics)
+        self.debugger.set_diagnostics(diagnostics)
+
     def _debug_write_adapter(self, message, level="info", line=None, source="GX"):
         msg = message if isinstance(message, str) else str(message)
         self.debugger.write(msg, level=level, line=line, source=source)
 
-    def run_current(self):
+    def run_current(self, resume=False):
+        if self.pause_loop is not None:
+            self.debug_command("continue")
+            return
+        if self._running or self._chunk_iter is not None:
+            return
+        self._set_running(True)
+        try:
+            self._run_current(resume)
+        finally:
+            self._set_running(False)
+
+    def _set_running(self, running):
+        self._running = running
+        self._update_controls()
+
+    def _update_controls(self):
+        loading = self._chunk_iter is not None
+        self.file_handler.state.loading = loading
+        for control in self._run_controls:
+            control.setEnabled(not self._running and not loading)
+        self.act_resume.setEnabled(not self._running and not loading and settings.GX_CHECKPOINTS)
+        for control in self._save_controls:
+            control.setEnabled(not loading)
+
+    def _run_current(self, resume):
         code = self.editor.toPlainText()
         self.console.write("\n")
         self._sync_mode()
 
         base_mode = self.file_handler.state.mode
+        if self._lua_engine is not None:
+            self._lua_engine.begin_run()
+        if self._py_engine is not None:
+            self._py_engine.begin_run()
 
         if base_mode == "lua":
+            self.lua_engine.use_runtime()
             self.lua_engine.execute(code, filename=self.file_handler.state.path or "<lua>")
             return
 
@@ -377,10 +929,150 @@ class MainWindow(QMainWindow):
             self.py_engine.execute(code, filename=self.file_handler.state.path or "<python>")
             return
 
+        self.analysis_timer.stop()
+        self._analysis_gen += 1
+        diagnostics = self.analyzer.analyze(code, self.file_handler.state.path)
+        self._apply_diagnostics(self._analysis_gen, diagnostics)
+        errors = [d for d in diagnostics if d.level == "error"]
+        if errors:
+            self.debugger.write(f"Run aborted: {len(errors)} error(s) found before execution", level="error", source="GX")
+            return
+
         try:
-            self.gx_engine.execute(code)
+            self.gx_engine.execute(code, path=self.file_handler.state.path, resume=resume)
         except GXRuntimeError as e:
-            self.debugger.write(str(e), level="error", line=e.line, source="GX")
+            source = "GX" if not e.path or e.path == self.gx_engine.script_path else "GX " + os.path.basename(e.path)
+            self.debugger.write(str(e), level="error", line=e.line, source=source)
+        finally:
+            if self.gx_engine.resumed_line is not None:
+                line = self.gx_engine.resumed_line
+                self.debugger.write(f"Resumed from checkpoint at line {line}", level="info", line=line, source="GX")
+
+    def run_traced(self):
+        if self._running:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Save Trace", "trace.json", "Chrome Trace (*.json);;All Files (*.*)")
+        if not path:
+            return
+        tracer = ChromeTracer().attach(self.gx_engine, self.py_engine, self.lua_engine)
+        try:
+            self.run_current()
+        finally:
+            tracer.detach()
+            try:
+                tracer.save(path)
+                self.debugger.write(f"Trace written to {path} ({len(tracer.events)} events)", level="info", source="TRACE")
+            except Exception as e:
+                self.debugger.write(f"Could not write trace: {e}", level="error", source="TRACE")
+
+    def run_memory_profiled(self):
+        if self._running:
+            return
+        profiler = MemoryProfiler().attach(self.gx_engine, self.py_engine, self.lua_engine)
+        try:
+            self.run_current()
+        finally:
+            profiler.detach()
+            for message, line in profiler.summary():
+                self.debugger.write(message, level="info", line=line, source="MEM")
+
+    def _sync_breakpoints(self):
+        lines = set(self.editor.breakpoint_lines())
+        for line in sorted(lines - self._breakpoint_lines):
+            self.debugger.write(f"Breakpoint set at line {line}", level="info", line=line, source="BREAK")
+        for line in sorted(self._breakpoint_lines - lines):
+            self.debugger.write(f"Breakpoint removed at line {line}", level="info", line=line, source="BREAK")
+        self._breakpoint_lines = lines
+        self.gx_engine.set_breakpoints(lines)
+
+    def _on_gx_pause(self, engine, node, reason):
+        what = "Breakpoint hit" if reason == "breakpoint" else "Paused"
+        self.debugger.write(f"{what} at line {node.line}", level="info", line=node.line, source="BREAK")
+        self.editor.set_paused_line(node.line)
+        if self.inspector.isVisible():
+            self.inspector.flush()
+        self._pause_command = "stop"
+        self.pause_loop = QEventLoop()
+        for control in self._continue_controls:
+            control.setEnabled(True)
+        self.pause_loop.exec_()
+        for control in self._continue_controls:
+            control.setEnabled(False)
+        self.pause_loop = None
+        self.editor.set_paused_line(None)
+        return self._pause_command
+
+    def debug_command(self, command):
+        if self.pause_loop is not None:
+            self._pause_command = command
+            self.pause_loop.quit()
+            return
+        if command == "stop":
+            if self._lua_engine is not None:
+                self._lua_engine.cancel()
+            return
+        self.gx_engine.step_first = command != "continue"
+        try:
+            self.run_current()
+        finally:
+            self.gx_engine.step_first = False
+
+    def _set_isolated(self, enabled):
+        self.py_engine.isolated = enabled
+        if enabled:
+            self.py_engine.pool
+        else:
+            self.py_engine.shutdown()
+
+    def _set_inspector(self, enabled):
+        if enabled:
+            self.inspector.attach(self.gx_engine, self.py_engine, self.lua_engine)
+            self.inspector.show()
+        else:
+            self.inspector.detach()
+            self.inspector.hide()
+
+    def run_with_inputs(self):
+        if self._running:
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Replay Inputs", "", "Input Files (*.json *.txt);;All Files (*.*)")
+        if not path:
+            return
+        try:
+            provider = load_inputs(path)
+        except (OSError, ValueError) as e:
+            self.debugger.write(f"Could not load inputs: {e}", level="error", source="INPUT")
+            return
+        if self.input_recorder is not None:
+            provider = RecordingInput(provider)
+        self.input.use(provider)
+        try:
+            self.run_current()
+        finally:
+            self.input.reset()
+            if self.input_recorder is not None:
+                self.input_recorder.answers.extend(provider.answers)
+
+    def _set_recording(self, enabled):
+        if enabled:
+            self.input_recorder = RecordingInput(self.console.request_input)
+            self.input.default = self.input_recorder
+            self.debugger.write("Recording console answers", level="info", source="INPUT")
+        else:
+            self.input.default = self.console.request_input
+
+    def save_recorded_inputs(self):
+        if self.input_recorder is None or not self.input_recorder.answers:
+            self.debugger.write("No recorded inputs to save", level="warning", source="INPUT")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Save Recorded Inputs", "inputs.json", "Input Session (*.json)")
+        if not path:
+            return
+        try:
+            self.input_recorder.save(path)
+            self.debugger.write(f"Saved {len(self.input_recorder.answers)} answer(s) to {path}", level="info", source="INPUT")
+        except OSError as e:
+            self.debugger.write(f"Could not save inputs: {e}", level="error", source="INPUT")
 
     def register_gxscript_association(self):
         try:
@@ -388,6 +1080,7 @@ class MainWindow(QMainWindow):
             import ctypes
 
             exe_path = sys.executable
+            ensure_roaming_assets()
             fic = self.fic_path
 
             classes_root = r"Software\Classes"
@@ -421,13 +1114,31 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "Register failed", str(e))
 
     def keyPressEvent(self, e):
+        if e.key() == Qt.Key_F5 and e.modifiers() & Qt.ShiftModifier:
+            self.debug_command("stop")
+            return
         if e.key() == Qt.Key_F5:
-            self.run_current()
+            self.run_current(resume=bool(e.modifiers() & Qt.ControlModifier) and settings.GX_CHECKPOINTS)
+            return
+        if e.key() == Qt.Key_F9:
+            self.editor.toggle_breakpoint()
+            return
+        if e.key() == Qt.Key_P and e.modifiers() & Qt.ControlModifier:
+            self.quick_open()
+            return
+        if e.key() in (Qt.Key_F10, Qt.Key_F11):
+            self.debug_command("over" if e.key() == Qt.Key_F10 else "into")
             return
         super().keyPressEvent(e)
 
     def closeEvent(self, e):
         if self.file_handler.confirm_close():
+            if self.pause_loop is not None:
+                self.pause_loop.quit()
+            self.journal.discard()
+            self.close_workspace()
+            if self._py_engine is not None:
+                self._py_engine.shutdown()
             e.accept()
         else:
             e.ignore()
@@ -435,8 +1146,12 @@ class MainWindow(QMainWindow):
 
 def main():
     app = QApplication(sys.argv)
+    PROFILE.mark("QApplication")
     w = MainWindow()
+    PROFILE.mark("MainWindow")
     w.show()
+    PROFILE.mark("show")
+    QTimer.singleShot(0, w.after_first_paint)
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
@@ -0,0 +1,260 @@
+import sys
+import tracemalloc
+from dataclasses import dataclass
+
+from gx_engine import BLOCK_KINDS
+from var_inspect import OPAQUE_TYPES, is_lua_table, type_name
+
+import settings
+
+# Objects visited per variable when sizing it; bigger graphs are reported as "at least".
+SIZE_SCAN_LIMIT = 1000000
+
+
+@dataclass
+class MemoryStat:
+    line: int
+    text: str
+    hits: int = 0
+    net: int = 0
+    peak: int = 0
+    lua_net: float | None = None
+
+
+class _Frame:
+    __slots__ = ("stat", "start", "peak", "lua_start")
+
+    def __init__(self, stat, start, lua_start):
+        self.stat = stat
+        self.start = start
+        self.peak = start
+        self.lua_start = lua_start
+
+
+def format_bytes(n) -> str:
+    sign = "-" if n < 0 else "+"
+    n = abs(n)
+    if n < 1024:
+        return f"{sign}{n:.0f} B"
+    for unit in ("KB", "MB"):
+        n /= 1024
+        if n < 1024:
+            return f"{sign}{n:.1f} {unit}"
+    return f"{sign}{n / 1024:.1f} GB"
+
+
+def deep_size(value):
+    """Returns (bytes, complete) for value and everything it holds, counting shared objects once."""
+    seen = set()
+    stack = [value]
+    total = 0
+    while stack:
+        if len(seen) >= SIZE_SCAN_LIMIT:
+            return total, False
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if is_lua_table(obj):
+            continue
+        try:
+            total += sys.getsizeof(obj)
+        except TypeError:
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif not isinstance(obj, OPAQUE_TYPES) and isinstance(getattr(obj, "__dict__", None), dict):
+            stack.append(obj.__dict__)
+    return total, True
+
+
+class MemoryProfiler:
+    """Python allocations per GX line and snippet, sampled with tracemalloc at every line boundary.
+
+    Peaks are relative to the memory in use when the line started. Lua snippets
+    also record the change of collectgarbage("count"); snippets run in isolated
+    or parallel worker processes are not seen.
+    """
+
+    def __init__(self, top: int | None = None):
+        self.top = top or settings.MEMORY_PROFILE_TOP
+        self.gx_engine = None
+        self.lua_engine = None
+        self.run = None
+        self.lines: dict[int, MemoryStat] = {}
+        self.snippets: dict[int, MemoryStat] = {}
+        self.largest = []
+        self._frames = []
+        self._run_frame = None
+        self._line_frame = None
+        self._standalone = False
+        self._started = False
+        self._attached = []
+
+    def attach(self, gx_engine=None, py_engine=None, lua_engine=None):
+        self.detach()
+        self.gx_engine, self.lua_engine = gx_engine, lua_engine
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        if gx_engine is not None:
+            h = gx_engine.hooks
+            self._add(h, "run_start", self._on_run_start)
+            self._add(h, "run_stop", self._on_run_stop)
+            self._add(h, "line", self._on_line)
+            self._add(h, "block_enter", self._on_block_enter)
+            self._add(h, "block_exit", self._on_block_exit)
+            self._add(h, "snippet_start", self._on_snippet_start)
+            self._add(h, "snippet_stop", self._on_snippet_stop)
+        for engine in (py_engine, lua_engine):
+            if engine is not None:
+                self._add(engine.hooks, "exec_start", self._on_exec_start)
+                self._add(engine.hooks, "exec_stop", self._on_exec_stop)
+        return self
+
+    def detach(self):
+        for hooks, event, fn in self._attached:
+            hooks.remove(event, fn)
+        self._attached = []
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def summary(self):
+        """(message, line) pairs for the debugger, biggest first."""
+        if self.run is None:
+            return []
+        run = self.run
+        head = f"Memory: net {format_bytes(run.net)}, peak {format_bytes(run.peak)} (Python)"
+        if run.lua_net:
+            head += f", Lua heap {format_bytes(run.lua_net * 1024)}"
+        out = [(head, None)]
+        for title, stats in (("line", self.lines), ("snippet", self.snippets)):
+            for s in sorted(stats.values(), key=lambda s: s.peak, reverse=True)[:self.top]:
+                if s.peak <= 0 and s.net <= 0 and not s.lua_net:
+                    continue
+                msg = f"{title} {s.line}: peak {format_bytes(s.peak)}, net {format_bytes(s.net)}"
+                if s.lua_net is not None:
+                    msg += f", Lua {format_bytes(s.lua_net * 1024)}"
+                if s.hits > 1:
+                    msg += f" over {s.hits} runs"
+                out.append((f"{msg}  {s.text}", s.line))
+        for name, kind, size, complete in self.largest:
+            out.append((f"var {name} ({kind}): {'' if complete else 'at least '}{format_bytes(size)[1:]}", None))
+        return out
+
+    def _add(self, hooks, event, fn):
+        hooks.add(event, fn)
+        self._attached.append((hooks, event, fn))
+
+    def _lua_kb(self):
+        if self.lua_engine is None:
+            return None
+        return self.lua_engine.memory_kb() or 0.0
+
+    def _sample(self):
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for frame in self._frames:
+            if peak > frame.peak:
+                frame.peak = peak
+        return current
+
+    def _push(self, stats, line, text, lua=False):
+        stat = stats.get(line)
+        if stat is None:
+            stat = stats[line] = MemoryStat(line, text)
+        frame = _Frame(stat, self._sample(), self._lua_kb() if lua else None)
+        self._frames.append(frame)
+        return frame
+
+    def _pop(self, frame):
+        current = self._sample()
+        if frame in self._frames:
+            self._frames.remove(frame)
+        stat = frame.stat
+        stat.hits += 1
+        stat.net += current - frame.start
+        stat.peak = max(stat.peak, frame.peak - frame.start)
+        if frame.lua_start is not None:
+            end = self._lua_kb()
+            if end is not None:
+                stat.lua_net = (stat.lua_net or 0.0) + end - frame.lua_start
+
+    def _pop_stat(self, stat):
+        for frame in reversed(self._frames):
+            if frame.stat is stat:
+                self._pop(frame)
+                return
+
+    def _begin(self, text, lua=True):
+        self.lines, self.snippets, self.largest = {}, {}, []
+        self._frames = []
+        self._line_frame = None
+        self._run_frame = self._push({}, 0, text, lua=lua)
+
+    def _end(self):
+        self._close_line()
+        frame, self._run_frame = self._run_frame, None
+        self._pop(frame)
+        self._frames = []
+        self.run = frame.stat
+
+    def _close_line(self):
+        if self._line_frame is not None:
+            self._pop(self._line_frame)
+            self._line_frame = None
+
+    def _on_run_start(self, engine):
+        self._begin(engine.script_path or "<script>")
+
+    def _on_run_stop(self, engine):
+        if self._run_frame is None:
+            return
+        self._end()
+        sized = []
+        for name, value in list(engine.vars.items()):
+            size, complete = deep_size(value)
+            sized.append((str(name), type_name(value), size, complete))
+        sized.sort(key=lambda v: v[2], reverse=True)
+        self.largest = sized[:self.top]
+
+    def _on_line(self, node):
+        if self._run_frame is None:
+            return
+        self._close_line()
+        if node.kind not in BLOCK_KINDS and not node.kind.endswith("_snippet"):
+            self._line_frame = self._push(self.lines, node.line, node.text)
+
+    def _on_block_enter(self, node):
+        if self._run_frame is None:
+            return
+        self._close_line()
+        self._push(self.lines, node.line, node.text)
+
+    def _on_block_exit(self, node):
+        if self._run_frame is None:
+            return
+        self._close_line()
+        self._pop_stat(self.lines.get(node.line))
+
+    def _on_snippet_start(self, lang, node):
+        if self._run_frame is not None:
+            self._push(self.snippets, node.line, f"{lang}_snippet", lua=lang == "lua")
+
+    def _on_snippet_stop(self, lang, node):
+        if self._run_frame is not None:
+            self._pop_stat(self.snippets.get(node.line))
+
+    def _on_exec_start(self, lang, filename):
+        if self._run_frame is None:
+            self._standalone = True
+            self._begin(filename, lua=lang == "lua")
+
+    def _on_exec_stop(self, lang, filename):
+        if self._standalone:
+            self._standalone = False
+            self._end()
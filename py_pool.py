@@ -0,0 +1,329 @@
+import io
+import os
+import pickle
+import queue
+import secrets
+import subprocess
+import sys
+import threading
+import traceback
+from contextlib import redirect_stdout, redirect_stderr
+from dataclasses import dataclass, field
+from multiprocessing.connection import Client, Listener
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+WORKER_SCRIPT = os.path.abspath(__file__)
+
+
+class WorkerCrashed(RuntimeError):
+    pass
+
+
+class SnippetMapError(RuntimeError):
+    def __init__(self, index, line, message):
+        super().__init__(message)
+        self.index = index
+        self.line = line
+
+
+@dataclass
+class SnippetResult:
+    stdout: str
+    stderr: str
+    error: str | None
+    vars: dict = field(default_factory=dict)
+
+
+def _peak_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def _picklable(items):
+    out = {}
+    for k, v in items:
+        try:
+            pickle.dumps(v, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            continue
+        out[k] = v
+    return out
+
+
+def gx_bindings(glb):
+    return {k: v for k, v in glb.items() if isinstance(k, str) and k.startswith("gx_")}
+
+
+def drop_gx_bindings(glb):
+    for k in list(gx_bindings(glb)):
+        del glb[k]
+
+
+def write_back_names(glb, gx_vars, before):
+    """Globals a snippet hands back to GX: the GX variables it was given and the
+    gx_ names it bound or rebound; before is gx_bindings(glb) taken just before exec."""
+    return [
+        k for k in glb
+        if k in gx_vars or (isinstance(k, str) and k.startswith("gx_") and (k not in before or glb[k] is not before[k]))
+    ]
+
+
+class _Worker:
+    def __init__(self, preload, start_timeout):
+        authkey = secrets.token_bytes(16)
+        self.listener = Listener(authkey=authkey)
+        self.proc = subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT, str(self.listener.address), ",".join(preload)],
+            stdin=subprocess.PIPE,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        )
+        self.proc.stdin.write(authkey.hex().encode("ascii") + b"\n")
+        self.proc.stdin.close()
+
+        accepted = []
+        t = threading.Thread(target=lambda: accepted.append(self.listener.accept()), daemon=True)
+        t.start()
+        t.join(start_timeout)
+        if not accepted:
+            self.kill()
+            raise WorkerCrashed("Python worker did not start")
+        self.listener.close()
+        self.conn = accepted[0]
+        _, self.pid, self.base_rss = self.conn.recv()
+        self.rss = self.base_rss
+        self.runs = 0
+
+    def run(self, code, filename, gx_vars, on_input=None, idle=None, session=False):
+        payload = ("run", code, filename, gx_vars, session)
+        try:
+            self.conn.send(payload)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            self.conn.send(("run", code, filename, _picklable(gx_vars.items()), session))
+        except OSError as e:
+            raise WorkerCrashed(f"Python worker is gone: {e}")
+
+        while True:
+            while not self.conn.poll(0.05):
+                if self.proc.poll() is not None:
+                    raise WorkerCrashed(f"Python worker exited with code {self.proc.returncode}")
+                if idle is not None:
+                    idle()
+            try:
+                msg = self.conn.recv()
+            except (EOFError, OSError):
+                raise WorkerCrashed(f"Python worker exited with code {self.proc.wait()}")
+
+            if msg[0] == "input":
+                try:
+                    answer = on_input(msg[1]) if on_input is not None else None
+                except Exception as e:
+                    answer = e
+                self.conn.send(answer if isinstance(answer, (str, type(None))) else RuntimeError(str(answer)))
+                continue
+
+            _, stdout, stderr, error, out_vars, rss = msg
+            self.runs += 1
+            self.rss = rss
+            return SnippetResult(stdout, stderr, error, out_vars)
+
+    def reset_session(self, gx_only=False):
+        try:
+            self.conn.send(("reset", gx_only))
+        except OSError:
+            pass
+
+    def growth_kb(self):
+        if self.rss is None or self.base_rss is None:
+            return 0
+        return self.rss - self.base_rss
+
+    def stop(self):
+        try:
+            self.conn.send(("stop",))
+            self.proc.wait(2)
+        except Exception:
+            self.kill()
+
+    def kill(self):
+        try:
+            self.listener.close()
+            self.proc.kill()
+            self.proc.wait(2)
+        except Exception:
+            pass
+
+
+class PythonWorkerPool:
+    def __init__(self, size: int, max_runs: int, max_growth_mb: int, preload=(), start_timeout: float = 30.0):
+        self.size = max(1, size)
+        self.max_runs = max_runs
+        self.max_growth_kb = max_growth_mb * 1024
+        self.preload = tuple(preload)
+        self.start_timeout = start_timeout
+        self.recycled = 0
+        self._idle = queue.LifoQueue()
+        self._count = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self):
+        threading.Thread(target=self._fill, daemon=True).start()
+        return self
+
+    def run(self, code, filename, gx_vars, on_input=None, idle=None) -> SnippetResult:
+        worker = self._acquire(idle)
+        try:
+            result = worker.run(code, filename, gx_vars, on_input, idle)
+        except BaseException:
+            self._retire(worker)
+            raise
+
+        if worker.runs >= self.max_runs or worker.growth_kb() > self.max_growth_kb:
+            self.recycled += 1
+            self._retire(worker)
+        else:
+            self._idle.put(worker)
+        return result
+
+    def detach(self, idle=None):
+        """Takes a worker out of the pool for the caller to keep and stop; the pool starts a replacement."""
+        worker = self._acquire(idle)
+        with self._lock:
+            self._count -= 1
+        if not self._closed:
+            threading.Thread(target=self._fill, daemon=True).start()
+        return worker
+
+    def shutdown(self):
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+
+    def _acquire(self, idle):
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                spawn = self._count < self.size
+                if spawn:
+                    self._count += 1
+            if spawn:
+                try:
+                    return _Worker(self.preload, self.start_timeout)
+                except BaseException:
+                    with self._lock:
+                        self._count -= 1
+                    raise
+            try:
+                return self._idle.get(timeout=0.05)
+            except queue.Empty:
+                if idle is not None:
+                    idle()
+
+    def _retire(self, worker):
+        worker.kill()
+        with self._lock:
+            self._count -= 1
+        if not self._closed:
+            threading.Thread(target=self._fill, daemon=True).start()
+
+    def _fill(self):
+        while not self._closed:
+            with self._lock:
+                if self._count >= self.size:
+                    return
+                self._count += 1
+            try:
+                self._idle.put(_Worker(self.preload, self.start_timeout))
+            except Exception:
+                with self._lock:
+                    self._count -= 1
+                return
+
+
+def run_fresh(code, filename, gx_vars, input_fn, glb=None) -> SnippetResult:
+    """Runs code in glb, or in fresh globals when glb is None."""
+    if glb is None:
+        glb = {}
+    glb.update({"__name__": "__main__", "__file__": filename, "input": input_fn})
+    glb.update(gx_vars)
+    before = gx_bindings(glb)
+    stdout_buf = io.StringIO()
+    stderr_buf = io.StringIO()
+    error = None
+
+    old_cwd = os.getcwd()
+    old_sys_path = list(sys.path)
+    try:
+        if filename and filename not in ("<python>", "<string>"):
+            script_dir = os.path.dirname(os.path.abspath(filename))
+            if script_dir not in sys.path:
+                sys.path.insert(0, script_dir)
+            os.chdir(script_dir)
+        compiled = compile(code, filename, "exec")
+        with redirect_stdout(stdout_buf), redirect_stderr(stderr_buf):
+            exec(compiled, glb, glb)
+    except BaseException:
+        error = traceback.format_exc()
+    finally:
+        os.chdir(old_cwd)
+        sys.path[:] = old_sys_path
+
+    out_vars = _picklable((k, glb[k]) for k in write_back_names(glb, gx_vars, before))
+    return SnippetResult(stdout_buf.getvalue(), stderr_buf.getvalue(), error, out_vars)
+
+
+def worker_main(address, authkey, preload):
+    conn = Client(address, authkey=authkey)
+    for name in preload:
+        if not name:
+            continue
+        try:
+            __import__(name)
+        except Exception:
+            pass
+    conn.send(("ready", os.getpid(), _peak_rss_kb()))
+
+    def _input(prompt=""):
+        conn.send(("input", str(prompt)))
+        answer = conn.recv()
+        if isinstance(answer, BaseException):
+            raise answer
+        if answer is None:
+            raise RuntimeError("Input requested but no input handler is set")
+        return answer
+
+    session = {}
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            return
+        if msg[0] == "stop":
+            return
+        if msg[0] == "reset":
+            if msg[1]:
+                drop_gx_bindings(session)
+            else:
+                session = {}
+            continue
+        _, code, filename, gx_vars, keep = msg
+        r = run_fresh(code, filename, gx_vars, _input, session if keep else None)
+        conn.send(("done", r.stdout, r.stderr, r.error, r.vars, _peak_rss_kb()))
+
+
+if __name__ == "__main__":
+    key = bytes.fromhex(sys.stdin.readline().strip())
+    worker_main(sys.argv[1], key, sys.argv[2].split(","))
@@ -2,27 +2,150 @@ import io
 import os
 import sys
 import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
 from contextlib import redirect_stdout, redirect_stderr
 
+from hooks import EngineHooks, EXEC_EVENTS
+from py_pool import (
+    PythonWorkerPool, SnippetMapError, SnippetResult, WorkerCrashed, drop_gx_bindings, gx_bindings, run_fresh, write_back_names
+)
+
+import settings
+
 class PythonEngine:
-    def __init__(self, console_write, debugger_write, input_request=None):
+    def __init__(self, console_write, debugger_write, input_request=None, isolated=None):
         self.console_write = console_write
         self.debugger_write = debugger_write
         self.input_request = input_request
 
         # Optional: persistent session globals (so state persists across runs)
         self.session_globals = {}
+        self.hooks = EngineHooks(EXEC_EVENTS)
+
+        # Isolated mode runs code in pooled worker processes instead of exec() here;
+        # session globals then live in one worker taken out of the pool
+        self.isolated = settings.PY_ISOLATED if isolated is None else isolated
+        self.idle = None
+        self._pool = None
+        self._session_worker = None
+        self._map_pool = None
+        self.parallel_workers = settings.PARALLEL_WORKERS
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = PythonWorkerPool(
+                size=settings.PY_WORKERS,
+                max_runs=settings.PY_WORKER_MAX_RUNS,
+                max_growth_mb=settings.PY_WORKER_MAX_GROWTH_MB,
+                preload=settings.PY_WORKER_PRELOAD,
+                start_timeout=settings.PY_WORKER_START_TIMEOUT
+            ).start()
+        return self._pool
+
+    def begin_run(self):
+        """Forgets gx_ names left in the session by earlier runs, so they cannot reach this run's GX variables."""
+        drop_gx_bindings(self.session_globals)
+        if self._session_worker is not None:
+            self._session_worker.reset_session(gx_only=True)
+
+    def reset_session(self):
+        self.session_globals.clear()
+        if self._session_worker is not None:
+            self._session_worker.reset_session()
+
+    def shutdown(self):
+        if self._session_worker is not None:
+            self._session_worker.stop()
+            self._session_worker = None
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._map_pool is not None:
+            self._map_pool.shutdown()
+            self._map_pool = None
+
+    def map(self, code, filename, name, items, extra_globals=None):
+        """Runs code once per item with fresh globals and returns each run's gx_result, in item order."""
+        base = dict(extra_globals or {})
+        workers = min(self.parallel_workers, len(items))
+        hooked = bool(self.hooks)
+        if hooked:
+            self.hooks.emit("exec_start", "py", filename)
+        try:
+            if workers <= 1:
+                results = [run_fresh(code, filename, {**base, name: item}, self._input) for item in items]
+            else:
+                results = self._map_parallel(code, filename, name, items, base, workers)
+        finally:
+            if hooked:
+                self.hooks.emit("exec_stop", "py", filename)
+
+        values = []
+        failed = None
+        for index, r in enumerate(results):
+            if r.stdout:
+                self.console_write(r.stdout)
+            if r.stderr:
+                self.console_write(r.stderr)
+            if r.error:
+                line = self._extract_line_from_traceback(r.error, filename)
+                self.debugger_write(f"item {index}: {r.error.strip()}", "error", line=line, source="PY")
+                if failed is None:
+                    failed = SnippetMapError(index, line, r.error.strip().splitlines()[-1])
+            values.append(r.vars.get("gx_result"))
+        if failed is not None:
+            raise failed
+        return values
+
+    def _map_parallel(self, code, filename, name, items, base, workers):
+        if self._map_pool is None or self._map_pool.size < workers:
+            if self._map_pool is not None:
+                self._map_pool.shutdown()
+            self._map_pool = PythonWorkerPool(
+                size=self.parallel_workers,
+                max_runs=settings.PY_WORKER_MAX_RUNS,
+                max_growth_mb=settings.PY_WORKER_MAX_GROWTH_MB,
+                preload=settings.PY_WORKER_PRELOAD,
+                start_timeout=settings.PY_WORKER_START_TIMEOUT
+            )
+        pool = self._map_pool
+
+        def run_one(item):
+            try:
+                return pool.run(code, filename, {**base, name: item})
+            except WorkerCrashed as e:
+                return SnippetResult("", "", f"WorkerCrashed: {e}")
+
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futures = [ex.submit(run_one, item) for item in items]
+            pending = futures
+            while pending:
+                _, pending = wait(pending, timeout=0.05)
+                if pending and self.idle is not None:
+                    self.idle()
+            return [f.result() for f in futures]
+
+    def _input(self, prompt=""):
+        if prompt:
+            self.console_write(str(prompt))
+        if self.input_request is None:
+            raise RuntimeError("Input requested but no input handler is set")
+        if not self.hooks:
+            return self.input_request(prompt if prompt else "Input:")
+        self.hooks.emit("input_wait_start", prompt)
+        value = self.input_request(prompt if prompt else "Input:")
+        self.hooks.emit("input_wait_stop", value)
+        return value
 
     def execute(self, code: str, filename: str = "<python>", extra_globals=None, persist_session=True):
+        if self.isolated:
+            self._execute_isolated(code, filename, extra_globals, persist_session)
+            return
+
         stdout_buf = io.StringIO()
         stderr_buf = io.StringIO()
-
-        def _input(prompt=""):
-            if prompt:
-                self.console_write(str(prompt))
-            if self.input_request is None:
-                raise RuntimeError("Input requested but no input handler is set")
-            return self.input_request(prompt if prompt else "Input:")
+        _input = self._input
 
         script_dir = None
         if filename and filename not in ("<python>", "<string>"):
@@ -43,11 +166,16 @@ class PythonEngine:
 
         if extra_globals:
             glb.update(extra_globals)
+        before = gx_bindings(glb)
 
         # Make imports behave
         old_cwd = os.getcwd()
         old_sys_path = list(sys.path)
 
+        hooked = bool(self.hooks)
+        if hooked:
+            self.hooks.emit("exec_start", "py", filename)
+
         try:
             if script_dir:
                 # Put script directory first (like running python file.py)
@@ -65,6 +193,8 @@ class PythonEngine:
             self.debugger_write(tb.strip(), "error", line=line, source="PY")
 
         finally:
+            if extra_globals is not None:
+                self._write_back(extra_globals, {k: glb[k] for k in write_back_names(glb, extra_globals, before)})
             # Restore process state
             os.chdir(old_cwd)
             sys.path[:] = old_sys_path
@@ -75,6 +205,51 @@ class PythonEngine:
                 self.console_write(out)
             if err:
                 self.console_write(err)
+            if hooked:
+                self.hooks.emit("exec_stop", "py", filename)
+
+    def _execute_isolated(self, code, filename, extra_globals, persist_session=True):
+        hooked = bool(self.hooks)
+        if hooked:
+            self.hooks.emit("exec_start", "py", filename)
+        gx_vars = dict(extra_globals or {})
+        try:
+            if persist_session:
+                if self._session_worker is None:
+                    self._session_worker = self.pool.detach(self.idle)
+                result = self._session_worker.run(code, filename, gx_vars, self._input, self.idle, session=True)
+            else:
+                result = self.pool.run(code, filename, gx_vars, on_input=self._input, idle=self.idle)
+        except WorkerCrashed as e:
+            message = str(e)
+            if persist_session and self._session_worker is not None:
+                self._session_worker.kill()
+                self._session_worker = None
+                message += "; the Python session globals were lost"
+            self.debugger_write(message, "error", line=None, source="PY")
+            return
+        finally:
+            if hooked:
+                self.hooks.emit("exec_stop", "py", filename)
+
+        if result.stdout:
+            self.console_write(result.stdout)
+        if result.stderr:
+            self.console_write(result.stderr)
+        if result.error:
+            line = self._extract_line_from_traceback(result.error, filename)
+            self.debugger_write(result.error.strip(), "error", line=line, source="PY")
+        if extra_globals is not None:
+            self._write_back(extra_globals, result.vars)
+
+    def _write_back(self, gx_vars, values):
+        for k, v in values.items():
+            try:
+                same = k in gx_vars and (gx_vars[k] is v or bool(gx_vars[k] == v))
+            except Exception:
+                same = False
+            if not same:
+                gx_vars[k] = v
 
     def _extract_line_from_traceback(self, tb: str, filename: str):
         for line in tb.splitlines():
@@ -0,0 +1,111 @@
+import threading
+
+from PyQt5.QtCore import Qt, QEvent, QFileSystemWatcher, QObject, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QApplication, QDialog, QLabel, QLineEdit, QListWidget, QVBoxLayout
+
+import settings
+
+
+class WorkspaceWatcher(QObject):
+    indexed = pyqtSignal()
+
+    def __init__(self, index, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.watcher = QFileSystemWatcher(self)
+        self.pending = set()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(200)
+        self.timer.timeout.connect(self._flush)
+        self.watcher.directoryChanged.connect(self._on_changed)
+        self.indexed.connect(self._watch_all)
+
+    def start(self):
+        threading.Thread(target=self._build, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.timer.stop()
+        watched = self.watcher.directories()
+        if watched:
+            self.watcher.removePaths(watched)
+        self.index.save()
+
+    def _build(self):
+        self.index.load()
+        self.index.build()
+        self.index.save()
+        self.indexed.emit()
+
+    def _watch_all(self):
+        watched = set(self.watcher.directories())
+        fresh = [d for d in self.index.directories() if d not in watched]
+        self._add(fresh)
+
+    def _add(self, dirs):
+        room = settings.WORKSPACE_WATCH_LIMIT - len(self.watcher.directories())
+        if dirs and room > 0:
+            self.watcher.addPaths(dirs[:room])
+
+    def _on_changed(self, path):
+        self.pending.add(path)
+        self.timer.start()
+
+    def _flush(self):
+        paths, self.pending = self.pending, set()
+        for path in sorted(paths):
+            added, removed = self.index.refresh(path)
+            watched = set(self.watcher.directories())
+            removed = [d for d in removed if d in watched]
+            if removed:
+                self.watcher.removePaths(removed)
+            self._add(added)
+
+
+class QuickOpenDialog(QDialog):
+    def __init__(self, index, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.path = None
+        self.setWindowTitle("Quick Open")
+        self.resize(640, 420)
+
+        self.query = QLineEdit()
+        self.query.setPlaceholderText("Type part of a file name or path")
+        self.results = QListWidget()
+        self.status = QLabel()
+
+        root = QVBoxLayout()
+        root.addWidget(self.query)
+        root.addWidget(self.results)
+        root.addWidget(self.status)
+        self.setLayout(root)
+
+        self.query.installEventFilter(self)
+        self.query.textChanged.connect(self._update)
+        self.query.returnPressed.connect(self._accept_current)
+        self.results.itemActivated.connect(self._accept_current)
+        self._update("")
+
+    def eventFilter(self, obj, e):
+        if obj is self.query and e.type() == QEvent.KeyPress and e.key() in (Qt.Key_Up, Qt.Key_Down, Qt.Key_PageUp, Qt.Key_PageDown):
+            QApplication.sendEvent(self.results, e)
+            return True
+        return super().eventFilter(obj, e)
+
+    def _update(self, text):
+        hits = self.index.search(text, settings.QUICK_OPEN_RESULTS)
+        self.results.clear()
+        self.results.addItems(hits)
+        if hits:
+            self.results.setCurrentRow(0)
+        total = len(self.index.paths())
+        self.status.setText(f"{total} files in {self.index.root}" + ("" if self.index.ready.is_set() else " (indexing...)"))
+
+    def _accept_current(self, *args):
+        item = self.results.currentItem()
+        if item is None:
+            return
+        self.path = self.index.abspath(item.text())
+        self.accept()
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+from dataclasses import dataclass, field
+
+from gx_engine import parse_program, reads_input, walk_nodes
+from gx_modules import MODULE_CACHE
+
+import settings
+
+CACHE_FORMAT = 1
+ENGINE_MODULES = ("gx_engine", "gx_modules", "python_engine", "lua_engine", "input_providers")
+
+_engine_version = None
+
+
+def engine_version() -> str:
+    global _engine_version
+    if _engine_version is None:
+        h = hashlib.sha1(sys.version.encode("utf-8"))
+        for name in ENGINE_MODULES:
+            module = sys.modules.get(name) or __import__(name)
+            with open(module.__file__, "rb") as f:
+                h.update(f.read())
+        _engine_version = h.hexdigest()
+    return _engine_version
+
+
+def engine_options(gx_engine=None, py_engine=None, lua_engine=None) -> dict:
+    """Settings that can change a run's output, read from the engines when given."""
+    return {
+        "lua_runtime": settings.LUA_RUNTIME,
+        "optimize": gx_engine.optimize if gx_engine is not None else settings.GX_OPTIMIZE,
+        "py_isolated": py_engine.isolated if py_engine is not None else settings.PY_ISOLATED,
+        "lua_max_instructions": lua_engine.max_instructions if lua_engine is not None else settings.LUA_MAX_INSTRUCTIONS,
+        "lua_cpu_budget": lua_engine.cpu_budget if lua_engine is not None else settings.LUA_CPU_BUDGET,
+        "lua_hook_count": lua_engine.hook_count if lua_engine is not None else settings.LUA_HOOK_COUNT,
+    }
+
+
+@dataclass
+class CachedRun:
+    output: str
+    debug: list
+    vars: dict
+    answers: list = field(default_factory=list)
+    inputs_used: int = 0
+
+
+class RunCache:
+    def __init__(self, directory: str, module_cache=None):
+        self.directory = directory
+        self.module_cache = module_cache or MODULE_CACHE
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.last_reason = None
+
+    def key(self, code: str, path: str | None, inputs=None, options=None):
+        program = parse_program(code)
+        if program.errors:
+            return self._skip("script has syntax errors")
+
+        h = hashlib.sha1()
+        h.update(f"{CACHE_FORMAT}\0{engine_version()}\0{path or ''}\0".encode("utf-8"))
+        h.update(json.dumps(options if options is not None else engine_options(), sort_keys=True).encode("utf-8") + b"\0")
+        h.update(code.encode("utf-8"))
+
+        programs = [program]
+        pending = [(program.flags, path)]
+        seen = set()
+        while pending:
+            flags, importer = pending.pop(0)
+            base_dir = os.path.dirname(os.path.abspath(importer)) if importer else None
+            for name, _ in flags.get("imports", []):
+                found = self.module_cache.resolve(name, base_dir)
+                if found is None:
+                    return self._skip("cannot find module " + name)
+                if found in seen:
+                    continue
+                seen.add(found)
+                try:
+                    module = self.module_cache.load(found)
+                except OSError:
+                    return self._skip("cannot read module " + name)
+                if module.program.errors:
+                    return self._skip("module has syntax errors")
+                h.update(f"\0{found}\0{module.digest}".encode("utf-8"))
+                programs.append(module.program)
+                pending.append((module.program.flags, found))
+
+        uses_input = False
+        for prog in programs:
+            for node in walk_nodes(prog.body):
+                if node.kind.endswith("_snippet") and "impure" in node.args:
+                    return self._skip(f"impure snippet at line {node.line}")
+                uses_input = uses_input or reads_input(node)
+
+        if uses_input:
+            remaining = getattr(inputs, "remaining", None)
+            values = remaining() if remaining is not None else None
+            if values is None:
+                return self._skip("reads input without replayed answers")
+            h.update(b"\0inputs\0" + json.dumps(values).encode("utf-8"))
+
+        self.last_reason = None
+        return h.hexdigest()
+
+    def get(self, key: str) -> CachedRun | None:
+        try:
+            with open(self._path(key), "rb") as f:
+                blob = pickle.load(f)
+        except Exception:
+            self.misses += 1
+            return None
+        if blob.get("format") != CACHE_FORMAT:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return blob["run"]
+
+    def put(self, key: str, run: CachedRun) -> bool:
+        target = self._path(key)
+        tmp = target + f".{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(tmp, "wb") as f:
+                pickle.dump({"format": CACHE_FORMAT, "run": run}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, target)
+            return True
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return False
+
+    def _path(self, key: str):
+        return os.path.join(self.directory, key[:2], key + ".pkl")
+
+    def _skip(self, reason):
+        self.skipped += 1
+        self.last_reason = reason
+        return None
@@ -0,0 +1,103 @@
+import os
+
+# Files at or above this size are opened in large-file mode: the encoding is
+# sniffed from a leading sample and the text is streamed into the editor.
+LARGE_FILE_BYTES = 4 * 1024 * 1024
+ENCODING_SAMPLE_BYTES = 64 * 1024
+LOAD_CHUNK_BYTES = 1024 * 1024
+
+# Editor services are switched off for documents above these sizes.
+HIGHLIGHT_MAX_BYTES = 2 * 1024 * 1024
+AUTOCOMPLETE_MAX_BYTES = 2 * 1024 * 1024
+ANALYSIS_MAX_BYTES = 2 * 1024 * 1024
+
+# Autosave journal: edits are appended as they happen and the journal is
+# rewritten as a single snapshot once it outgrows max(limit, document size).
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+JOURNAL_FSYNC_SECONDS = 2.0
+
+# Parsed #import modules are also pickled here so fresh processes can skip
+# parsing unchanged modules. None keeps the cache in memory only.
+MODULE_CACHE_DIR = os.environ.get("GX_MODULE_CACHE_DIR") or None
+
+# Workspace folder: file types indexed for quick open and #import lookups,
+# directory names never entered (hidden directories are skipped too), the
+# most directories watched for changes, and quick-open rows shown.
+WORKSPACE_EXTENSIONS = (".gxscript", ".py", ".lua")
+WORKSPACE_SKIP_DIRS = frozenset(("__pycache__", "node_modules", "venv", "build", "dist"))
+WORKSPACE_WATCH_LIMIT = 4096
+QUICK_OPEN_RESULTS = 50
+
+# Answers for var.ask/input() in headless runs: a text file with one answer
+# per line or a recorded .json session. Unset reads answers from stdin.
+INPUT_FILE = os.environ.get("GX_INPUT_FILE") or None
+
+# Opt-in cache of headless GX run results keyed by script, modules, replayed
+# answers and engine version. None always executes.
+RUN_CACHE_DIR = os.environ.get("GX_RUN_CACHE_DIR") or None
+
+# gx_daemon.py: Unix socket it listens on (None uses a per-user file in the
+# temp dir) and how many parsed scripts it keeps for repeat runs.
+DAEMON_SOCKET = os.environ.get("GX_DAEMON_SOCKET") or None
+DAEMON_PROGRAM_CACHE = 64
+
+# Compiled Lua chunks kept per LuaEngine, evicted least recently used first.
+LUA_CHUNK_CACHE_SIZE = 256
+
+# Lua runtime from lupa: "default", "luajit" (LuaJIT 2.1, then 2.0) or a
+# version such as "lua54". `#include_lua luajit` picks one per script.
+# Unavailable runtimes fall back to lupa's default with a warning.
+LUA_RUNTIME = os.environ.get("GX_LUA_RUNTIME", "default")
+
+# Lua snippets: a debug count hook runs every LUA_HOOK_COUNT VM instructions
+# to honour Stop, keep the window responsive (every LUA_IDLE_INTERVAL s) and
+# enforce the budgets below. It is armed only in the IDE or when a budget is
+# set. Once armed it roughly doubles the time of tight loops (Lua 5.5: 0.035 s
+# unhooked, 0.071 s at 10000, 0.075 s at 1000000), so the count mostly sets
+# how quickly Stop reacts. 0 turns the hook off. Budgets of 0 are unlimited.
+LUA_HOOK_COUNT = 10000
+LUA_MAX_INSTRUCTIONS = 0
+LUA_CPU_BUDGET = 0
+LUA_IDLE_INTERVAL = 0.05
+# LuaJIT skips the hook inside compiled code, so arming it turns the JIT off.
+# With 0, LuaJIT keeps compiling unless a budget is set; the IDE then stays
+# unresponsive and Stop waits until a snippet finishes.
+LUA_JIT_STOPPABLE = os.environ.get("GX_LUA_JIT_STOPPABLE", "1") != "0"
+
+# Isolated Python: snippets run in a pool of pre-started worker processes
+# that are replaced after a number of runs or once their peak RSS has grown
+# past the limit.
+PY_ISOLATED = os.environ.get("GX_PY_ISOLATED") == "1"
+PY_WORKERS = max(1, min(4, os.cpu_count() or 1))
+PY_WORKER_MAX_RUNS = 200
+PY_WORKER_MAX_GROWTH_MB = 512
+PY_WORKER_PRELOAD = ("numpy", "math", "random", "json", "re", "collections", "itertools")
+PY_WORKER_START_TIMEOUT = 30.0
+
+# parallel foreach: worker processes running the py_snippet body. 1 runs
+# the items one after another in this process, which is easier to debug.
+PARALLEL_WORKERS = int(os.environ.get("GX_PARALLEL_WORKERS") or 0) or max(1, os.cpu_count() or 1)
+
+# Memory profile: lines, snippets and variables listed in the summary.
+MEMORY_PROFILE_TOP = 5
+
+# Most debugger entries rendered at once; older matches stay searchable.
+DEBUGGER_RENDER_LIMIT = 20000
+
+# Fold constants, drop dead if/elif branches and cache loop-invariant
+# expressions before a GX run. Skipped while hooks (tracing) are attached.
+GX_OPTIMIZE = os.environ.get("GX_OPTIMIZE", "1") != "0"
+
+# Variable inspector: rows shown per page when a table is expanded, and the
+# shortest gap between refreshes while a run is writing variables.
+INSPECTOR_PAGE_SIZE = 100
+INSPECTOR_FRAME_MS = 100
+
+# "Run from last change": variable snapshots kept per run at top-level
+# statement boundaries (only variables written since the previous one are
+# copied). Older snapshots are merged pairwise past the limit.
+GX_CHECKPOINTS = os.environ.get("GX_CHECKPOINTS", "1") != "0"
+CHECKPOINT_LIMIT = 256
+
+# Deepest GX func call chain before a GXRuntimeError is raised.
+MAX_CALL_DEPTH = 100
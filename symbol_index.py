@@ -0,0 +1,167 @@
+import re
+
+
+GX_SYMBOL_PATTERNS = [
+    (re.compile(r"^var\.(?:set|ask|math)\s*=\s*([A-Za-z_]\w*)\s*,"), "var"),
+    (re.compile(r"^var\.math_(?:add|sub|mul|div)\s*=.*,\s*([A-Za-z_]\w*)\s*$"), "var"),
+    (re.compile(r"^table\.add\s*=\s*([A-Za-z_]\w*)\s*,"), "table"),
+    (re.compile(r"^parallel\s+foreach\s+.*,\s*([A-Za-z_]\w*)\s*$"), "var"),
+    (re.compile(r"^(?:foreach|for)\s+([A-Za-z_]\w*)\b"), "var"),
+    (re.compile(r"^func\s+([A-Za-z_]\w*)\s*\("), "func"),
+    (re.compile(r"^call\s+.*\)\s*,\s*([A-Za-z_]\w*)\s*$"), "var"),
+]
+
+
+def gx_line_symbols(line: str):
+    s = line.strip()
+    if not s or s.startswith("#"):
+        return ()
+    for regex, kind in GX_SYMBOL_PATTERNS:
+        m = regex.match(s)
+        if m:
+            return ((m.group(1), kind),)
+    return ()
+
+
+class _TrieNode:
+    __slots__ = ("children", "words")
+
+    def __init__(self):
+        self.children = {}
+        self.words = None
+
+
+class SymbolTrie:
+    def __init__(self):
+        self.root = _TrieNode()
+        self.size = 0
+
+    def add(self, word: str, count: int = 1):
+        node = self.root
+        for ch in word.lower():
+            nxt = node.children.get(ch)
+            if nxt is None:
+                nxt = node.children[ch] = _TrieNode()
+            node = nxt
+        if node.words is None:
+            node.words = {}
+        if word not in node.words:
+            self.size += 1
+        node.words[word] = node.words.get(word, 0) + count
+
+    def discard(self, word: str, count: int = 1):
+        path = []
+        node = self.root
+        for ch in word.lower():
+            nxt = node.children.get(ch)
+            if nxt is None:
+                return
+            path.append((node, ch))
+            node = nxt
+        if not node.words or word not in node.words:
+            return
+        left = node.words[word] - count
+        if left > 0:
+            node.words[word] = left
+            return
+        del node.words[word]
+        self.size -= 1
+        if not node.words:
+            node.words = None
+        for parent, ch in reversed(path):
+            child = parent.children[ch]
+            if child.words or child.children:
+                break
+            del parent.children[ch]
+
+    def count(self, word: str) -> int:
+        node = self._find(word.lower())
+        if node is None or not node.words:
+            return 0
+        return node.words.get(word, 0)
+
+    def complete(self, prefix: str):
+        node = self._find((prefix or "").lower())
+        if node is None:
+            return []
+        out = []
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            if n.words:
+                out.extend(n.words.items())
+            stack.extend(n.children.values())
+        return out
+
+    def _find(self, key: str):
+        node = self.root
+        for ch in key:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        return node
+
+
+class GXSymbolIndex:
+    def __init__(self, proximity_window: int = 400):
+        self.lines: list[tuple] = []
+        self.trie = SymbolTrie()
+        self.kinds: dict[str, str] = {}
+        self.proximity_window = proximity_window
+
+    def reset(self, text: str):
+        self.lines = []
+        self.trie = SymbolTrie()
+        self.kinds = {}
+        self.update(0, 0, text.split("\n"))
+
+    def update(self, first_line: int, removed_count: int, new_lines):
+        first_line = max(0, min(first_line, len(self.lines)))
+        removed_count = max(0, min(removed_count, len(self.lines) - first_line))
+
+        for syms in self.lines[first_line:first_line + removed_count]:
+            for name, _ in syms:
+                self.trie.discard(name)
+                if not self.trie.count(name):
+                    self.kinds.pop(name, None)
+
+        fresh = []
+        for ln in new_lines:
+            syms = gx_line_symbols(ln)
+            for name, kind in syms:
+                self.trie.add(name)
+                if self.kinds.get(name) != "table":
+                    self.kinds[name] = kind
+            fresh.append(syms)
+
+        self.lines[first_line:first_line + removed_count] = fresh
+
+    def complete(self, prefix: str, cursor_line: int = 0, limit: int = 50):
+        matches = [(w, c) for w, c in self.trie.complete(prefix) if w != prefix]
+        if not matches:
+            return []
+
+        distance = self._nearest_lines({w for w, _ in matches}, cursor_line)
+        far = self.proximity_window + 1
+
+        def score(item):
+            word, count = item
+            d = distance.get(word, far)
+            return (-count / (1.0 + d / 20.0), word.lower())
+
+        matches.sort(key=score)
+        return [(w, self.kinds.get(w, "var")) for w, _ in matches[:limit]]
+
+    def _nearest_lines(self, wanted, cursor_line: int):
+        found = {}
+        n = len(self.lines)
+        cursor_line = max(0, min(cursor_line, n - 1)) if n else 0
+        for d in range(0, self.proximity_window + 1):
+            for i in (cursor_line - d, cursor_line + d) if d else (cursor_line,):
+                if 0 <= i < n:
+                    for name, _ in self.lines[i]:
+                        if name in wanted and name not in found:
+                            found[name] = d
+            if len(found) == len(wanted):
+                break
+        return found
@@ -30,6 +30,8 @@ class GXHighlighter(QSyntaxHighlighter):
 
         self.gx_keywords = [
             "repeat", "end", "if", "elif", "else",
+            "foreach", "parallel", "for", "in", "break", "continue",
+            "func", "call", "return",
             "say", "debugprint",
             "var.set", "var.ask", "var.inc", "var.dec",
             "var.math", "var.math_add", "var.math_sub", "var.math_mul", "var.math_div",
@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+import time
+
+from gx_engine import BLOCK_KINDS
+
+
+class ChromeTracer:
+    def __init__(self, record_writes: bool = True):
+        self.record_writes = record_writes
+        self.events = []
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self._t0 = time.perf_counter()
+        self._open_line = None
+        self._attached = []
+
+    def attach(self, gx_engine=None, py_engine=None, lua_engine=None):
+        if gx_engine is not None:
+            h = gx_engine.hooks
+            self._add(h, "run_start", self._on_run_start)
+            self._add(h, "run_stop", self._on_run_stop)
+            self._add(h, "line", self._on_line)
+            self._add(h, "block_enter", self._on_block_enter)
+            self._add(h, "block_exit", self._on_block_exit)
+            self._add(h, "snippet_start", self._on_snippet_start)
+            self._add(h, "snippet_stop", self._on_snippet_stop)
+            self._add(h, "input_wait_start", self._on_input_start)
+            self._add(h, "input_wait_stop", self._on_input_stop)
+            if self.record_writes:
+                self._add(h, "var_write", self._on_var_write)
+        for engine in (py_engine, lua_engine):
+            if engine is None:
+                continue
+            h = engine.hooks
+            self._add(h, "exec_start", self._on_exec_start)
+            self._add(h, "exec_stop", self._on_exec_stop)
+            self._add(h, "input_wait_start", self._on_input_start)
+            self._add(h, "input_wait_stop", self._on_input_stop)
+        return self
+
+    def detach(self):
+        self._close_line()
+        for hooks, event, fn in self._attached:
+            hooks.remove(event, fn)
+        self._attached = []
+
+    def to_json(self):
+        return {"traceEvents": self.events, "displayTimeUnit": "ms"}
+
+    def save(self, path: str):
+        self._close_line()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f)
+
+    def _add(self, hooks, event, fn):
+        hooks.add(event, fn)
+        self._attached.append((hooks, event, fn))
+
+    def _ts(self):
+        return (time.perf_counter() - self._t0) * 1e6
+
+    def _event(self, ph, name, cat, ts=None, **extra):
+        ev = {"ph": ph, "name": name, "cat": cat, "ts": self._ts() if ts is None else ts, "pid": self.pid, "tid": self.tid}
+        ev.update(extra)
+        self.events.append(ev)
+
+    def _close_line(self):
+        if self._open_line is None:
+            return
+        name, ts, line = self._open_line
+        self._open_line = None
+        self._event("X", name, "gx", ts=ts, dur=max(0.0, self._ts() - ts), args={"line": line})
+
+    def _on_run_start(self, engine):
+        self._close_line()
+        self._event("B", engine.script_path or "<script>", "gx")
+
+    def _on_run_stop(self, engine):
+        self._close_line()
+        self._event("E", engine.script_path or "<script>", "gx")
+
+    def _on_line(self, node):
+        self._close_line()
+        if node.kind not in BLOCK_KINDS:
+            self._open_line = (f"{node.line}: {node.text}", self._ts(), node.line)
+
+    def _on_block_enter(self, node):
+        self._close_line()
+        self._event("B", f"{node.line}: {node.text}", "gx", args={"line": node.line})
+
+    def _on_block_exit(self, node):
+        self._close_line()
+        self._event("E", f"{node.line}: {node.text}", "gx")
+
+    def _on_snippet_start(self, lang, node):
+        self._open_line = None
+        self._event("B", f"{node.line}: {lang}_snippet", lang, args={"line": node.line})
+
+    def _on_snippet_stop(self, lang, node):
+        self._close_line()
+        self._event("E", f"{node.line}: {lang}_snippet", lang)
+
+    def _on_exec_start(self, lang, filename):
+        self._event("B", f"{lang} exec", lang, args={"file": filename})
+
+    def _on_exec_stop(self, lang, filename):
+        self._event("E", f"{lang} exec", lang)
+
+    def _on_input_start(self, prompt):
+        self._close_line()
+        self._event("B", "input wait", "input", args={"prompt": str(prompt)})
+
+    def _on_input_stop(self, value):
+        self._event("E", "input wait", "input")
+
+    def _on_var_write(self, name, value):
+        self._event("i", f"set {name}", "vars", s="t", args={"type": type(value).__name__})
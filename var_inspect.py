@@ -0,0 +1,116 @@
+import reprlib
+import sys
+import types
+from itertools import islice
+
+PREVIEW = reprlib.Repr()
+PREVIEW.maxstring = 80
+PREVIEW.maxother = 80
+PREVIEW.maxlist = PREVIEW.maxtuple = PREVIEW.maxset = PREVIEW.maxfrozenset = PREVIEW.maxdict = 8
+PREVIEW.maxlevel = 2
+
+OPAQUE_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def is_lua_table(value) -> bool:
+    return type(value).__name__ == "_LuaTable"
+
+
+def type_name(value) -> str:
+    if is_lua_table(value):
+        return "table"
+    return type(value).__name__
+
+
+def size_text(value) -> str:
+    if isinstance(value, str):
+        return f"{len(value)} chars"
+    if isinstance(value, (list, tuple, dict, set, frozenset)):
+        return f"{len(value)} items"
+    if is_lua_table(value):
+        return f"#{len(value)}"
+    try:
+        return f"{sys.getsizeof(value)} B"
+    except TypeError:
+        return ""
+
+
+def preview(value) -> str:
+    if is_lua_table(value):
+        return str(value)
+    try:
+        return PREVIEW.repr(value)
+    except Exception as e:
+        return f"<unprintable {type(value).__name__}: {e}>"
+
+
+def expandable(value) -> bool:
+    if isinstance(value, (list, tuple, dict, set, frozenset)):
+        return bool(value)
+    if is_lua_table(value):
+        return True
+    if isinstance(value, (str, bytes, int, float, complex, bool)) or value is None:
+        return False
+    if isinstance(value, OPAQUE_TYPES):
+        return False
+    return bool(getattr(value, "__dict__", None))
+
+
+def _pairs(value):
+    if isinstance(value, dict):
+        return ((repr(k), v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return ((f"[{i}]", v) for i, v in enumerate(value))
+    if isinstance(value, (set, frozenset)):
+        return ((f"{{{i}}}", v) for i, v in enumerate(value))
+    if is_lua_table(value):
+        return ((repr(k), v) for k, v in value.items())
+    return ((k, v) for k, v in vars(value).items())
+
+
+def children(value, start: int, count: int):
+    """Returns up to count (label, value) pairs from start and whether more follow."""
+    if isinstance(value, (list, tuple)):
+        page = [(f"[{i}]", value[i]) for i in range(start, min(start + count, len(value)))]
+        return page, start + count < len(value)
+    page = list(islice(_pairs(value), start, start + count + 1))
+    return page[:count], len(page) > count
+
+
+def _fingerprint(value):
+    try:
+        return id(value), len(value)
+    except Exception:
+        return id(value), None
+
+
+class ScopeDiff:
+    """Names of a scope we cannot track writes on that changed since the last call.
+
+    Values are compared by identity and length so nothing is stringified; an
+    in-place edit that keeps the length of a container is picked up on the next
+    full refresh.
+    """
+
+    def __init__(self):
+        self._seen = {}
+
+    def reset(self):
+        self._seen = {}
+
+    def changed(self, scope: dict):
+        seen = self._seen
+        current = {}
+        changed = set()
+        for name, value in scope.items():
+            fp = _fingerprint(value)
+            current[name] = fp
+            if seen.get(name) != fp:
+                changed.add(name)
+        changed.update(name for name in seen if name not in current)
+        self._seen = current
+        return changed
+
+
+def python_scope(session_globals: dict) -> dict:
+    return {k: v for k, v in session_globals.items() if isinstance(k, str) and not k.startswith("__") and k != "input"}
@@ -0,0 +1,265 @@
+import hashlib
+import heapq
+import os
+import pickle
+import re
+import threading
+
+import settings
+
+INDEX_FORMAT = 1
+
+
+def _join(rel, name):
+    return rel + "/" + name if rel else name
+
+
+class WorkspaceIndex:
+    """Script files under a root, listed per directory.
+
+    Each directory keeps its mtime, so a saved index is brought up to date by
+    stat()ing directories and listing only those that changed.
+    """
+
+    def __init__(self, root: str, cache_dir: str | None = None, extensions=None):
+        self.root = os.path.abspath(root)
+        self.cache_dir = cache_dir
+        self.extensions = tuple(extensions or settings.WORKSPACE_EXTENSIONS)
+        self.dirs: dict[str, tuple] = {}
+        self.ready = threading.Event()
+        self.scanned = 0
+        self._lock = threading.Lock()
+        self._paths = None
+        self._keys = None
+        self._names = None
+        self._last = (None, "", None)
+
+    @property
+    def cache_path(self):
+        key = hashlib.sha1(os.path.normcase(self.root).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + ".idx")
+
+    def load(self) -> bool:
+        if not self.cache_dir:
+            return False
+        try:
+            with open(self.cache_path, "rb") as f:
+                blob = pickle.load(f)
+        except Exception:
+            return False
+        if blob.get("format") != INDEX_FORMAT or blob.get("root") != self.root or blob.get("extensions") != self.extensions:
+            return False
+        with self._lock:
+            self.dirs = blob["dirs"]
+            self._changed()
+        return True
+
+    def save(self) -> bool:
+        if not self.cache_dir:
+            return False
+        with self._lock:
+            blob = {"format": INDEX_FORMAT, "root": self.root, "extensions": self.extensions, "dirs": dict(self.dirs)}
+        target = self.cache_path
+        tmp = target + f".{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp, "wb") as f:
+                pickle.dump(blob, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, target)
+            return True
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return False
+
+    def build(self):
+        with self._lock:
+            old = self.dirs
+        fresh, self.scanned = self._walk("", old)
+        with self._lock:
+            self.dirs = fresh
+            self._changed()
+        self.ready.set()
+        return self
+
+    def refresh(self, path: str):
+        """Re-lists one changed directory; returns the absolute directories added and removed under it."""
+        rel = self.relpath(path)
+        if rel is None:
+            return [], []
+        with self._lock:
+            old = self.dirs.get(rel)
+        entry = self._scan(rel, None)
+        if entry is None:
+            with self._lock:
+                gone = [d for d in self.dirs if self._within(d, rel)]
+                for d in gone:
+                    del self.dirs[d]
+                self._changed()
+            return [], [self.abspath(d) for d in gone]
+
+        before = set(old[2]) if old else set()
+        added = {}
+        for name in entry[2]:
+            if name not in before:
+                added.update(self._walk(_join(rel, name), {})[0])
+        with self._lock:
+            self.dirs[rel] = entry
+            gone = []
+            for name in before - set(entry[2]):
+                sub = _join(rel, name)
+                gone.extend(d for d in self.dirs if self._within(d, sub))
+            for d in gone:
+                del self.dirs[d]
+            self.dirs.update(added)
+            self._changed()
+        return [self.abspath(d) for d in added], [self.abspath(d) for d in gone]
+
+    def directories(self):
+        with self._lock:
+            return [self.abspath(d) for d in sorted(self.dirs)]
+
+    def paths(self):
+        return self._snapshot()[0]
+
+    def _snapshot(self):
+        with self._lock:
+            if self._paths is None:
+                out = []
+                for rel, (_, files, _) in self.dirs.items():
+                    out.extend(_join(rel, f) for f in files)
+                out.sort()
+                names = {}
+                for p in out:
+                    names.setdefault(p[p.rfind("/") + 1:].lower(), []).append(p)
+                self._paths = out
+                self._keys = [p.lower() for p in out]
+                self._names = names
+            return self._paths, self._keys, self._names
+
+    def search(self, query: str, limit: int = 50):
+        """Fuzzy match: the query's characters in order anywhere in the relative path.
+
+        Ranked by file name prefix, file name substring, path substring, then
+        file name subsequence, shorter paths first. Each keystroke that extends
+        the last query only re-checks the previous matches.
+        """
+        paths, keys, _ = self._snapshot()
+        query = query.strip().replace("\\", "/").lower()
+        if not query:
+            return paths[:limit]
+        last_paths, last_query, last = self._last
+        pool = last if last_paths is paths and query.startswith(last_query) else range(len(keys))
+        pattern = re.compile(".*?".join(map(re.escape, query)))
+        matched = [i for i in pool if pattern.search(keys[i])]
+        self._last = (paths, query, matched)
+
+        def rank(i):
+            key = keys[i]
+            name = key[key.rfind("/") + 1:]
+            if name.startswith(query):
+                tier = 0
+            elif query in name:
+                tier = 1
+            elif query in key:
+                tier = 2
+            elif pattern.search(name):
+                tier = 3
+            else:
+                tier = 4
+            return tier, len(key), key
+
+        return [paths[i] for i in heapq.nsmallest(limit, matched, key=rank)]
+
+    def resolve(self, name: str, base_dir: str | None = None):
+        """GXModuleCache resolver: the indexed file whose path ends with name, nearest to base_dir first."""
+        name = name.replace("\\", "/").strip("/")
+        if not name.lower().endswith(".gxscript"):
+            name += ".gxscript"
+        tail = "/" + name.lower()
+        candidates = self._snapshot()[2].get(tail[tail.rfind("/") + 1:], ())
+        hits = [p for p in candidates if ("/" + p.lower()).endswith(tail)]
+        if not hits:
+            return None
+        base = self.relpath(base_dir) if base_dir else None
+        base_parts = base.split("/") if base else []
+
+        def distance(p):
+            parts = p.split("/")[:-1]
+            common = 0
+            while common < min(len(parts), len(base_parts)) and parts[common] == base_parts[common]:
+                common += 1
+            return len(parts) + len(base_parts) - 2 * common, p
+
+        for p in sorted(hits, key=distance):
+            full = self.abspath(p)
+            if os.path.isfile(full):
+                return full
+        return None
+
+    def relpath(self, path: str):
+        full = os.path.abspath(path)
+        if os.path.normcase(full) == os.path.normcase(self.root):
+            return ""
+        try:
+            rel = os.path.relpath(full, self.root)
+        except ValueError:
+            return None
+        if rel == os.pardir or rel.startswith(os.pardir + os.sep):
+            return None
+        return rel.replace(os.sep, "/")
+
+    def abspath(self, rel: str):
+        return os.path.join(self.root, *rel.split("/")) if rel else self.root
+
+    def _within(self, rel, top):
+        return not top or rel == top or rel.startswith(top + "/")
+
+    def _changed(self):
+        self._paths = None
+        self._keys = None
+        self._names = None
+
+    def _walk(self, top, old):
+        out = {}
+        scanned = 0
+        pending = [top]
+        while pending:
+            rel = pending.pop()
+            known = old.get(rel)
+            entry = self._scan(rel, known)
+            if entry is None:
+                continue
+            if entry is not known:
+                scanned += 1
+            out[rel] = entry
+            pending.extend(_join(rel, d) for d in entry[2])
+        return out, scanned
+
+    def _scan(self, rel, known):
+        full = self.abspath(rel)
+        try:
+            mtime = os.stat(full).st_mtime_ns
+        except OSError:
+            return None
+        if known is not None and known[0] == mtime:
+            return known
+        files = []
+        subdirs = []
+        skip = settings.WORKSPACE_SKIP_DIRS
+        try:
+            with os.scandir(full) as it:
+                for e in it:
+                    try:
+                        if e.is_dir(follow_symlinks=False):
+                            if e.name not in skip and not e.name.startswith("."):
+                                subdirs.append(e.name)
+                        elif e.name.lower().endswith(self.extensions):
+                            files.append(e.name)
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        return mtime, tuple(sorted(files)), tuple(sorted(subdirs))